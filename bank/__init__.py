@@ -1,32 +1,51 @@
-"""A banking and proposal system for Slurm."""
+"""A banking and proposal system for Slurm.
 
-import logging
+Logging and the application database are configured lazily the first time
+they are needed. Library users can call ``init`` to configure both upfront.
+"""
 
-import sqlalchemy_utils
+import logging
+from typing import Optional
 
-import bank.orm
 from . import settings
-from .orm import DBConnection
 
 __version__ = '0.0.0'
 
-# Temporarily disable log messages from the environment package
-logging.getLogger('environ.environ').setLevel('ERROR')
-
-# Configure logging using application settings
-logging.basicConfig(
-    filename=settings.log_path,
-    format=settings.log_format,
-    datefmt=settings.date_format,
-    level=settings.log_level,
-    filemode='a')
-
-# Set logging level for third part packages
-for _log_name in ('sqlalchemy.engine', 'environ.environ', 'bank.account_services'):
-    logging.getLogger(_log_name).setLevel(settings.log_level)
-
-# Create database if it does not exist
-DBConnection.configure(settings.db_path)
-if not sqlalchemy_utils.database_exists(DBConnection.url):
-    sqlalchemy_utils.create_database(DBConnection.url)
-    DBConnection.metadata.create_all(DBConnection.engine)
+
+def configure_logging() -> None:
+    """Configure application logging using application settings
+
+    The log file is not opened until the first log message is written.
+    Calling this function more than once has no effect.
+    """
+
+    # Temporarily disable log messages from the environment package
+    logging.getLogger('environ.environ').setLevel('ERROR')
+
+    # Configure logging using application settings
+    logging.basicConfig(
+        handlers=[logging.FileHandler(settings.log_path, mode='a', delay=True)],
+        format=settings.log_format,
+        datefmt=settings.date_format,
+        level=settings.log_level)
+
+    # Set logging level for third part packages
+    for log_name in ('sqlalchemy.engine', 'environ.environ', 'bank.account_services'):
+        logging.getLogger(log_name).setLevel(settings.log_level)
+
+
+def init(db_url: Optional[str] = None) -> None:
+    """Configure application logging and connect to the application database
+
+    The database and its schema are created if they do not already exist.
+
+    Args:
+        db_url: Optionally connect to the given database URL instead of the one in application settings
+    """
+
+    # Imported here so importing the package does not require loading the database ORM
+    from .orm import DBConnection
+
+    configure_logging()
+    DBConnection.configure(db_url or settings.db_path)
+    DBConnection.create_database()
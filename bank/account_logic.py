@@ -7,26 +7,97 @@ API Reference
 
 from __future__ import annotations
 
-from datetime import date, datetime
+import csv
+import json
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from itertools import groupby
 from logging import getLogger
-from math import ceil
-from typing import Collection, Iterable, Optional, Union
+from math import ceil, floor
+from operator import itemgetter
+from pathlib import Path
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING, Union
 from warnings import warn
 
-from dateutil.relativedelta import relativedelta
-from prettytable import PrettyTable
-from sqlalchemy import delete, and_, not_, select
+from sqlalchemy import delete, and_, func, not_, or_, select, union, update
+from sqlalchemy.orm import object_session
 
 from . import settings
 from .exceptions import *
-from .orm import Account, Allocation, DBConnection, Investment, Proposal
-from .system import EmailTemplate, Slurm, SlurmAccount
-from os import geteuid
+from .orm import Account, Allocation, DBConnection, Investment, Outbox, Proposal, UsageRemainder, UsageWatermark
+from .system import EmailTemplate, SacctUsage, Slurm, SlurmAccount, SMTPSession, UsageSnapshot, caller_uid, \
+    windowed_usage_source
+
+# Third party packages only required by a subset of commands are imported where they are used.
+# This keeps the commandline application responsive when running other commands.
+if TYPE_CHECKING:
+    from prettytable import PrettyTable
 
 Numeric = Union[int, float]
 LOG = getLogger('bank.account_services')
 
 
+def _read_records(path: Union[str, Path], required_fields: Collection[str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Iterate over the records in a CSV or JSON file
+
+    CSV files must include a header row. JSON files (identified by a ``.json``
+    suffix) must contain a list of objects. Values are returned as strings
+    with leading and trailing whitespace removed.
+
+    Args:
+        path: Path of the file to read
+        required_fields: Field names that must be defined for every record
+
+    Yields:
+        A description of each record's location in the file and a dictionary of its values
+
+    Raises:
+        ValueError: If the file is malformed or any of the required fields are missing
+    """
+
+    path = Path(path)
+    with path.open(newline='') as infile:
+        if path.suffix.lower() == '.json':
+            data = json.load(infile)
+            if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+                raise ValueError(f'File {path} must contain a list of JSON objects')
+
+            records = ((f'record {i}', record) for i, record in enumerate(data, start=1))
+
+        else:
+            reader = csv.DictReader(infile, skipinitialspace=True)
+            records = ((f'line {reader.line_num}', row) for row in reader)
+
+        for location, record in records:
+            values = {
+                str(key).strip(): '' if value is None else str(value).strip()
+                for key, value in record.items() if key is not None
+            }
+
+            missing_fields = [field for field in required_fields if not values.get(field)]
+            if missing_fields:
+                raise ValueError(f'Missing required field(s) on {location} of {path}: {", ".join(missing_fields)}')
+
+            yield location, values
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    """Parse a date using the format specified in application settings
+
+    Args:
+        value: The string to parse
+
+    Returns:
+        The parsed date or ``None`` if the value is empty
+    """
+
+    if not value:
+        return None
+
+    return datetime.strptime(value, settings.date_format).date()
+
+
 class ProposalServices:
     """Administrative tool for managing account proposals"""
 
@@ -117,6 +188,8 @@ class ProposalServices:
             **clusters_sus: Service units to allocate to each cluster
         """
 
+        from dateutil.relativedelta import relativedelta
+
         end = end or (start + relativedelta(years=1))
 
         if isinstance(start, datetime):
@@ -167,6 +240,142 @@ class ProposalServices:
 
             LOG.info(f"Created proposal {new_proposal.id} for {self._account_name}")
 
+    @classmethod
+    def create_from_file(cls, path: Union[str, Path], force: bool = False) -> None:
+        """Create proposals for multiple accounts from a CSV or JSON file
+
+        Each record must define the ``account`` field and may define the fields
+        ``start`` and ``end`` (defaulting to today and one year from the start date).
+        Service units are assigned using a field for each cluster name and the
+        ``all_clusters`` field. Dates are expected in the format specified by
+        application settings.
+
+        All records are validated before any proposals are created. Overlapping
+        date ranges are checked against each other and against existing proposals,
+        and every conflict is reported together. Proposals for all records are then
+        inserted in a single transaction.
+
+        Args:
+            path: Path of the CSV or JSON file to read
+            force: Create the proposals even if their date ranges overlap
+
+        Raises:
+            ValueError: If a record is missing required fields or contains invalid values
+            AccountNotFoundError: If any of the accounts do not exist in Slurm
+            ProposalExistsError: If any of the proposals overlap and ``force`` is not set
+        """
+
+        from dateutil.relativedelta import relativedelta
+
+        cluster_fields = ('all_clusters', *settings.clusters)
+        valid_fields = ('account', 'start', 'end', *cluster_fields)
+
+        new_proposals = []
+        for location, record in _read_records(path, required_fields=('account',)):
+            try:
+                unknown_fields = [field for field in record if field not in valid_fields]
+                if unknown_fields:
+                    raise ValueError(f'Unknown field(s) {", ".join(unknown_fields)}')
+
+                start = _parse_date(record.get('start')) or date.today()
+                end = _parse_date(record.get('end')) or (start + relativedelta(years=1))
+                if start >= end:
+                    raise ValueError(f'Start date {start} must be earlier than end date {end}')
+
+                clusters_sus = {cluster: int(record.get(cluster) or 0) for cluster in cluster_fields}
+                cls._verify_cluster_values(**clusters_sus)
+
+            except ValueError as error:
+                raise ValueError(f'Invalid values on {location} of {path}: {error}') from error
+
+            proposal = Proposal(
+                percent_notified=0,
+                start_date=start,
+                end_date=end,
+                allocations=[
+                    Allocation(cluster_name=cluster, service_units_total=sus) for cluster, sus in clusters_sus.items()
+                ]
+            )
+            new_proposals.append((location, record['account'], proposal))
+
+        account_names = {account_name for _, account_name, _ in new_proposals}
+        missing_accounts = account_names.difference(Slurm.association_snapshot())
+        if missing_accounts:
+            raise AccountNotFoundError(f'No Slurm account for username(s) {", ".join(sorted(missing_accounts))}')
+
+        existing_proposals_query = select(Account.name, Proposal.id, Proposal.start_date, Proposal.end_date) \
+            .join(Proposal.account) \
+            .where(Account.name.in_(account_names))
+
+        with DBConnection.session() as session:
+            # Collect the date ranges of new and existing proposals for each account
+            date_ranges = {account_name: [] for account_name in account_names}
+            for account_name, proposal_id, start, end in session.execute(existing_proposals_query):
+                date_ranges[account_name].append((start, end, f'existing proposal {proposal_id}', False))
+
+            for location, account_name, proposal in new_proposals:
+                date_ranges[account_name].append((proposal.start_date, proposal.end_date, location, True))
+
+            conflicts = []
+            for account_name, ranges in sorted(date_ranges.items()):
+                conflicts.extend(f'{account_name}: {description}' for description in cls._find_overlaps(ranges))
+
+            if conflicts and not force:
+                raise ProposalExistsError(
+                    f'By default, proposals for a given account cannot overlap:\n    ' +
+                    '\n    '.join(conflicts) +
+                    '\nThis can be overridden with the `--force` flag')
+
+            elif conflicts:
+                warn(f"Creating {len(conflicts)} proposal(s) despite overlap with other proposals")
+
+            # Create database entries for any accounts that do not have one yet
+            accounts = {
+                account.name: account
+                for account in session.execute(select(Account).where(Account.name.in_(account_names))).scalars()
+            }
+
+            for account_name in account_names.difference(accounts):
+                accounts[account_name] = Account(name=account_name)
+                session.add(accounts[account_name])
+
+            for _, account_name, proposal in new_proposals:
+                accounts[account_name].proposals.append(proposal)
+
+            session.commit()
+
+        LOG.info(f"Created {len(new_proposals)} proposals for {len(account_names)} accounts from {path}")
+
+    @staticmethod
+    def _find_overlaps(date_ranges: Iterable[Tuple[date, date, str, bool]]) -> List[str]:
+        """Return descriptions of overlapping date ranges involving at least one new proposal
+
+        Date ranges are treated as half-open intervals (the end date is exclusive).
+        Ranges are swept in order of their start date while tracking the range
+        that ends last so far. Each range is therefore compared against a single
+        earlier range.
+
+        Args:
+            date_ranges: Tuples with the start date, end date, a description, and whether the proposal is new
+
+        Returns:
+            A description of each overlapping pair of date ranges
+        """
+
+        overlaps = []
+        latest_ending = None
+        for date_range in sorted(date_ranges):
+            start, end, description, is_new = date_range
+            if latest_ending is not None and start < latest_ending[1] and (is_new or latest_ending[3]):
+                overlaps.append(
+                    f'{description} ({start} - {end}) overlaps '
+                    f'{latest_ending[2]} ({latest_ending[0]} - {latest_ending[1]})')
+
+            if latest_ending is None or end > latest_ending[1]:
+                latest_ending = date_range
+
+        return overlaps
+
     def delete(self, proposal_id: int = None) -> None:
         """Delete a proposal from the current account
 
@@ -419,8 +628,94 @@ class InvestmentServices:
             number of investments is less than 1.
         """
 
+        new_investments = self._build_investments(sus, start, end, num_inv)
+
+        with DBConnection.session() as session:
+            account = session.execute(select(Account).where(Account.name == self._account_name)).scalars().first()
+            account.investments.extend(new_investments)
+            session.commit()
+
+        LOG.info(f"Invested {sus} service units for account {self._account_name} across {num_inv} investment(s)")
+
+    @classmethod
+    def create_from_file(cls, path: Union[str, Path]) -> None:
+        """Create investments for multiple accounts from a CSV or JSON file
+
+        Each record must define the fields ``account`` and ``sus``. The optional
+        fields ``start``, ``end``, and ``num_inv`` have the same meaning and defaults
+        as the corresponding arguments of the ``create`` method. Dates are expected
+        in the format specified by application settings.
+
+        All rows are validated before any investments are created. Investments
+        for all rows are then inserted in a single transaction.
+
+        Args:
+            path: Path of the CSV or JSON file to read
+
+        Raises:
+            ValueError: If a record is missing required fields or contains invalid values
+            AccountNotFoundError: If any of the accounts do not exist in Slurm
+            MissingProposalError: If any of the accounts do not have an associated proposal
+        """
+
+        investments_by_account = dict()
+        for location, row in _read_records(path, required_fields=('account', 'sus')):
+            try:
+                start = _parse_date(row.get('start')) or date.today()
+                end = _parse_date(row.get('end'))
+                num_inv = int(row.get('num_inv') or 1)
+                investments = cls._build_investments(int(row['sus']), start, end, num_inv)
+
+            except ValueError as error:
+                raise ValueError(f'Invalid values on {location} of {path}: {error}') from error
+
+            investments_by_account.setdefault(row['account'], []).extend(investments)
+
+        missing_accounts = set(investments_by_account).difference(Slurm.association_snapshot())
+        if missing_accounts:
+            raise AccountNotFoundError(f'No Slurm account for username(s) {", ".join(sorted(missing_accounts))}')
+
+        accounts_query = select(Account) \
+            .where(Account.name.in_(investments_by_account)) \
+            .where(Account.proposals.any())
+
+        with DBConnection.session() as session:
+            accounts = {account.name: account for account in session.execute(accounts_query).scalars()}
+            missing_proposals = set(investments_by_account).difference(accounts)
+            if missing_proposals:
+                raise MissingProposalError(
+                    f'Account(s) {", ".join(sorted(missing_proposals))} do not have an associated proposal')
+
+            for account_name, investments in investments_by_account.items():
+                accounts[account_name].investments.extend(investments)
+
+            session.commit()
+
+        num_investments = sum(map(len, investments_by_account.values()))
+        LOG.info(f"Created {num_investments} investments for {len(investments_by_account)} accounts from {path}")
+
+    @classmethod
+    def _build_investments(cls, sus: int, start: date, end: Optional[date], num_inv: int) -> List[Investment]:
+        """Validate investment parameters and return the corresponding sequence of new investments
+
+        Args:
+            sus: The total number of service units split equally across the investments
+            start: The start date of the first investment
+            end: The expiration date of the first investment, defaulting to 12 months from ``start``
+            num_inv: The number of sequential investments
+
+        Returns:
+            A list of investments that have not been added to the database
+
+        Raises:
+            ValueError: If the SUs provided are less than 0, if the start date is later than the end date, or if the
+            number of investments is less than 1.
+        """
+
+        from dateutil.relativedelta import relativedelta
+
         # Validate arguments
-        self._verify_service_units(sus)
+        cls._verify_service_units(sus)
 
         end = end or (start + relativedelta(years=1))
         if start >= end:
@@ -433,30 +728,20 @@ class InvestmentServices:
         duration = relativedelta(end, start)
         sus_per_instance = ceil(sus / num_inv)
 
-        with DBConnection.session() as session:
-            for i in range(num_inv):
-                # Determine the start and end of the current disbursement
-                start_this = start + (i * duration)
-                end_this = start_this + duration
-
-                new_investment = Investment(
-                    start_date=start_this,
-                    end_date=end_this,
-                    service_units=sus_per_instance,
-                    current_sus=sus_per_instance,
-                    withdrawn_sus=0,
-                    rollover_sus=0
-                )
-
-                account = session.execute(select(Account).where(Account.name == self._account_name)).scalars().first()
-                account.investments.append(new_investment)
-                session.add(account)
-
-                LOG.debug(f"Inserting investment {new_investment.id} for {self._account_name} with {sus} SUs")
-
-                session.commit()
-
-                LOG.info(f"Invested {sus} service units for account {self._account_name}")
+        investments = []
+        for i in range(num_inv):
+            # Determine the start and end of the current disbursement
+            start_this = start + (i * duration)
+            investments.append(Investment(
+                start_date=start_this,
+                end_date=start_this + duration,
+                service_units=sus_per_instance,
+                current_sus=sus_per_instance,
+                withdrawn_sus=0,
+                rollover_sus=0
+            ))
+
+        return investments
 
     def delete(self, inv_id: int) -> None:
         """Delete one of the account's associated investments
@@ -644,8 +929,8 @@ class AccountServices:
             account_name: The name of the account to administrate
         """
 
-        account = SlurmAccount(account_name)
-        self._account_name = account.account_name
+        self._slurm_account = SlurmAccount(account_name)
+        self._account_name = self._slurm_account.account_name
         self.setup_db_account_entry(self._account_name)
 
         subquery = select(Account.id).where(Account.name == self._account_name)
@@ -697,10 +982,15 @@ class AccountServices:
 
             return proposal.allocations
 
-    def _build_usage_table(self) -> PrettyTable:
-        """Return a human-readable summary of the account usage and allocation"""
+    def _build_usage_table(self, usage: Optional[UsageSnapshot] = None) -> 'PrettyTable':
+        """Return a human-readable summary of the account usage and allocation
+
+        Args:
+            usage: Optionally reuse usage data already retrieved for the active proposal
+        """
+
+        from prettytable import PrettyTable
 
-        slurm_acct = SlurmAccount(self._account_name)
         output_table = PrettyTable(header=False, padding_width=5)
 
         with DBConnection.session() as session:
@@ -720,6 +1010,9 @@ class AccountServices:
                                            'Most recent proposal allocation status:\n'
                                            f'    {recent_proposal_alloc_status}')
 
+            if usage is None or (usage.start, usage.end) != (proposal.start_date, proposal.end_date):
+                usage = self._slurm_account.usage_snapshot(proposal.start_date, proposal.end_date)
+
             # Proposal End Date as first row
             output_table.title = f"{self._account_name} Proposal Information"
             output_table.add_row(['Proposal End Date:', proposal.end_date.strftime(settings.date_format), ""],
@@ -750,12 +1043,7 @@ class AccountServices:
                     continue
 
                 # Gather usage data from sreport
-                usage_data = slurm_acct.get_cluster_usage_per_user(cluster=allocation.cluster_name,
-                                                                   start=proposal.start_date,
-                                                                   end=proposal.end_date,
-                                                                   in_hours=True)
-
-                
+                usage_data = usage.per_user(allocation.cluster_name)
 
                 # Skip displaying usage data if there is none, just show cluster total
                 if not usage_data:
@@ -825,12 +1113,14 @@ class AccountServices:
 
             return output_table
 
-    def _build_investment_table(self) -> PrettyTable:
+    def _build_investment_table(self) -> 'PrettyTable':
         """Return a human-readable summary of the account's investments
 
         The returned string is empty if there are no investments
         """
 
+        from prettytable import PrettyTable
+
         with DBConnection.session() as session:
             investments = session.execute(self._investments_query).scalars().all()
             if not investments:
@@ -848,6 +1138,15 @@ class AccountServices:
                 table.add_row(['','',''], divider=True)
         return table
 
+    def _format_investment_table(self) -> str:
+        """Return the investment summary as a string, or an empty string if the account has no investments"""
+
+        try:
+            return str(self._build_investment_table())
+
+        except MissingInvestmentError:
+            return ''
+
     def info(self) -> None:
         """Print a summary of service units allocated to and used by the account"""
 
@@ -880,8 +1179,12 @@ class AccountServices:
                 session.commit()
                 LOG.info(f"Created DB entry for account {account_name}")
 
-    def notify(self) -> None:
-        """Send any pending usage alerts to the account"""
+    def notify(self, smtp: Optional[SMTPSession] = None) -> None:
+        """Send any pending usage alerts to the account
+
+        Args:
+            smtp: Optionally send alerts over an existing SMTP connection
+        """
 
         proposal_query = select(Proposal).join(Account) \
             .where(Account.name == self._account_name) \
@@ -889,47 +1192,65 @@ class AccountServices:
 
         with DBConnection.session() as session:
             for proposal in session.execute(proposal_query).scalars().all():
-                self._notify_proposal(proposal)
+                self._notify_proposal(proposal, smtp)
+
+            # Record which usage thresholds the account has been notified about
+            session.commit()
+
+    def _notify_proposal(self, proposal: Proposal, smtp: Optional[SMTPSession] = None) -> None:
+        # Usage is retrieved once and shared by the threshold check and the usage table
+        usage = self._slurm_account.usage_snapshot(proposal.start_date, proposal.end_date)
 
-    def _notify_proposal(self, proposal):
         # Determine the next usage percentage that an email is scheduled to be sent out
-        slurm_acct = SlurmAccount(self._account_name)
-        usage = slurm_acct.get_cluster_usage_total(start=proposal.start_date,
-                                                   end=proposal.end_date)
         total_allocated = sum(alloc.service_units_total for alloc in proposal.allocations)
-        usage_perc = min(int(usage / total_allocated * 100), 100)
+        usage_perc = min(int(usage.total() / total_allocated * 100), 100)
         next_notify_perc = next((perc for perc in sorted(settings.notify_levels) if perc >= usage_perc), 100)
 
         email = None
+        notified_perc = proposal.percent_notified
         days_until_expire = (proposal.end_date - date.today()).days
         if days_until_expire <= 0:
-            email = EmailTemplate(settings.expired_proposal_notice)
+            email = EmailTemplate.compile(settings.expired_proposal_notice)
             subject = f'The account for {self._account_name} has reached its end date'
 
         elif days_until_expire in settings.warning_days:
-            email = EmailTemplate(settings.expiration_warning)
+            email = EmailTemplate.compile(settings.expiration_warning)
             subject = f'Your proposal expiry reminder for account: {self._account_name}'
 
         elif proposal.percent_notified < next_notify_perc <= usage_perc:
-            proposal.percent_notified = next_notify_perc
-            email = EmailTemplate(settings.usage_warning)
+            notified_perc = next_notify_perc
+            email = EmailTemplate.compile(settings.usage_warning)
             subject = f"Your account {self._account_name} has exceeded a proposal threshold"
 
         if email:
-            email.format(
-                account_name=self._account_name,
-                start=proposal.start_date.strftime(settings.date_format),
-                end=proposal.end_date.strftime(settings.date_format),
-                exp_in_days=days_until_expire,
-                perc=usage_perc,
-                usage=self._build_usage_table(),
-                investment=self._build_investment_table()
-            ).send_to(
-                to=f'{self._account_name}{settings.user_email_suffix}',
-                ffrom=settings.from_address,
-                subject=subject)
-
-    def update_status(self) -> None:
+            # Only compute the values used by the template since the tables are expensive to build
+            field_values = {
+                'account_name': lambda: self._account_name,
+                'start': lambda: proposal.start_date.strftime(settings.date_format),
+                'end': lambda: proposal.end_date.strftime(settings.date_format),
+                'exp_in_days': lambda: days_until_expire,
+                'perc': lambda: usage_perc,
+                'usage': lambda: self._build_usage_table(usage),
+                'investment': self._format_investment_table,
+            }
+
+            email = email.format(**{
+                field: get_value() for field, get_value in field_values.items() if field in email.fields
+            })
+
+            to = f'{self._account_name}{settings.user_email_suffix}'
+            if settings.email_spool:
+                # Spooled messages are committed together with the notification state of the proposal
+                msg = email.render(to=to, ffrom=settings.from_address, subject=subject)
+                object_session(proposal).add(Outbox(recipient=to, subject=subject, message=msg.as_string()))
+
+            else:
+                email.send_to(to=to, ffrom=settings.from_address, subject=subject, smtp=smtp)
+
+            # Only record the notification once it has been sent
+            proposal.percent_notified = notified_perc
+
+    def update_status(self, usage: Optional[Dict[str, int]] = None) -> None:
         """Update the Bank database entries for an unlocked account given the usage values from SLURM,
         and lock the account if necessary
 
@@ -938,16 +1259,28 @@ class AccountServices:
         Using these values, determine which clusters the account is exceeding usage limits on, and determine if that
         usage can be covered by floating/investment service units, locking on the cluster if not.
 
+        Args:
+            usage: Optionally provide the usage over the last day for each cluster instead of querying Slurm
+
+        Raises:
+            ValueError: If usage is not provided and the configured usage source ignores date ranges
         """
 
         # Update status runs daily
         end_date = date.today()
-        start_date = end_date - relativedelta(days=1)
+        start_date = end_date - timedelta(days=1)
 
-        slurm_acct = SlurmAccount(self._account_name)
+        # Gather SUs used over the last day on each cluster
+        if usage is None:
+            windowed_usage_source()
+            slurm_acct = SlurmAccount(self._account_name)
+            usage = {
+                cluster: slurm_acct.get_cluster_usage_total(cluster=cluster, start=start_date, end=end_date, in_hours=True)
+                for cluster in settings.clusters
+            }
 
         # Initialize usage to SUs used over the last day
-        total_usage_exceeding_limits = slurm_acct.get_cluster_usage_total(start=start_date, end=end_date, in_hours=True)
+        total_usage_exceeding_limits = sum(usage.get(cluster, 0) for cluster in settings.clusters)
 
         with DBConnection.session() as session:
 
@@ -973,10 +1306,7 @@ class AccountServices:
                         floating_alloc = alloc
                         continue
                     else:
-                        alloc.service_units_used += slurm_acct.get_cluster_usage_total(cluster=alloc.cluster_name,
-                                                                                       start=start_date,
-                                                                                       end=end_date,
-                                                                                       in_hours=True)
+                        alloc.service_units_used += usage.get(alloc.cluster_name, 0)
 
                         sus_remaining = alloc.service_units_total - alloc.service_units_used
 
@@ -1100,7 +1430,7 @@ class AccountServices:
             all_clusters: Lock the user on all clusters
         """
 
-        if geteuid() != 0:
+        if caller_uid() != 0:
            exit("ERROR: `unlock` must be run with sudo privileges!")
         
         self._set_account_lock(False, clusters, all_clusters)
@@ -1121,18 +1451,24 @@ class AdminServices:
             A tuple of account names
         """
 
+        if cluster not in Slurm.cluster_names():
+            raise ClusterNotFoundError(f'Cluster {cluster} is not configured with Slurm')
+
         # Query database for all account names
         with DBConnection.session() as session:
             account_names = session.execute(select(Account.name)).scalars().all()
 
         # Build a generator for account names that match the lock state
+        associations = Slurm.association_snapshot()
         for account in account_names:
-            try:
-                if SlurmAccount(account).get_locked_state(cluster) == status:
-                    yield account
-            except AccountNotFoundError:
+            # Skip accounts that do not exist in Slurm
+            if account not in associations:
                 continue
 
+            locked = 'billing=0' in associations[account].get(cluster, dict()).get('GrpTRESRunMins', '')
+            if locked == status:
+                yield account
+
     @classmethod
     def list_locked_accounts(cls, cluster: str) -> None:
         """Print account names that are locked on a given cluster
@@ -1171,9 +1507,536 @@ class AdminServices:
 
         return unlocked_accounts_by_cluster
 
+    @staticmethod
+    def _get_investment_rollovers(today: date) -> List[Dict[str, Union[str, int]]]:
+        """Return the service units to carry over from every expired investment with unused service units
+
+        Unused service units are carried over into the account's next investment,
+        i.e., the earliest investment starting on or after the expired investment ends.
+        The number of service units carried over is scaled by the ``inv_rollover_fraction``
+        setting. Expired investments without a following investment are not included.
+
+        Args:
+            today: Investments ending on or before this date are considered expired
+
+        Returns:
+            A list of rollovers ordered by account name and investment start date
+        """
+
+        # Load every investment belonging to an account with unused service units in an expired investment
+        expired_query = select(Investment.account_id) \
+            .where(Investment.end_date <= today) \
+            .where(Investment.current_sus > 0)
+
+        investments_query = select(
+            Account.name,
+            Investment.id,
+            Investment.start_date,
+            Investment.end_date,
+            Investment.current_sus) \
+            .join(Investment.account) \
+            .where(Investment.account_id.in_(expired_query)) \
+            .order_by(Account.name, Investment.start_date, Investment.id)
+
+        with DBConnection.session() as session:
+            rows = session.execute(investments_query).all()
+
+        rollovers = []
+        for account_name, investments in groupby(rows, key=itemgetter(0)):
+            investments = list(investments)
+            start_dates = [start_date for _, _, start_date, _, _ in investments]
+
+            # Service units rolled into an investment that has also expired are carried over again
+            received_sus = dict()
+            for _, inv_id, _, end_date, current_sus in investments:
+                expiring_sus = current_sus + received_sus.pop(inv_id, 0)
+                next_index = bisect_left(start_dates, end_date)
+                if end_date > today or expiring_sus <= 0 or next_index == len(investments):
+                    continue
+
+                next_id = investments[next_index][1]
+                rollover_sus = floor(expiring_sus * settings.inv_rollover_fraction)
+                received_sus[next_id] = received_sus.get(next_id, 0) + rollover_sus
+                rollovers.append({
+                    'account': account_name,
+                    'investment_id': inv_id,
+                    'expiring_sus': expiring_sus,
+                    'rollover_sus': rollover_sus,
+                    'next_investment_id': next_id})
+
+        return rollovers
+
+    @classmethod
+    def rollover_investments(cls, dry_run: bool = False) -> None:
+        """Carry over unused service units from expired investments into each account's next investment
+
+        The unused service units of each expired investment are zeroed out and
+        a fraction of them (see the ``inv_rollover_fraction`` setting) is added to
+        the current and rollover service units of the account's next investment.
+        Changes for all accounts are applied in a single transaction.
+
+        Args:
+            dry_run: Print the rollovers that would be applied without modifying the database
+        """
+
+        from prettytable import PrettyTable
+
+        rollovers = cls._get_investment_rollovers(date.today())
+
+        table = PrettyTable(['Account', 'Investment ID', 'Expiring SUs', 'Rollover SUs', 'Next Investment ID'])
+        table.title = 'Investment Rollovers (dry run)' if dry_run else 'Investment Rollovers'
+        for rollover in rollovers:
+            table.add_row(list(rollover.values()))
+
+        print(table)
+        if dry_run or not rollovers:
+            return
+
+        # Combine the changes for each investment into a single update by primary key
+        changes = dict()
+        for rollover in rollovers:
+            changes.setdefault(rollover['investment_id'], {'current_sus': 0, 'rollover_sus': 0})
+            changes[rollover['investment_id']]['current_sus'] -= rollover['expiring_sus']
+
+            changes.setdefault(rollover['next_investment_id'], {'current_sus': 0, 'rollover_sus': 0})
+            changes[rollover['next_investment_id']]['current_sus'] += rollover['rollover_sus']
+            changes[rollover['next_investment_id']]['rollover_sus'] += rollover['rollover_sus']
+
+        with DBConnection.session() as session:
+            current_values = session.execute(
+                select(Investment.id, Investment.current_sus, Investment.rollover_sus)
+                .where(Investment.id.in_(changes))).all()
+
+            session.execute(update(Investment), [
+                {
+                    'id': inv_id,
+                    'current_sus': current_sus + changes[inv_id]['current_sus'],
+                    'rollover_sus': rollover_sus + changes[inv_id]['rollover_sus']
+                } for inv_id, current_sus, rollover_sus in current_values
+            ])
+
+            session.commit()
+
+        LOG.info(f"Rolled over {sum(r['rollover_sus'] for r in rollovers)} service units "
+                 f"from {len(rollovers)} expired investments")
+
+    @staticmethod
+    def _get_usage_by_account(start: date, end: date) -> Optional[Dict[str, Dict[str, int]]]:
+        """Return the usage of every account with activity in the given date range
+
+        Usage is gathered using a single ``sreport`` call per cluster.
+
+        Args:
+            start: Start date of the usage window
+            end: End date of the usage window
+
+        Returns:
+            A dictionary mapping account names to the usage on each cluster, or ``None`` if Slurm could not be queried
+        """
+
+        usage_by_account = dict()
+        for cluster in Slurm.cluster_names().intersection(settings.clusters):
+            try:
+                cluster_usage = Slurm.cluster_usage_by_account(cluster, start, end, in_hours=True)
+
+            except CmdError:
+                LOG.warning(f"Could not gather bulk usage on {cluster}, falling back to per-account queries")
+                return None
+
+            for account_name, usage in cluster_usage.items():
+                usage_by_account.setdefault(account_name, dict())[cluster] = usage
+
+        return usage_by_account
+
+    @staticmethod
+    def _get_accounts_with_pending_changes(start: date, end: date) -> Set[str]:
+        """Return names of accounts that may change status without recording any new usage
+
+        This includes accounts with a proposal or investment starting or ending within the
+        given date range and accounts with an active proposal that is overdrawn on any cluster.
+
+        Args:
+            start: Start date of the date range
+            end: End date of the date range
+
+        Returns:
+            A set of account names
+        """
+
+        proposal_dates_query = select(Account.name).join(Proposal) \
+            .where(or_(Proposal.start_date.between(start, end), Proposal.end_date.between(start, end)))
+
+        investment_dates_query = select(Account.name).join(Investment) \
+            .where(or_(Investment.start_date.between(start, end), Investment.end_date.between(start, end)))
+
+        overdrawn_query = select(Account.name).join(Proposal).join(Allocation) \
+            .where(Proposal.is_active) \
+            .where(Allocation.service_units_used > Allocation.service_units_total)
+
+        with DBConnection.session() as session:
+            return set(session.execute(union(proposal_dates_query, investment_dates_query, overdrawn_query)).scalars())
+
+    @staticmethod
+    def _get_expired_account_names() -> Set[str]:
+        """Return the names of all accounts without an active proposal or investment
+
+        Proposals and investments that have exhausted their service units are
+        not considered active.
+        """
+
+        expired_accounts_query = select(Account.name) \
+            .where(not_(Account.proposals.any(and_(Proposal.is_active, not_(Proposal.is_expired))))) \
+            .where(not_(Account.investments.any(and_(Investment.is_active, not_(Investment.is_expired)))))
+
+        with DBConnection.session() as session:
+            return set(session.execute(expired_accounts_query).scalars())
+
+    @classmethod
+    def sweep_expired(cls, dry_run: bool = False) -> None:
+        """Lock all accounts that do not have an active proposal or investment
+
+        Accounts are only locked on clusters where they are currently unlocked and
+        do not have a purchased partition. Accounts listed in the ``ignore_accounts``
+        setting are never locked. Lock states are read from a single association
+        snapshot and updated using batched ``sacctmgr`` calls for each cluster.
+
+        Args:
+            dry_run: Print the accounts that would be locked without locking them
+        """
+
+        expired_accounts = cls._get_expired_account_names().difference(settings.ignore_accounts)
+        associations = Slurm.association_snapshot()
+
+        for cluster in sorted(Slurm.cluster_names()):
+            try:
+                partitions = Slurm.partition_names(cluster)
+
+            except CmdError:
+                LOG.warning(f'Skipping cluster {cluster} since its partitions could not be retrieved')
+                continue
+
+            # Determine which accounts are unlocked on the cluster
+            # Accounts with a purchased partition are named in the partition name (e.g., eschneider-mpi)
+            accounts_to_lock = []
+            for account in sorted(expired_accounts):
+                grp_tres_run_mins = associations.get(account, dict()).get(cluster, dict()).get('GrpTRESRunMins')
+                if grp_tres_run_mins is None or 'billing=0' in grp_tres_run_mins:
+                    continue
+
+                if any(account in partition for partition in partitions):
+                    LOG.info(f"{account} is not locked on {cluster} because it has an investment partition")
+                    continue
+
+                accounts_to_lock.append(account)
+
+            if dry_run:
+                print(f'{cluster}: would lock {len(accounts_to_lock)} accounts', *accounts_to_lock, sep='\n    ')
+                continue
+
+            if accounts_to_lock:
+                Slurm.set_locked_state(accounts_to_lock, True, cluster)
+
+            print(f'{cluster}: locked {len(accounts_to_lock)} accounts')
+
+    @classmethod
+    def reset_raw_usage(cls, accounts: Optional[Collection[str]] = None, all_accounts: bool = False) -> None:
+        """Reset the raw usage of multiple accounts to zero on all clusters
+
+        Accounts are reset using batched ``sacctmgr`` calls, printing progress after each batch.
+        Accounts that do not exist in Slurm are skipped, as are accounts listed in the
+        ``ignore_accounts`` setting when resetting all accounts.
+
+        ``GrpTRESMins`` limits include the raw usage at the time they were set (see
+        ``sync_limits``), so limits of reset accounts that have one are synchronized again.
+
+        Args:
+            accounts: Names of the accounts to reset
+            all_accounts: Reset every Slurm account instead of the given accounts
+        """
+
+        associations = Slurm.association_snapshot()
+        if all_accounts:
+            accounts = set(associations).difference(settings.ignore_accounts)
+
+        accounts = set(accounts or ())
+        unknown_accounts = accounts.difference(associations)
+        if unknown_accounts:
+            LOG.warning(f"Skipping accounts that do not exist in Slurm: {', '.join(sorted(unknown_accounts))}")
+            accounts -= unknown_accounts
+
+        clusters = sorted(Slurm.cluster_names().intersection(settings.clusters))
+        if not (accounts and clusters):
+            print('No accounts or clusters to reset')
+            return
+
+        start = time.perf_counter()
+
+        def report_progress(num_reset: int, num_total: int) -> None:
+            print(f'Reset {num_reset}/{num_total} accounts ({time.perf_counter() - start:.2f} s)')
+
+        Slurm.reset_raw_usage(accounts, clusters, progress=report_progress)
+        print(f'Reset raw usage for {len(accounts)} accounts on {len(clusters)} clusters '
+              f'in {time.perf_counter() - start:.2f} s')
+
+        limited_accounts = {
+            account for account in accounts
+            if any('billing=' in association.get('GrpTRESMins', '') for association in associations[account].values())
+        }
+
+        if limited_accounts:
+            cls.sync_limits(accounts=limited_accounts)
+
+    @staticmethod
+    def _get_remaining_sus() -> Dict[str, Dict[str, int]]:
+        """Return the service units available to each account on every cluster
+
+        The service units available on a cluster include the unused service units of
+        the cluster allocation, any floating allocation, and all active investments.
+
+        Floating and investment service units are shared between clusters but are
+        included in full for every cluster. This deliberately over-approximates the
+        balance of accounts running on several clusters at once, which can overspend
+        the shared service units until the next status update locks the account.
+
+        Returns:
+            A dictionary mapping account names to the available service units on each cluster
+        """
+
+        allocation_query = select(Account.name, Allocation.cluster_name,
+                                  func.sum(Allocation.service_units_total - Allocation.service_units_used)) \
+            .join(Proposal, Proposal.account_id == Account.id) \
+            .join(Allocation, Allocation.proposal_id == Proposal.id) \
+            .where(Proposal.is_active) \
+            .group_by(Account.name, Allocation.cluster_name)
+
+        investment_query = select(Account.name, func.sum(Investment.current_sus)) \
+            .join(Investment, Investment.account_id == Account.id) \
+            .where(Investment.is_active) \
+            .group_by(Account.name)
+
+        with DBConnection.session() as session:
+            account_names = session.execute(select(Account.name)).scalars().all()
+            allocations = session.execute(allocation_query).all()
+            investment_sus = dict(session.execute(investment_query).all())
+
+        allocation_sus = {name: dict() for name in account_names}
+        for name, cluster, remaining in allocations:
+            allocation_sus[name][cluster] = max(remaining, 0)
+
+        remaining_sus = dict()
+        for name, cluster_sus in allocation_sus.items():
+            shared_sus = cluster_sus.get('all_clusters', 0) + max(investment_sus.get(name) or 0, 0)
+            remaining_sus[name] = {cluster: cluster_sus.get(cluster, 0) + shared_sus for cluster in settings.clusters}
+
+        return remaining_sus
+
+    @staticmethod
+    def _get_uncharged_seconds(cluster: str) -> Dict[str, int]:
+        """Return the usage of every account on a cluster that Slurm recorded but the bank has not charged yet
+
+        When usage ingestion is enabled, jobs that are still running or ended after
+        the cluster watermark are not charged yet, along with any left over seconds
+        carried forward between ingestions. Otherwise, usage since midnight is
+        charged by the next daily status update.
+
+        Args:
+            cluster: The name of the cluster
+
+        Returns:
+            A dictionary mapping account names to billed seconds
+
+        Raises:
+            CmdError: If the ``sacct`` command errors out
+        """
+
+        midnight = datetime.combine(date.today(), datetime.min.time())
+        since = count_from = midnight
+        uncharged = dict()
+
+        if settings.usage_ingestion:
+            remainder_query = select(UsageRemainder.account_name, UsageRemainder.seconds) \
+                .where(UsageRemainder.cluster == cluster)
+
+            with DBConnection.session() as session:
+                watermark = session.get(UsageWatermark, cluster)
+                uncharged = dict(session.execute(remainder_query).all())
+
+            if watermark is not None:
+                since, count_from = watermark.watermark, watermark.started
+
+        for account, seconds in SacctUsage.usage_after(cluster, since, count_from).items():
+            uncharged[account] = uncharged.get(account, 0) + seconds
+
+        return uncharged
+
+    @classmethod
+    def sync_limits(cls, dry_run: bool = False, accounts: Optional[Collection[str]] = None) -> None:
+        """Set the ``GrpTRESMins`` limit of every account so Slurm rejects jobs exceeding the available service units
+
+        Slurm checks ``GrpTRESMins`` against the billing minutes counted against the
+        account (the ``GrpTRESRaw`` value reported by ``sshare``), which includes usage
+        not yet charged by the bank. Each limit is therefore set to the billing minutes
+        that were already charged plus the remaining service units in minutes. Limits
+        are only changed when they differ from the current value by more than the
+        ``limit_sync_tolerance`` setting. Accounts listed in the ``ignore_accounts``
+        setting or with a purchased partition on a cluster are skipped.
+
+        See ``_get_remaining_sus`` for how service units shared between clusters are counted.
+
+        Args:
+            dry_run: Print the limits that would be changed without changing them
+            accounts: Only update the limits of the given accounts (defaults to all accounts)
+        """
+
+        remaining_sus = cls._get_remaining_sus()
+        associations = Slurm.association_snapshot()
+        account_names = set(remaining_sus).difference(settings.ignore_accounts)
+        if accounts is not None:
+            account_names.intersection_update(accounts)
+
+        for cluster in sorted(Slurm.cluster_names().intersection(settings.clusters)):
+            try:
+                partitions = Slurm.partition_names(cluster)
+                minutes_used = Slurm.billing_minutes_used(cluster)
+                uncharged_seconds = cls._get_uncharged_seconds(cluster)
+
+            except CmdError:
+                LOG.warning(f'Skipping cluster {cluster} since its partitions or usage could not be retrieved')
+                continue
+
+            limits = dict()
+            for account in sorted(account_names):
+                association = associations.get(account, dict()).get(cluster)
+                if association is None or any(account in partition for partition in partitions):
+                    continue
+
+                charged_minutes = max(minutes_used.get(account, 0) - ceil(uncharged_seconds.get(account, 0) / 60), 0)
+                limit = charged_minutes + 60 * remaining_sus[account][cluster]
+                grp_tres_mins = association.get('GrpTRESMins', '')
+                current = dict(item.partition('=')[::2] for item in grp_tres_mins.split(',') if item)
+                if 'billing' in current and abs(int(current['billing']) - limit) <= settings.limit_sync_tolerance:
+                    continue
+
+                limits[account] = limit
+
+            if dry_run:
+                print(f'{cluster}: would update {len(limits)} limits',
+                      *(f'{account}: billing={limit}' for account, limit in limits.items()), sep='\n    ')
+                continue
+
+            if limits:
+                Slurm.set_billing_minutes_limits(limits, cluster)
+
+            print(f'{cluster}: updated {len(limits)} limits')
+
+    @staticmethod
+    def notify_all() -> None:
+        """Send any pending usage alerts to every account with an active proposal
+
+        All messages are sent over a single SMTP connection that is reopened
+        periodically (see the ``smtp_max_messages`` setting). Failing to notify
+        one account does not prevent other accounts from being notified, and
+        each account's notification state is committed separately.
+        """
+
+        account_names_query = select(Account.name) \
+            .where(Account.proposals.any(Proposal.is_active)) \
+            .where(Account.name.not_in(settings.ignore_accounts)) \
+            .order_by(Account.name)
+
+        with DBConnection.session() as session:
+            account_names = session.execute(account_names_query).scalars().all()
+
+        num_failed = 0
+        with SMTPSession() as smtp:
+            for progress, name in enumerate(account_names, start=1):
+                LOG.info(f"Sending notifications for {name} ({progress}/{len(account_names)})")
+                try:
+                    with DBConnection.unit_of_work():
+                        AccountServices(name).notify(smtp=smtp)
+
+                except Exception as exception:
+                    LOG.exception(f"Could not send notifications for {name}: {exception}")
+                    num_failed += 1
+
+        print(f'Sent {smtp.messages_sent} notifications for {len(account_names)} accounts ({num_failed} failed)')
+
+    @staticmethod
+    def send_mail(limit: Optional[int] = None) -> None:
+        """Deliver email messages spooled in the database outbox
+
+        Messages are delivered in batches over a single SMTP connection, and the
+        delivery status of each batch is committed before the next batch begins.
+        Delivery is throttled by the ``email_rate_limit`` setting. Failed messages
+        are retried with an increasing delay until ``email_max_attempts`` is reached.
+
+        Args:
+            limit: Maximum number of messages to deliver (defaults to all pending messages)
+        """
+
+        from email import message_from_string, policy
+
+        min_interval = 1 / settings.email_rate_limit if settings.email_rate_limit > 0 else 0
+        next_send_time = time.monotonic()
+        num_sent = num_failed = 0
+
+        with SMTPSession() as smtp:
+            while limit is None or num_sent + num_failed < limit:
+                batch_size = settings.email_batch_size
+                if limit is not None:
+                    batch_size = min(batch_size, limit - num_sent - num_failed)
+
+                pending_query = select(Outbox) \
+                    .where(Outbox.sent.is_(None)) \
+                    .where(Outbox.attempts < settings.email_max_attempts) \
+                    .where(Outbox.next_attempt <= datetime.now()) \
+                    .order_by(Outbox.id) \
+                    .limit(batch_size)
+
+                # Commit delivery status independently of the calling command so progress is never lost
+                with DBConnection.session(shared=False) as session:
+                    messages = session.execute(pending_query).scalars().all()
+                    if not messages:
+                        break
+
+                    for message in messages:
+                        time.sleep(max(0.0, next_send_time - time.monotonic()))
+                        next_send_time = max(next_send_time, time.monotonic()) + min_interval
+
+                        try:
+                            smtp.send_message(message_from_string(message.message, policy=policy.default))
+
+                        except Exception as exception:
+                            LOG.warning(f"Could not deliver message {message.id} to {message.recipient}: {exception}")
+                            message.attempts += 1
+                            message.last_error = str(exception)
+                            retry_delay = settings.email_retry_delay * 2 ** (message.attempts - 1)
+                            message.next_attempt = datetime.now() + timedelta(seconds=retry_delay)
+                            num_failed += 1
+
+                        else:
+                            message.sent = datetime.now()
+                            num_sent += 1
+
+                    session.commit()
+
+        LOG.info(f"Delivered {num_sent} spooled messages ({num_failed} failed)")
+        print(f'Delivered {num_sent} spooled messages ({num_failed} failed)')
+
     @classmethod
     def update_account_status(cls) -> None:
-        """Update account usage information and lock any expired or overdrawn accounts"""
+        """Update account usage information and lock any expired or overdrawn accounts
+
+        Each account is updated in its own transaction, so changes to accounts
+        that were already updated are kept if a later account fails.
+
+        Raises:
+            ValueError: If usage ingestion is disabled and the configured usage source ignores date ranges
+        """
+
+        # Usage over the last day is charged unless it is charged as jobs complete
+        if not settings.usage_ingestion:
+            windowed_usage_source()
 
         # Log start of update status
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -1188,20 +2051,43 @@ class AdminServices:
         for name_set in unlocked_accounts_by_cluster.values():
             account_names = account_names.union(name_set)
 
+        # Gather usage over the last day for all accounts at once
+        end_date = date.today()
+        start_date = end_date - timedelta(days=1)
+
+        if settings.usage_ingestion:
+            # Usage is charged as jobs complete by the ``ingest_usage`` method
+            usage_by_account = dict()
+
+        else:
+            LOG.info(f"Gathering usage for all accounts...")
+            usage_by_account = cls._get_usage_by_account(start_date, end_date)
+
+        if usage_by_account is not None:
+            pending_changes = cls._get_accounts_with_pending_changes(start_date, end_date)
+            idle_accounts = account_names - set(usage_by_account) - pending_changes
+            LOG.info(f"Skipping {len(idle_accounts)} accounts without usage or pending changes")
+            account_names -= idle_accounts
+
         # Set up progress indicator for log
         num_accounts = len(account_names)
         progress = 0
 
         # Update the status of any unlocked account
-        for name in account_names:
+        for name in sorted(account_names):
             progress += 1
-            #TODO: maintain this whitelist in settings?
-            if name in ["root", "clcgenomics"]:
+            if name in settings.ignore_accounts:
                 continue
             try:
                 LOG.info(f"Updating status for {name}...")
-                account = AccountServices(name)
-                account.update_status()
+                with DBConnection.unit_of_work():
+                    account = AccountServices(name)
+                    if usage_by_account is None:
+                        account.update_status()
+
+                    else:
+                        account.update_status(usage=usage_by_account.get(name, dict()))
+
             except AccountNotFoundError:
                 LOG.info(f"SLURM Account does not exist for {name}")
                 continue
@@ -1212,3 +2098,71 @@ class AdminServices:
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         LOG.info(f"FINISHED Update_status {now}")
 
+    @classmethod
+    def ingest_usage(cls) -> None:
+        """Charge usage from jobs that completed since the previous ingestion and lock overdrawn accounts
+
+        Completed jobs are read from ``sacct`` starting at the watermark stored
+        for each cluster. The watermark then advances to the current time, less
+        the ``usage_ingestion_delay`` setting, so jobs whose accounting records
+        are still on their way to the Slurm database are picked up by a later
+        ingestion. Usage is charged in whole service units, and left over seconds
+        are carried forward to the next ingestion. Charges, remainders, and
+        watermarks are committed as a single transaction.
+
+        Clusters without a watermark start from midnight, where the last daily
+        usage report ends. Time that jobs ran before ingestion started on a
+        cluster was already charged by daily reports and is not charged again.
+        See the ``usage_ingestion`` setting.
+        """
+
+        until = datetime.now().replace(microsecond=0) - timedelta(seconds=settings.usage_ingestion_delay)
+        usage_by_account = dict()
+
+        with DBConnection.unit_of_work() as session:
+            watermarks = {row.cluster: row for row in session.execute(select(UsageWatermark)).scalars()}
+            remainders = {(row.account_name, row.cluster): row for row in session.execute(select(UsageRemainder)).scalars()}
+
+            for cluster in sorted(Slurm.cluster_names().intersection(settings.clusters)):
+                watermark = watermarks.get(cluster)
+                if watermark is None:
+                    midnight = datetime.combine(date.today(), datetime.min.time())
+                    watermark = UsageWatermark(cluster=cluster, watermark=midnight, started=midnight)
+                    session.add(watermark)
+
+                # The watermark never moves backwards, e.g., shortly after ingestion starts at midnight
+                if until <= watermark.watermark:
+                    continue
+
+                LOG.info(f"Ingesting jobs on {cluster} that ended after {watermark.watermark}")
+                seconds_by_account = dict()
+                completed_jobs = SacctUsage.iter_completed_jobs(cluster, watermark.watermark, until, watermark.started)
+                for account_name, _, seconds in completed_jobs:
+                    seconds_by_account[account_name] = seconds_by_account.get(account_name, 0) + seconds
+
+                for account_name, seconds in seconds_by_account.items():
+                    remainder = remainders.get((account_name, cluster))
+                    if remainder is None:
+                        remainder = UsageRemainder(account_name=account_name, cluster=cluster, seconds=0)
+                        remainders[account_name, cluster] = remainder
+                        session.add(remainder)
+
+                    hours, remainder.seconds = divmod(remainder.seconds + seconds, 3600)
+                    if hours:
+                        usage_by_account.setdefault(account_name, dict())[cluster] = hours
+
+                watermark.watermark = until
+
+            for name, usage in sorted(usage_by_account.items()):
+                if name in settings.ignore_accounts:
+                    continue
+
+                try:
+                    LOG.info(f"Charging {sum(usage.values())} SUs to {name}...")
+                    AccountServices(name).update_status(usage=usage)
+
+                except AccountNotFoundError:
+                    LOG.info(f"SLURM Account does not exist for {name}")
+
+        LOG.info(f"Charged usage to {len(usage_by_account)} accounts for jobs ending up to {until}")
+
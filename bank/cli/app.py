@@ -2,45 +2,120 @@
 the application from the commandline.
 """
 
-from bank import __version__
+import sys
+from typing import Collection, List, Optional, Set
+
+from bank import __version__, configure_logging, settings
+from bank.daemon import DaemonClient
 from .parsers import AdminParser, AccountParser, ProposalParser, InvestmentParser, BaseParser
 
 
 class CommandLineApplication:
     """Commandline application used as the primary entry point for the parent application"""
 
-    def __init__(self):
-        """Initialize the application's commandline interface"""
+    # Application subparsers and their help text, keyed by command name
+    commands = {
+        'admin': (AdminParser, 'tools for general system administration'),
+        'account': (AccountParser, 'tools for managing individual accounts'),
+        'proposal': (ProposalParser, 'administrative tools for user proposals'),
+        'investment': (InvestmentParser, 'administrative tools for user investments'),
+    }
+
+    # Commands that operate on many accounts and commit changes for each account separately
+    batch_commands = {'admin'}
+
+    def __init__(self, commands: Optional[Collection[str]] = None):
+        """Initialize the application's commandline interface
+
+        Building a subparser may require querying Slurm and importing the
+        underlying service. Subparsers for commands not listed in ``commands``
+        are still available by name, but do not define any arguments.
+
+        Args:
+            commands: Names of the commands to build subparsers for (defaults to all commands)
+        """
 
         self.parser = BaseParser()
         self.parser.add_argument('--version', action='version', version=__version__)
         self.subparsers = self.parser.add_subparsers(parser_class=BaseParser, required=True)
 
         # Add each application subparser with appropriate help text
-        self.subparsers.add_parser(
-            name='admin',
-            parents=[AdminParser(add_help=False)],
-            help='tools for general system administration')
-
-        self.subparsers.add_parser(
-            name='account',
-            parents=[AccountParser(add_help=False)],
-            help='tools for managing individual accounts')
-
-        self.subparsers.add_parser(
-            name='proposal',
-            parents=[ProposalParser(add_help=False)],
-            help='administrative tools for user proposals')
-
-        self.subparsers.add_parser(
-            name='investment',
-            parents=[InvestmentParser(add_help=False)],
-            help='administrative tools for user investments')
+        for name, (parser_class, help_text) in self.commands.items():
+            parents = []
+            if commands is None or name in commands:
+                parents.append(parser_class(add_help=False))
+
+            self.subparsers.add_parser(name=name, parents=parents, help=help_text)
 
     @classmethod
-    def execute(cls) -> None:
-        """Parse commandline arguments and execute a new instance of the application."""
+    def _selected_commands(cls, args: List[str]) -> Set[str]:
+        """Return the name of the command selected by the given commandline arguments
+
+        Args:
+            args: Commandline arguments passed to the application
+
+        Returns:
+            A set with the selected command name or an empty set if no valid command was selected
+        """
+
+        positional = next((arg for arg in args if not arg.startswith('-')), None)
+        return {positional} if positional in cls.commands else set()
+
+    @classmethod
+    def run(cls, args: List[str]) -> None:
+        """Parse the given commandline arguments and execute the selected command
+
+        Only the subparser for the selected command is built. All database
+        operations performed by the command are committed as a single transaction,
+        except for batch commands (see ``batch_commands``) which manage their own
+        transactions so a failure for one account does not discard changes to others.
+
+        Args:
+            args: Commandline arguments passed to the application
+        """
 
-        cli_kwargs = vars(cls().parser.parse_args())
+        configure_logging()
+        selected_commands = cls._selected_commands(args)
+
+        # Commands that never reach a subparser (e.g. ``--version``) do not need a database connection
+        # and batch commands open a unit of work per account
+        if not selected_commands or selected_commands & cls.batch_commands:
+            cls._parse_and_execute(args, selected_commands)
+            return
+
+        # Imported here to avoid loading the database layer for commands that do not use it
+        from bank.orm import DBConnection
+
+        with DBConnection.unit_of_work():
+            cls._parse_and_execute(args, selected_commands)
+
+    @classmethod
+    def _parse_and_execute(cls, args: List[str], commands: Collection[str]) -> None:
+        """Parse the given commandline arguments and execute the selected command
+
+        Args:
+            args: Commandline arguments passed to the application
+            commands: Names of the commands to build subparsers for
+        """
+
+        app = cls(commands=commands)
+        cli_kwargs = vars(app.parser.parse_args(args))
         executable = cli_kwargs.pop('function')
         executable(**cli_kwargs)
+
+    @classmethod
+    def execute(cls) -> None:
+        """Parse commandline arguments and execute a new instance of the application.
+
+        Commands are forwarded to the bank daemon instead when it is running.
+        Batch commands are always executed locally since the daemon serves
+        one request at a time.
+        """
+
+        args = sys.argv[1:]
+        if not cls._selected_commands(args) & cls.batch_commands:
+            status = DaemonClient(settings.daemon_socket).forward(args)
+            if status is not None:
+                raise SystemExit(status)
+
+        cls.run(args)
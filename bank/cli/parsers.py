@@ -1,6 +1,9 @@
 """The ``cli.parsers`` module defines commandline parsers used to build the
 application's commandline interface. Individual parsers are designed around
 different services provided by the banking app.
+
+Each parser imports the service it wraps when it is instantiated. This allows
+the commandline application to only load the services needed by a given command.
 """
 import sys
 from argparse import ArgumentParser, BooleanOptionalAction, Namespace
@@ -8,7 +11,6 @@ from datetime import datetime
 from typing import List, Tuple
 
 from bank import settings
-from bank.account_logic import AdminServices, AccountServices, ProposalServices, InvestmentServices
 from bank.system import Slurm
 from .types import Date, NonNegativeInt
 
@@ -67,6 +69,8 @@ class AdminParser(BaseParser):
     def __init__(self, *args, **kwargs) -> None:
         """Define the commandline interface"""
 
+        from bank.account_logic import AdminServices
+
         super().__init__(*args, **kwargs)
         subparsers = self.add_subparsers(parser_class=BaseParser, required=True)
 
@@ -83,6 +87,75 @@ class AdminParser(BaseParser):
             help='close expired allocations and lock accounts without available SUs')
         update_status.set_defaults(function=AdminServices.update_account_status)
 
+        # Charge usage from recently completed jobs
+        ingest_usage = subparsers.add_parser(
+            name='ingest_usage',
+            help='charge usage from jobs completed since the last ingestion and lock accounts without available SUs')
+        ingest_usage.set_defaults(function=AdminServices.ingest_usage)
+
+        # Send pending usage alerts to all accounts
+        notify = subparsers.add_parser('notify', help='send pending usage alerts to all accounts with an active proposal')
+        notify.set_defaults(function=AdminServices.notify_all)
+
+        # Deliver spooled email messages
+        send_mail = subparsers.add_parser('send_mail', help='deliver user alerts spooled in the database outbox')
+        send_mail.add_argument(
+            '--limit',
+            metavar='N',
+            type=NonNegativeInt,
+            help='deliver at most N messages - defaults to all pending messages')
+        send_mail.set_defaults(function=AdminServices.send_mail)
+
+        # Lock accounts without an active proposal or investment
+        sweep_expired = subparsers.add_parser(
+            name='sweep_expired',
+            help='lock all accounts without an active proposal or investment')
+        sweep_expired.add_argument(
+            '--dry-run',
+            action=BooleanOptionalAction,
+            default=False,
+            help='print the accounts to lock without locking them - default is False')
+        sweep_expired.set_defaults(function=AdminServices.sweep_expired)
+
+        # Push available service units into Slurm limits
+        sync_limits = subparsers.add_parser(
+            name='sync_limits',
+            help='set GrpTRESMins limits so Slurm rejects jobs exceeding the available SUs of each account')
+        sync_limits.add_argument(
+            '--dry-run',
+            action=BooleanOptionalAction,
+            default=False,
+            help='print the limits to update without updating them - default is False')
+        sync_limits.set_defaults(function=AdminServices.sync_limits)
+
+        # Reset raw usage for many accounts at once
+        reset_raw_usage = subparsers.add_parser(
+            name='reset_raw_usage',
+            help='reset the raw usage of multiple accounts to zero on all clusters')
+        reset_accounts = reset_raw_usage.add_mutually_exclusive_group(required=True)
+        reset_accounts.add_argument(
+            '--all',
+            dest='all_accounts',
+            action='store_true',
+            help='reset every Slurm account except those ignored in application settings')
+        reset_accounts.add_argument(
+            '--accounts',
+            metavar='ACCOUNT',
+            nargs='+',
+            help='names of the accounts to reset')
+        reset_raw_usage.set_defaults(function=AdminServices.reset_raw_usage)
+
+        # Roll over service units from expired investments
+        rollover_investments = subparsers.add_parser(
+            name='rollover_investments',
+            help='carry over unused service units from expired investments into the following investment')
+        rollover_investments.add_argument(
+            '--dry-run',
+            action=BooleanOptionalAction,
+            default=False,
+            help='print the rollovers without applying them - default is False')
+        rollover_investments.set_defaults(function=AdminServices.rollover_investments)
+
         # List locked accounts
         list_locked = subparsers.add_parser('list_locked', help='list all locked accounts')
         list_locked.add_argument('--cluster', **cluster_argument, required=True)
@@ -103,6 +176,8 @@ class AccountParser(BaseParser):
     def __init__(self, *args, **kwargs) -> None:
         """Define the commandline interface"""
 
+        from bank.account_logic import AccountServices
+
         super().__init__(*args, **kwargs)
         subparsers = self.add_subparsers(parser_class=BaseParser, required=True)
 
@@ -156,6 +231,8 @@ class ProposalParser(BaseParser):
     def __init__(self, *args, **kwargs) -> None:
         """Define the commandline interface"""
 
+        from bank.account_logic import ProposalServices
+
         super().__init__(*args, **kwargs)
         subparsers = self.add_subparsers(parser_class=BaseParser, required=True)
 
@@ -197,6 +274,18 @@ class ProposalParser(BaseParser):
         )
         self._add_cluster_args(create_parser)
 
+        # Bulk proposal creation
+        import_parser = subparsers.add_parser('import', help='create proposals for multiple accounts from a file')
+        import_parser.set_defaults(function=ProposalServices.create_from_file)
+        import_parser.add_argument(
+            dest='path',
+            metavar='file',
+            help='CSV or JSON file with the fields account, and optionally start, end, and a field per cluster')
+        import_parser.add_argument(
+            '--force',
+            action=BooleanOptionalAction,
+            help='boolean flag for whether or not to create proposals with overlapping date ranges - default is False')
+
         # Proposal deletion
         delete_parser = subparsers.add_parser('delete', help='delete an existing proposal')
         delete_parser.set_defaults(function=ProposalServices.delete)
@@ -268,6 +357,8 @@ class InvestmentParser(BaseParser):
     def __init__(self, *args, **kwargs) -> None:
         """Define the commandline interface"""
 
+        from bank.account_logic import InvestmentServices
+
         super().__init__(*args, **kwargs)
         subparsers = self.add_subparsers(parser_class=BaseParser, required=True)
 
@@ -315,6 +406,14 @@ class InvestmentParser(BaseParser):
             type=Date,
             help=f'investment end date ({safe_date_format}) - defaults to 1 year from today')
 
+        # Bulk investment creation
+        import_parser = subparsers.add_parser('import', help='create investments for multiple accounts from a file')
+        import_parser.set_defaults(function=InvestmentServices.create_from_file)
+        import_parser.add_argument(
+            dest='path',
+            metavar='file',
+            help='CSV or JSON file with the fields account, sus, and optionally start, end, and num_inv')
+
         # Investment deletion
         delete_parser = subparsers.add_parser('delete', help='delete an existing investment')
         delete_parser.set_defaults(function=InvestmentServices.delete)
@@ -0,0 +1,348 @@
+"""The ``daemon`` module defines a long-running server process that keeps
+the application database connection and Slurm lookups warm between
+commandline calls.
+
+When the daemon is running, commandline calls are forwarded to it over a
+local Unix socket (see the ``daemon_socket`` setting) and executed within
+the daemon process. Requests are served one at a time, so long-running
+batch commands (e.g., ``admin update_status``) are never forwarded. If the
+daemon cannot be reached, or does not accept a request within the
+``daemon_timeout`` setting, commands are executed in the calling process
+as usual.
+
+Cached cluster and partition names are refreshed periodically as defined
+by the ``daemon_cache_ttl`` setting. Account associations, which include
+the lock state of each account, are re-read for every forwarded command.
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import struct
+import sys
+import time
+import traceback
+import warnings
+from argparse import ArgumentParser
+from contextlib import redirect_stderr, redirect_stdout
+from functools import partial
+from io import StringIO
+from logging import getLogger
+from socketserver import StreamRequestHandler, UnixStreamServer
+from typing import List, Optional
+
+from . import configure_logging, settings
+from .system import Slurm, acting_as
+
+LOG = getLogger('bank.daemon')
+
+# Line sent by the daemon once it is ready to receive a request
+READY = b'ready\n'
+
+
+class DaemonRequestHandler(StreamRequestHandler):
+    """Handle a single forwarded commandline call"""
+
+    def handle(self) -> None:
+        """Execute the forwarded command and reply with its output and exit status"""
+
+        uid = self.server.peer_uid(self.request)
+        if not self.server.is_authorized(uid):
+            LOG.warning('Refused connection from an unauthorized user')
+            return
+
+        # Clients only send a request after the daemon signals it is ready
+        # so requests are never queued behind a long-running command
+        try:
+            self.wfile.write(READY)
+            self.wfile.flush()
+
+        except OSError:
+            return
+
+        # Connections are also opened without a request to check whether the daemon is running
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        request = json.loads(line)
+        response = self.server.run_command(request['argv'], request['cwd'], uid)
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class BankDaemon(UnixStreamServer):
+    """Serve commandline calls over a local Unix socket
+
+    Requests are handled one at a time in the order they are received.
+    """
+
+    def __init__(self, socket_path: str, cache_ttl: float = settings.daemon_cache_ttl) -> None:
+        """Bind a new server to the given socket path
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+            cache_ttl: Number of seconds before cached Slurm data is refreshed
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket
+        """
+
+        self.socket_path = socket_path
+        self.cache_ttl = cache_ttl
+        self._cache_time = time.monotonic()
+        super().__init__(socket_path, DaemonRequestHandler)
+
+    def server_bind(self) -> None:
+        """Bind the socket and restrict access to the current user"""
+
+        if os.path.exists(self.socket_path):
+            if DaemonClient(self.socket_path).is_running():
+                raise RuntimeError(f'A daemon is already listening on {self.socket_path}')
+
+            LOG.info(f'Removing stale socket file {self.socket_path}')
+            os.remove(self.socket_path)
+
+        # Create the socket file with owner-only permissions
+        previous_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+
+        finally:
+            os.umask(previous_umask)
+
+    def server_close(self) -> None:
+        """Close the server and remove the socket file"""
+
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    @staticmethod
+    def peer_uid(request: socket.socket) -> Optional[int]:
+        """Return the user ID of the connected peer
+
+        Args:
+            request: The socket connected to the peer process
+
+        Returns:
+            The peer's user ID or ``None`` if peer credentials are not available on this platform
+        """
+
+        if not hasattr(socket, 'SO_PEERCRED'):
+            return None
+
+        credentials = request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credentials)
+        return uid
+
+    @staticmethod
+    def is_authorized(uid: Optional[int]) -> bool:
+        """Return whether the connected peer is allowed to run commands
+
+        Only the root user and the user running the daemon are authorized.
+
+        Args:
+            uid: The peer's user ID as returned by ``peer_uid``
+        """
+
+        # Without peer credentials we rely on the permissions of the socket file
+        if uid is None:
+            return True
+
+        return uid in (0, os.geteuid())
+
+    def warm_cache(self) -> None:
+        """Populate cached cluster and partition names ahead of incoming requests"""
+
+        LOG.info('Warming Slurm cache')
+        for cluster in Slurm.cluster_names():
+            Slurm.partition_names(cluster)
+
+        self._cache_time = time.monotonic()
+
+    @staticmethod
+    def _show_warning(stream: StringIO, message, category, filename, lineno, file=None, line=None) -> None:
+        """Write a warning to the given stream, replacing ``warnings.showwarning``"""
+
+        stream.write(warnings.formatwarning(message, category, filename, lineno, line))
+
+    def run_command(self, argv: List[str], cwd: str, uid: Optional[int] = None) -> dict:
+        """Execute a commandline call and capture its output
+
+        Privilege checks made by the command (see ``bank.system.identity``) apply
+        to the user ID of the calling process rather than the daemon's own. Every
+        warning raised by the command is reported, as it would be in a new process.
+
+        Args:
+            argv: Commandline arguments passed to the application
+            cwd: Working directory of the calling process
+            uid: User ID of the calling process
+
+        Returns:
+            A dictionary with the exit status and the text written to STDOUT and STDERR
+        """
+
+        # Import here to avoid a circular import with the commandline application
+        from .cli.app import CommandLineApplication
+
+        # Associations carry the lock state of each account, which may change between requests
+        Slurm.association_snapshot.cache_clear()
+        if time.monotonic() - self._cache_time > self.cache_ttl:
+            LOG.info('Refreshing cached Slurm data')
+            Slurm.clear_cache()
+            self._cache_time = time.monotonic()
+
+        LOG.info(f'Running forwarded command {argv}')
+        stdout, stderr = StringIO(), StringIO()
+        status = 0
+        previous_cwd = os.getcwd()
+
+        try:
+            os.chdir(cwd)
+            with redirect_stdout(stdout), redirect_stderr(stderr), acting_as(uid), warnings.catch_warnings():
+                # Report every warning to the caller, as the first occurrence would be in a new process
+                warnings.simplefilter('always')
+                warnings.showwarning = partial(self._show_warning, stderr)
+                CommandLineApplication.run(argv)
+
+        # Mirror how the interpreter reports exit codes and uncaught exceptions
+        except SystemExit as exit_call:
+            if isinstance(exit_call.code, int) or exit_call.code is None:
+                status = exit_call.code or 0
+
+            else:
+                stderr.write(f'{exit_call.code}\n')
+                status = 1
+
+        except Exception:
+            stderr.write(traceback.format_exc())
+            status = 1
+
+        finally:
+            os.chdir(previous_cwd)
+
+        return {'status': status, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+    @classmethod
+    def execute(cls) -> None:
+        """Parse commandline arguments and serve requests until interrupted"""
+
+        parser = ArgumentParser(description='Serve banking commands over a local Unix socket.')
+        parser.add_argument('--socket', default=settings.daemon_socket, help='path of the Unix socket to listen on')
+        args = parser.parse_args()
+
+        configure_logging()
+        with cls(args.socket) as daemon:
+            daemon.warm_cache()
+            LOG.info(f'Listening on {args.socket}')
+            try:
+                daemon.serve_forever()
+
+            except KeyboardInterrupt:
+                LOG.info('Shutting down')
+
+
+class DaemonClient:
+    """Forward commandline calls to a running daemon"""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = settings.daemon_socket,
+        timeout: float = settings.daemon_timeout
+    ) -> None:
+        """Communicate with the daemon listening on the given socket
+
+        Args:
+            socket_path: Path of the daemon's Unix socket
+            timeout: Number of seconds to wait for the daemon to accept a request
+        """
+
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _connect(self) -> Optional[socket.socket]:
+        """Return a socket connected to the daemon or ``None`` if the daemon cannot be reached"""
+
+        if not (self.socket_path and os.path.exists(self.socket_path)):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+
+        except OSError:
+            sock.close()
+            return None
+
+        return sock
+
+    def is_running(self) -> bool:
+        """Return whether a daemon is accepting connections on the socket"""
+
+        sock = self._connect()
+        if sock is None:
+            return False
+
+        sock.close()
+        return True
+
+    def forward(self, argv: List[str]) -> Optional[int]:
+        """Execute a commandline call within the daemon process
+
+        Output from the forwarded command is written to STDOUT and STDERR
+        of the current process.
+
+        Args:
+            argv: Commandline arguments to pass to the application
+
+        Returns:
+            The exit status of the command or ``None`` if the daemon could not be reached or is busy
+        """
+
+        sock = self._connect()
+        if sock is None:
+            return None
+
+        with sock:
+            # The daemon refuses unauthorized users by closing the connection without signaling it is ready
+            try:
+                reader = sock.makefile('rb')
+                if reader.readline() != READY:
+                    return None
+
+            except OSError:
+                LOG.info('The bank daemon did not accept the request in time, running locally')
+                return None
+
+            # Commands may take longer than the daemon takes to accept them
+            sock.settimeout(None)
+            try:
+                sock.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode() + b'\n')
+                sock.shutdown(socket.SHUT_WR)
+
+            # The command was never received, so it is safe to run it locally instead
+            except OSError:
+                return None
+
+            # Once sent, the command may have run and should not be repeated locally
+            try:
+                data = reader.read()
+                response = json.loads(data) if data else None
+
+            except (OSError, ValueError):
+                sys.stderr.write('Lost connection to the bank daemon before receiving a response\n')
+                return 1
+
+        # The daemon closes the connection without a reply when it refuses to run a command
+        if response is None:
+            return None
+
+        sys.stdout.write(response['stdout'])
+        sys.stderr.write(response['stderr'])
+        return response['status']
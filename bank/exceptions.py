@@ -40,3 +40,7 @@ class MissingInvestmentError(Exception):
 
 class InvestmentExistsError(Exception):
     """Raised when trying to create an investment that already exists."""
+
+
+class CmdNotRecordedError(Exception):
+    """Raised when replaying a shell command that is missing from the recording."""
@@ -4,12 +4,20 @@ based object relational mapper (ORM) for handling database interactions.
 
 from __future__ import annotations
 
-from datetime import date, timedelta
-
-from sqlalchemy import and_, Column, Date, ForeignKey, func, Integer, MetaData, not_, or_, String, create_engine, select
-from sqlalchemy.engine import Connection, Engine
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import RLock
+from typing import Dict, Iterator, Optional, Union
+
+from sqlalchemy import and_, Column, Date, DateTime, event, ForeignKey, func, Integer, MetaData, not_, or_, String, Text, create_engine, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker, validates
+from sqlalchemy.orm import declarative_base, relationship, Session, sessionmaker, validates
+
+from . import settings
 
 Base = declarative_base()
 
@@ -346,26 +354,369 @@ class Investment(Base):
         return cls.id.in_(subquery)
 
 
+class Outbox(Base):
+    """Email messages waiting to be delivered
+
+    Messages are added to the outbox when user alerts are spooled instead
+    of sent immediately (see the ``email_spool`` setting) and are delivered
+    by the ``admin send_mail`` command.
+
+    Table Fields:
+      - id                 (Integer): Primary key for this table
+      - recipient           (String): Address the message is sent to
+      - subject             (String): Subject line of the message
+      - message               (Text): The full message in RFC 5322 format
+      - created           (DateTime): When the message was added to the outbox
+      - next_attempt      (DateTime): Earliest time to attempt delivery
+      - attempts           (Integer): Number of failed delivery attempts
+      - last_error          (String): Error raised by the last failed delivery attempt
+      - sent              (DateTime): When the message was delivered, or ``NULL`` if pending
+    """
+
+    __tablename__ = 'outbox'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    created = Column(DateTime, nullable=False, default=datetime.now)
+    next_attempt = Column(DateTime, nullable=False, default=datetime.now, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    sent = Column(DateTime, index=True)
+
+
+class UsageWatermark(Base):
+    """Progress of incremental usage ingestion on each cluster
+
+    Jobs that ended on or before the watermark of a cluster have already been
+    charged to their accounts (see the ``admin ingest_usage`` command). Job time
+    before ingestion started on a cluster was charged by daily status updates.
+
+    Table Fields:
+      - cluster             (String): Name of the cluster
+      - watermark         (DateTime): End time of the most recent ingestion window
+      - started           (DateTime): Time from which usage on the cluster is charged by ingestion
+    """
+
+    __tablename__ = 'usage_watermark'
+
+    cluster = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=False)
+    started = Column(DateTime, nullable=False)
+
+
+class UsageRemainder(Base):
+    """Ingested usage not yet charged to an account
+
+    Service units are charged in whole hours, so the seconds left over after
+    each ingestion are carried forward until they add up to a full hour.
+
+    Table Fields:
+      - account_name        (String): Name of the Slurm account
+      - cluster             (String): Name of the cluster
+      - seconds            (Integer): Billed seconds not yet charged to the account
+    """
+
+    __tablename__ = 'usage_remainder'
+
+    account_name = Column(String, primary_key=True)
+    cluster = Column(String, primary_key=True)
+    seconds = Column(Integer, nullable=False, default=0)
+
+
+class UnitOfWorkSession:
+    """Wrapper around a database session shared by all operations within a unit of work
+
+    The wrapper behaves like the underlying session, except that closing the
+    session has no effect and commits only flush pending changes to the database.
+    Changes are committed (or rolled back) once the unit of work ends.
+    See the ``DBConnection.unit_of_work`` method.
+    """
+
+    def __init__(self, session: Session) -> None:
+        """Wrap the given session
+
+        Args:
+            session: The session shared by the unit of work
+        """
+
+        self._session = session
+
+    def __getattr__(self, item: str):
+        return getattr(self._session, item)
+
+    def __enter__(self) -> UnitOfWorkSession:
+        return self
+
+    def __exit__(self, *args) -> None:
+        return None
+
+    def commit(self) -> None:
+        """Flush pending changes to the database without ending the transaction"""
+
+        self._session.flush()
+
+    def close(self) -> None:
+        """Do nothing since the session is closed when the unit of work ends"""
+
+
 class DBConnection:
-    """A configurable connection to the application database"""
+    """A configurable connection to the application database
+
+    Unless ``configure`` is called beforehand, the connection is configured from
+    application settings the first time a session is requested. The database and
+    its schema are created at the same time if they do not already exist.
+
+    Engine options, including pragmas for SQLite databases, are
+    taken from application settings.
+
+    The connection is safe to use from multiple threads and forked processes.
+    Each call to ``session`` returns a new session, while ``scoped_session``
+    shares a single session per thread (or asyncio task). Pooled connections
+    inherited by a forked child process are discarded in the child and
+    replaced on first use.
+
+    Within a ``unit_of_work`` context, all sessions returned by ``session`` and
+    ``scoped_session`` share a single transaction that is committed once when
+    the context exits.
+    """
 
-    connection: Connection = None
     engine: Engine = None
     url: str = None
     metadata: MetaData = Base.metadata
-    session = None
+    _session_factory: sessionmaker = None
+    _lock = RLock()
+    _scoped_session: ContextVar[Optional[Session]] = ContextVar('scoped_session', default=None)
+    _unit_of_work: ContextVar[Optional[UnitOfWorkSession]] = ContextVar('unit_of_work', default=None)
+
+    # File systems where SQLite write-ahead logging is unsafe
+    network_filesystems = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'lustre', 'gpfs', 'beegfs', 'ceph', 'glusterfs',
+                           'fuse.sshfs')
 
     @classmethod
     def configure(cls, url: str) -> None:
         """Update the connection information for the underlying database
 
-        Changes made here will affect the entire running application
+        Changes made here will affect the entire running application.
+        No connection is opened until the database is first used.
 
         Args:
             url: URL information for the application database
         """
 
-        cls.url = url
-        cls.engine = create_engine(cls.url)
-        cls.connection = cls.engine.connect()
-        cls.session = sessionmaker(cls.engine)
+        engine = create_engine(url, pool_size=settings.db_pool_size, pool_pre_ping=settings.db_pool_pre_ping)
+        if engine.dialect.name == 'sqlite':
+            pragmas = cls._resolve_sqlite_pragmas(engine.url.database, settings.db_sqlite_pragmas)
+            event.listen(engine, 'connect', lambda dbapi_connection, _: cls._apply_pragmas(dbapi_connection, pragmas))
+
+        with cls._lock:
+            cls.url = url
+            cls.engine = engine
+            cls._session_factory = None
+
+    @staticmethod
+    def _read_mount_table() -> str:
+        """Return the contents of the system mount table or an empty string if it is unavailable"""
+
+        try:
+            return Path('/proc/mounts').read_text()
+
+        except OSError:
+            return ''
+
+    @classmethod
+    def _get_filesystem_type(cls, path: Union[str, Path]) -> Optional[str]:
+        """Return the type of file system the given path is stored on
+
+        Args:
+            path: The file path to inspect
+
+        Returns:
+            The file system type or ``None`` if it cannot be determined
+        """
+
+        path = Path(path).resolve()
+        best_match, fs_type = None, None
+        for line in cls._read_mount_table().splitlines():
+            _, mount_point, mount_type, *_ = line.split()
+
+            # Spaces in mount points are escaped as octal values
+            mount_point = Path(mount_point.replace('\\040', ' '))
+            if (mount_point == path or mount_point in path.parents) and \
+                    (best_match is None or len(mount_point.parts) > len(best_match.parts)):
+                best_match, fs_type = mount_point, mount_type
+
+        return fs_type
+
+    @classmethod
+    def _resolve_sqlite_pragmas(
+            cls,
+            database: Optional[str],
+            pragmas: Dict[str, Union[str, int]]
+    ) -> Dict[str, Union[str, int]]:
+        """Return SQLite pragmas with any ``auto`` values replaced by concrete settings
+
+        Args:
+            database: Path of the SQLite database file (``None`` or empty for in-memory databases)
+            pragmas: Pragma names and values to resolve
+
+        Returns:
+            A dictionary of pragma names and values
+        """
+
+        pragmas = dict(pragmas)
+        if not database or database == ':memory:':
+            pragmas.pop('journal_mode', None)
+            use_wal = False
+
+        else:
+            fs_type = cls._get_filesystem_type(Path(database).parent)
+            is_local = fs_type is not None and fs_type not in cls.network_filesystems
+            if pragmas.get('journal_mode') == 'auto':
+                pragmas['journal_mode'] = 'WAL' if is_local else 'DELETE'
+
+            use_wal = str(pragmas.get('journal_mode')).upper() == 'WAL'
+
+        if pragmas.get('synchronous') == 'auto':
+            pragmas['synchronous'] = 'NORMAL' if use_wal else 'FULL'
+
+        return pragmas
+
+    @staticmethod
+    def _apply_pragmas(dbapi_connection, pragmas: Dict[str, Union[str, int]]) -> None:
+        """Apply pragma statements to a new SQLite connection
+
+        Args:
+            dbapi_connection: The DBAPI connection to configure
+            pragmas: Pragma names and values to apply
+        """
+
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+
+        cursor.close()
+
+    @classmethod
+    def create_database(cls) -> None:
+        """Create the database and its schema if the database does not already exist"""
+
+        # Imported here since ``sqlalchemy_utils`` is slow to import and only needed once per process
+        import sqlalchemy_utils
+
+        with cls._lock:
+            if cls.engine is None:
+                cls.configure(settings.db_path)
+
+            if not sqlalchemy_utils.database_exists(cls.url):
+                sqlalchemy_utils.create_database(cls.url)
+                cls.metadata.create_all(cls.engine)
+
+            cls._session_factory = sessionmaker(cls.engine)
+
+    @classmethod
+    def session(cls, shared: bool = True) -> Session:
+        """Return a new database session
+
+        The database connection is initialized on first use. Within a unit of work,
+        the session belonging to the unit of work is returned instead.
+
+        Args:
+            shared: Set to ``False`` for a session that commits independently of any unit of work
+        """
+
+        unit_of_work = cls._unit_of_work.get()
+        if shared and unit_of_work is not None:
+            return unit_of_work
+
+        session_factory = cls._session_factory
+        if session_factory is None:
+            with cls._lock:
+                if cls._session_factory is None:
+                    cls.create_database()
+
+                session_factory = cls._session_factory
+
+        return session_factory()
+
+    @classmethod
+    @contextmanager
+    def scoped_session(cls) -> Iterator[Session]:
+        """Context manager yielding a session shared by the current thread or asyncio task
+
+        Nested calls within the same thread (or task) yield the same session.
+        The session is closed when the outermost context exits. Within a
+        ``unit_of_work`` context, the session belonging to the unit of work is
+        yielded instead and is left open for the unit of work to commit.
+
+        Sessions are registered in a context variable, so worker threads started
+        by a thread pool never inherit the session (or unit of work) of the
+        thread that submitted them and always receive a session of their own.
+
+        Yields:
+            A database session
+        """
+
+        session = cls._unit_of_work.get() or cls._scoped_session.get()
+        if session is not None:
+            yield session
+            return
+
+        session = cls.session()
+        token = cls._scoped_session.set(session)
+        try:
+            yield session
+
+        finally:
+            cls._scoped_session.reset(token)
+            session.close()
+
+    @classmethod
+    @contextmanager
+    def unit_of_work(cls) -> Iterator[UnitOfWorkSession]:
+        """Context manager that groups all database operations into a single transaction
+
+        Sessions requested within the context share one transaction, and calls to
+        their ``commit`` method only flush pending changes. The transaction is
+        committed when the context exits, or rolled back if an exception is raised.
+        Nested calls within the same thread (or task) join the outer unit of work.
+
+        Yields:
+            The session shared by the unit of work
+        """
+
+        unit_of_work = cls._unit_of_work.get()
+        if unit_of_work is not None:
+            yield unit_of_work
+            return
+
+        session = cls.session()
+        unit_of_work = UnitOfWorkSession(session)
+        token = cls._unit_of_work.set(unit_of_work)
+        try:
+            yield unit_of_work
+            session.commit()
+
+        except BaseException:
+            session.rollback()
+            raise
+
+        finally:
+            cls._unit_of_work.reset(token)
+            session.close()
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        """Discard pooled connections inherited from the parent process
+
+        Connections are not closed since they are still in use by the parent process.
+        """
+
+        cls._lock = RLock()
+        if cls.engine is not None:
+            cls.engine.dispose(close=False)
+
+
+# Database connections must not be shared between processes
+os.register_at_fork(after_in_child=DBConnection._after_fork)
@@ -24,14 +24,40 @@ Application Settings
      - The minimum severity level to include in the log file (follows standard python conventions)
    * - db_path
      - Path to the application SQLite backend
+   * - db_pool_size
+     - Number of database connections kept open by each application process
+   * - db_pool_pre_ping
+     - Test pooled database connections for liveness before using them
+   * - db_sqlite_pragmas
+     - Pragmas applied to each new SQLite connection. A value of ``auto`` for ``journal_mode`` or ``synchronous`` enables write-ahead logging unless the database is on a network file system
    * - clusters
      - A list of cluster names to track usage on
    * - inv_rollover_fraction
      - Fraction of service units to carry over when rolling over investments
+   * - ignore_accounts
+     - Slurm accounts that are never locked by automated status updates
    * - user_email_suffix
      - The email suffix for user accounts. We assume the ``Description`` field of each account in ``sacctmgr`` contains the prefix.
    * - from_address
      - The address to send user alerts from
+   * - smtp_host
+     - Host name of the SMTP server used to send user alerts
+   * - smtp_port
+     - Port number of the SMTP server used to send user alerts
+   * - smtp_max_messages
+     - Number of messages to send over a single SMTP connection before reconnecting
+   * - smtp_timeout
+     - Number of seconds to wait for the SMTP server before raising an error
+   * - email_spool
+     - Add user alerts to the database outbox instead of sending them immediately
+   * - email_batch_size
+     - Number of spooled messages delivered per database transaction
+   * - email_rate_limit
+     - Maximum number of spooled messages delivered per second (``0`` disables the limit)
+   * - email_max_attempts
+     - Number of delivery attempts before a spooled message is abandoned
+   * - email_retry_delay
+     - Number of seconds to wait before retrying a failed delivery, doubling after each failure
    * - notify_levels
      - Send an email each time a user exceeds a proposal usage threshold
    * - usage_warning
@@ -42,6 +68,36 @@ Application Settings
      - The email template to use when a user's propsal is a given number of days from expiring
    * - expired_proposal_notice
      - The email template to use when a user's propsal has expired
+   * - usage_source
+     - Slurm utility used to gather account usage (``sreport``, ``sshare``, or ``sacct``, see ``bank.system.usage``)
+   * - usage_ingestion
+     - Charge usage incrementally using ``admin ingest_usage`` instead of daily in ``admin update_status``
+   * - usage_ingestion_delay
+     - Number of seconds ``admin ingest_usage`` waits for completed jobs to reach the accounting database
+   * - limit_sync_tolerance
+     - Minimum change in billing minutes before ``admin sync_limits`` updates the ``GrpTRESMins`` limit of an account
+   * - usage_cache_path
+     - Path of a SQLite database used to cache Slurm usage reports for closed months (``None`` disables the cache)
+   * - usage_cache_max_entries
+     - Maximum number of cached usage reports before the least recently used reports are discarded
+   * - usage_chunk_queries
+     - Split usage reports for long date ranges into monthly ``sreport`` queries that run concurrently
+   * - usage_chunk_workers
+     - Maximum number of concurrent ``sreport`` queries when usage queries are chunked
+   * - usage_chunk_retries
+     - Number of times a failed monthly ``sreport`` query is retried when usage queries are chunked
+   * - usage_chunk_retry_delay
+     - Number of seconds to wait before retrying a failed monthly ``sreport`` query, doubling after each failure
+   * - shell_record_path
+     - Append the results of every Slurm command to the given file (compressed if the name ends in ``.gz``)
+   * - shell_replay_path
+     - Answer Slurm commands from a file written using ``shell_record_path`` instead of running them
+   * - daemon_socket
+     - Path of the Unix socket used to forward commandline calls to a running ``crc-bankd`` daemon
+   * - daemon_timeout
+     - Number of seconds to wait for the ``crc-bankd`` daemon to accept a command before running it locally
+   * - daemon_cache_ttl
+     - Number of seconds the ``crc-bankd`` daemon keeps cached Slurm cluster and partition names before refreshing them
 
 Usage Example
 -------------
@@ -94,6 +150,22 @@ log_level = 'INFO'
 # Path to the application database
 db_path = "sqlite:////ihome/crc/bank/crc_bank.db"
 
+# Database connection pooling
+db_pool_size = 5
+db_pool_pre_ping = True
+
+# Pragmas applied to each new SQLite connection (see https://www.sqlite.org/pragma.html)
+# Write-ahead logging is not safe on network file systems, so the ``auto`` journal mode
+# only enables it for databases on local storage. The ``auto`` synchronous level
+# resolves to ``NORMAL`` with write-ahead logging and ``FULL`` otherwise.
+db_sqlite_pragmas = {
+    'journal_mode': 'auto',
+    'synchronous': 'auto',
+    'busy_timeout': 30_000,  # Milliseconds to wait for a lock before raising "database is locked"
+    'cache_size': -16_000,  # Negative values are in KiB
+    'mmap_size': 0,  # Memory mapped I/O is unsafe on network file systems
+}
+
 # A list of cluster names to track usage on
 clusters = ('smp', 'mpi', 'htc', 'gpu', 'teach', 'invest')
 
@@ -101,11 +173,29 @@ clusters = ('smp', 'mpi', 'htc', 'gpu', 'teach', 'invest')
 # Should be a float between 0 and 1
 inv_rollover_fraction = 0.5
 
+# Slurm accounts that are never locked by automated status updates (e.g., administrative accounts)
+ignore_accounts = ('root', 'clcgenomics')
+
 # The email suffix for your organization. We assume the ``Description``
 # field of each account in ``sacctmgr`` contains the prefix.
 user_email_suffix = '@pitt.edu'
 from_address = 'noreply@pitt.edu'
 
+# SMTP server used to send user alerts
+# Batch notification runs reuse a single connection, replacing it after ``smtp_max_messages`` messages
+smtp_host = 'localhost'
+smtp_port = 25
+smtp_max_messages = 100
+smtp_timeout = 30
+
+# Spool user alerts in the database outbox and deliver them using ``crc-bank admin send_mail``
+# Spooling keeps slow or unavailable mail servers from delaying account updates
+email_spool = False
+email_batch_size = 100
+email_rate_limit = 10
+email_max_attempts = 5
+email_retry_delay = 60
+
 # An email to send when a user has exceeded a proposal usage threshold
 notify_levels = (90,)
 usage_warning = dedent("""
@@ -175,3 +265,43 @@ expired_proposal_notice = dedent("""
     </body>
     </html>
     """)
+
+# Slurm utility used to gather account usage: sreport, sshare, or sacct
+usage_source = 'sreport'
+
+# Charge usage from completed jobs using frequent ``admin ingest_usage`` runs (e.g., every 10 minutes)
+# The daily status update then only processes expired proposals and investments
+usage_ingestion = False
+
+# Jobs that ended within this many seconds are left for the next ingestion since
+# their accounting records may not have reached the Slurm database yet
+usage_ingestion_delay = 300
+
+# Only update GrpTRESMins limits in ``admin sync_limits`` when they change by more than this many billing minutes
+limit_sync_tolerance = 60
+
+# Cache usage reports for closed months so only the current month is queried from Slurm
+usage_cache_path = None
+usage_cache_max_entries = 200_000
+
+# Query usage for long date ranges one month at a time to avoid slurmdbd timeouts
+# Monthly queries run concurrently and failed months are retried individually
+usage_chunk_queries = False
+usage_chunk_workers = 4
+usage_chunk_retries = 2
+usage_chunk_retry_delay = 1
+
+# Record Slurm commands during a normal run, or replay a recording without running any commands
+# Replay takes precedence when both paths are set
+shell_record_path = None
+shell_replay_path = None
+
+# Unix socket used to communicate with the bank daemon.
+# Commandline calls are forwarded to the daemon when the socket exists.
+daemon_socket = "/ihome/crc/bank/bankd.sock"
+
+# Number of seconds to wait for the daemon to accept a command before running it locally
+daemon_timeout = 5
+
+# Number of seconds before the daemon refreshes cached Slurm cluster and partition names
+daemon_cache_ttl = 300
@@ -0,0 +1,263 @@
+"""The ``synthetic`` module generates realistic banking data for load testing.
+
+Generated databases contain multi-year proposal histories with per-cluster
+allocations and partially used service units, along with overlapping
+investment purchases that include rolled over and withdrawn service units.
+Rows are written using bulk inserts so databases with millions of rows
+build in seconds.
+
+Account names follow the same convention as ``bank.system.simulated``
+(``account1``, ``account2``, ...), so generated databases can be paired
+with a simulated Slurm installation of the same size.
+
+Usage Example
+-------------
+
+Databases are generated from the commandline using the ``crc-bank-gen``
+utility. The target database must not already contain any accounts.
+
+.. code-block:: bash
+
+   crc-bank-gen sqlite:////tmp/bank.db --accounts 50000 --years 5
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from math import floor
+from random import Random
+from typing import Collection, Dict, List, Optional
+
+from sqlalchemy import func, insert, select
+
+from . import settings
+from .orm import Account, Allocation, DBConnection, Investment, Proposal
+
+# Tables in the order they are inserted so foreign keys always reference existing rows
+TABLES = (Account, Proposal, Allocation, Investment)
+
+# Typical allocation sizes repeated in proportion to their relative frequency
+ALLOCATION_TIERS = (10_000,) * 8 + (25_000,) * 5 + (50_000,) * 4 + (100_000,) * 2 + (300_000,)
+
+
+class SyntheticBank:
+    """Generate proposal and investment histories for a configurable number of accounts"""
+
+    def __init__(
+        self,
+        num_accounts: int = 10_000,
+        years: int = 3,
+        clusters: Collection[str] = settings.clusters,
+        active_fraction: float = 0.9,
+        investment_fraction: float = 0.3,
+        seed: int = 0,
+        today: Optional[date] = None
+    ) -> None:
+        """Define the size and shape of the generated data
+
+        Args:
+            num_accounts: Number of accounts to generate
+            years: Approximate number of years of proposal history per account
+            clusters: Names of the clusters to allocate service units on
+            active_fraction: Fraction of accounts with a currently active proposal
+            investment_fraction: Fraction of accounts with at least one investment
+            seed: Seed used to generate reproducible data
+            today: The date treated as the current date, defaulting to today
+        """
+
+        self.num_accounts = num_accounts
+        self.years = years
+        self.clusters = tuple(clusters)
+        self.active_fraction = active_fraction
+        self.investment_fraction = investment_fraction
+        self.seed = seed
+        self.today = today or date.today()
+
+    def _usage_fraction(self, rng: Random, start: date, end: date) -> float:
+        """Return the fraction of an allocation or investment used by the current date"""
+
+        elapsed = min(max((self.today - start).days / (end - start).days, 0), 1)
+        return min(elapsed * rng.triangular(0, 1.5), 1)
+
+    def _percent_notified(self, used: int, total: int) -> int:
+        """Return the highest notification threshold reached by the given usage"""
+
+        percent = 100 * used / total if total else 0
+        return max((level for level in settings.notify_levels if level <= percent), default=0)
+
+    def _add_proposals(self, rng: Random, rows: Dict[type, List[dict]], account_id: int, ids: Dict[type, int]) -> None:
+        """Add a sequence of yearly proposals and their allocations for a single account"""
+
+        is_active = rng.random() < self.active_fraction
+        start = self.today - timedelta(days=365 * self.years + rng.randint(-180, 180))
+        while start <= self.today:
+            end = start + timedelta(days=365)
+            if end > self.today and not is_active:
+                break
+
+            ids[Proposal] += 1
+            used_total = allocated_total = 0
+            clusters = rng.sample(self.clusters, min(rng.choice((1, 1, 1, 2, 2, 3)), len(self.clusters)))
+            for cluster in clusters:
+                total = rng.choice(ALLOCATION_TIERS)
+                used = floor(total * self._usage_fraction(rng, start, end))
+                used_total, allocated_total = used_total + used, allocated_total + total
+                rows[Allocation].append({
+                    'proposal_id': ids[Proposal],
+                    'cluster_name': cluster,
+                    'service_units_total': total,
+                    'service_units_used': used
+                })
+
+            # Some proposals include floating service units usable on any cluster
+            if rng.random() < 0.1:
+                total = ALLOCATION_TIERS[0]
+                rows[Allocation].append({
+                    'proposal_id': ids[Proposal],
+                    'cluster_name': 'all_clusters',
+                    'service_units_total': total,
+                    'service_units_used': floor(total * self._usage_fraction(rng, start, end))
+                })
+
+            rows[Proposal].append({
+                'id': ids[Proposal],
+                'account_id': account_id,
+                'start_date': start,
+                'end_date': end,
+                'percent_notified': self._percent_notified(used_total, allocated_total)
+            })
+
+            # Renewals occasionally start after a gap in coverage
+            start = end + timedelta(days=rng.choice((0, 0, 0, 14, 60)))
+
+    def _add_investments(self, rng: Random, rows: Dict[type, List[dict]], account_id: int) -> None:
+        """Add one or more, possibly overlapping, investment purchases for a single account"""
+
+        history_start = self.today - timedelta(days=365 * self.years)
+        for _ in range(rng.choice((1, 1, 1, 2))):
+            start = history_start + timedelta(days=rng.randint(0, 365 * (self.years + 1)))
+            num_inv = rng.randint(1, 5)
+            service_units = rng.choice(ALLOCATION_TIERS)
+
+            # Split the purchase into yearly investments as done by ``InvestmentServices.create``
+            investments = []
+            for i in range(num_inv):
+                inv_start = start + timedelta(days=365 * i)
+                investments.append({
+                    'account_id': account_id,
+                    'start_date': inv_start,
+                    'end_date': inv_start + timedelta(days=365),
+                    'service_units': service_units,
+                    'rollover_sus': 0,
+                    'withdrawn_sus': 0,
+                    'current_sus': service_units
+                })
+
+            for i, investment in enumerate(investments):
+                future = investments[i + 1:]
+                if investment['start_date'] > self.today:
+                    break
+
+                # Active investments occasionally advance service units from future investments
+                if investment['end_date'] > self.today and future and rng.random() < 0.2:
+                    source = future[0]
+                    withdrawal = floor(source['current_sus'] * rng.uniform(0.1, 1))
+                    source['current_sus'] -= withdrawal
+                    source['withdrawn_sus'] += withdrawal
+                    investment['current_sus'] += withdrawal
+
+                used = floor(investment['current_sus'] * self._usage_fraction(
+                    rng, investment['start_date'], investment['end_date']))
+                investment['current_sus'] -= used
+
+                # Expired investments roll a fraction of their remaining service units into the next investment
+                if investment['end_date'] <= self.today and future:
+                    rollover = floor(investment['current_sus'] * settings.inv_rollover_fraction)
+                    future[0]['rollover_sus'] += rollover
+                    future[0]['current_sus'] += rollover
+                    investment['current_sus'] = 0
+
+            rows[Investment].extend(investments)
+
+    def populate(self, batch_size: int = 50_000) -> Dict[str, int]:
+        """Write generated data to the application database
+
+        Args:
+            batch_size: Number of rows to accumulate before inserting them into the database
+
+        Returns:
+            The number of rows inserted into each table
+
+        Raises:
+            RuntimeError: If the database already contains accounts
+        """
+
+        rng = Random(self.seed)
+        rows = {table: [] for table in TABLES}
+        counts = {table.__tablename__: 0 for table in TABLES}
+        ids = {Proposal: 0}
+
+        with DBConnection.session() as session:
+            if session.execute(select(func.count(Account.id))).scalar():
+                raise RuntimeError('Synthetic data can only be written to a database without any accounts')
+
+            def flush() -> None:
+                for table in TABLES:
+                    if rows[table]:
+                        session.execute(insert(table.__table__), rows[table])
+                        counts[table.__tablename__] += len(rows[table])
+                        rows[table].clear()
+
+            for account_id in range(1, self.num_accounts + 1):
+                rows[Account].append({'id': account_id, 'name': f'account{account_id}'})
+                self._add_proposals(rng, rows, account_id, ids)
+                if rng.random() < self.investment_fraction:
+                    self._add_investments(rng, rows, account_id)
+
+                if sum(map(len, rows.values())) >= batch_size:
+                    flush()
+
+            flush()
+            session.commit()
+
+        return counts
+
+    @classmethod
+    def execute(cls) -> None:
+        """Parse commandline arguments and populate the requested database"""
+
+        parser = ArgumentParser(description='Fill an empty bank database with synthetic data for load testing.')
+        parser.add_argument('url', help='URL of the database to populate (e.g., sqlite:////tmp/bank.db)')
+        parser.add_argument('--accounts', type=int, default=10_000, help='number of accounts to generate')
+        parser.add_argument('--years', type=int, default=3, help='years of proposal history per account')
+        parser.add_argument('--active-fraction', type=float, default=0.9, help='fraction of accounts with an active proposal')
+        parser.add_argument('--investment-fraction', type=float, default=0.3, help='fraction of accounts with investments')
+        parser.add_argument('--seed', type=int, default=0, help='seed used to generate reproducible data')
+        parser.add_argument('--batch-size', type=int, default=50_000, help='rows to insert per statement')
+        args = parser.parse_args()
+
+        DBConnection.configure(args.url)
+        generator = cls(
+            num_accounts=args.accounts,
+            years=args.years,
+            active_fraction=args.active_fraction,
+            investment_fraction=args.investment_fraction,
+            seed=args.seed)
+
+        start = time.perf_counter()
+        try:
+            counts = generator.populate(args.batch_size)
+
+        except RuntimeError as error:
+            parser.error(str(error))
+
+        elapsed = time.perf_counter() - start
+        for table, count in counts.items():
+            print(f'{table:>12}: {count:10d} rows')
+
+        print(f'Inserted {sum(counts.values())} rows in {elapsed:.2f} s')
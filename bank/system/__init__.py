@@ -7,11 +7,18 @@ SubModules
 .. autosummary::
    :nosignatures:
 
+   bank.system.identity
    bank.system.shell
+   bank.system.simulated
    bank.system.slurm
    bank.system.smtp
+   bank.system.usage
+   bank.system.usage_cache
 """
 
+from .identity import *
 from .shell import *
 from .slurm import *
 from .smtp import *
+from .usage import *
+from .usage_cache import *
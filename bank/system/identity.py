@@ -0,0 +1,43 @@
+"""Identity of the user invoking the current command.
+
+Commands normally run in the process of the invoking user. Commands forwarded
+to the ``crc-bankd`` daemon run in the daemon process instead, which records
+the user ID of the forwarding process for the duration of the command so
+privilege checks apply to the caller rather than the daemon.
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# User ID of the process that invoked the command currently being executed
+_caller_uid: ContextVar[Optional[int]] = ContextVar('caller_uid', default=None)
+
+
+def caller_uid() -> int:
+    """Return the effective user ID of the process that invoked the current command"""
+
+    uid = _caller_uid.get()
+    return os.geteuid() if uid is None else uid
+
+
+@contextmanager
+def acting_as(uid: Optional[int]) -> Iterator[None]:
+    """Attribute commands executed within the context to the given user
+
+    Args:
+        uid: The user ID of the invoking process, or ``None`` to use the current process
+    """
+
+    token = _caller_uid.set(uid)
+    try:
+        yield
+
+    finally:
+        _caller_uid.reset(token)
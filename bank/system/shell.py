@@ -1,15 +1,31 @@
 """Wrappers around the underlying runtime shell.
 
+Shell commands can be recorded to a file during a normal run and replayed
+later without executing any subprocesses. Recording and replay are enabled
+using the ``shell_record_path`` and ``shell_replay_path`` settings, or by
+assigning a ``CommandRecorder`` or ``CommandReplayer`` instance as the
+``ShellCmd.runner``.
+
 API Reference
 -------------
 """
 
+import builtins
+import gzip
+import json
+import time
+from collections import defaultdict
+from functools import lru_cache
 from logging import getLogger
+from pathlib import Path
 from shlex import split
 from subprocess import PIPE, Popen
-from typing import List, Tuple
+from tempfile import TemporaryFile
+from threading import Lock
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple, Union
 
-from bank.exceptions import CmdError
+from bank import exceptions, settings
+from bank.exceptions import CmdError, CmdNotRecordedError
 
 LOG = getLogger('bank.system.shell')
 
@@ -19,8 +35,15 @@ class ShellCmd:
 
     Outputs to STDOUT and STDERR are exposed via the ``out`` and ``err``
     attributes respectively.
+
+    Commands are executed in a subprocess unless an alternative ``runner``
+    is assigned to the class. Runners are called with the parsed program
+    arguments and return the output to STDOUT and STDERR as strings
+    (see ``bank.system.simulated`` for an example).
     """
 
+    runner: Optional[Callable[[List[str]], Tuple[str, str]]] = None
+
     def __init__(self, cmd: str) -> None:
         """Execute the given command in the underlying shell
 
@@ -35,7 +58,52 @@ class ShellCmd:
             raise ValueError('Command string cannot be empty')
 
         LOG.debug(f'executing `{cmd}`')
-        self.out, self.err = self._subprocess_call(split(cmd))
+        runner = ShellCmd.runner or _runner_from_settings(settings.shell_record_path, settings.shell_replay_path)
+        runner = runner or self._subprocess_call
+        self.out, self.err = runner(split(cmd))
+
+    @staticmethod
+    def iter_lines(cmd: str) -> Iterator[str]:
+        """Execute the given command and yield its output to STDOUT one line at a time
+
+        Output from the subprocess is read as it is written, so commands with
+        large outputs are processed without holding the full output in memory.
+        Commands answered by an alternative ``runner`` are yielded from the
+        output returned by the runner.
+
+        Args:
+            cmd: The command to run
+
+        Yields:
+            Lines written to STDOUT without trailing newlines
+
+        Raises:
+            ValueError: When the ``cmd`` argument is empty
+            CmdError: If the command writes to STDERR, raised once STDOUT is exhausted
+        """
+
+        if not cmd.split():
+            raise ValueError('Command string cannot be empty')
+
+        LOG.debug(f'streaming `{cmd}`')
+        runner = ShellCmd.runner or _runner_from_settings(settings.shell_record_path, settings.shell_replay_path)
+        if runner:
+            out, err = runner(split(cmd))
+            yield from out.splitlines()
+
+        else:
+            # STDERR is buffered in a file so a full pipe cannot block the subprocess
+            with TemporaryFile('w+', encoding='utf-8') as err_file:
+                with Popen(split(cmd), stdout=PIPE, stderr=err_file, encoding='utf-8') as process:
+                    for line in process.stdout:
+                        yield line.rstrip('\n')
+
+                err_file.seek(0)
+                err = err_file.read().strip()
+
+        if err:
+            LOG.error(f'CmdError: Shell command errored out with message: {err}')
+            raise CmdError(err)
 
     @staticmethod
     def _subprocess_call(args: List[str]) -> Tuple[str, str]:
@@ -63,3 +131,185 @@ class ShellCmd:
         if self.err:
             LOG.error(f'CmdError: Shell command errored out with message: {self.err}')
             raise CmdError(self.err)
+
+
+def _open_recording(path: Union[str, Path], mode: str) -> IO[str]:
+    """Open a recording file in text mode, compressing files with a ``.gz`` suffix"""
+
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+class CommandRecorder:
+    """Execute shell commands and append their results to a recording file
+
+    Each command is written as a single line of JSON containing the program
+    arguments, the output to STDOUT and STDERR, and the number of seconds
+    the command took to run. Commands that raise an exception are recorded
+    with the exception type and message instead of their output. Lines are
+    written as soon as each command finishes, so recordings from interrupted
+    runs remain usable.
+    """
+
+    def __init__(self, path: Union[str, Path], runner: Optional[Callable[[List[str]], Tuple[str, str]]] = None) -> None:
+        """Record commands to the given file
+
+        Args:
+            path: Path of the recording file, compressed with gzip if it ends in ``.gz``
+            runner: The runner used to execute commands, defaulting to a subprocess call
+        """
+
+        self.path = Path(path)
+        self.runner = runner
+        self._lock = Lock()
+
+    def __call__(self, args: List[str]) -> Tuple[str, str]:
+        """Execute and record a shell command
+
+        Args:
+            args: A sequence of program arguments
+
+        Returns:
+            The piped output to STDOUT and STDERR as strings
+        """
+
+        runner = self.runner or ShellCmd._subprocess_call
+        record = {'argv': args}
+        start = time.perf_counter()
+        try:
+            out, err = runner(args)
+
+        # Errors are recorded so they can be reproduced during replay
+        # Interrupts (e.g. ``KeyboardInterrupt``) are not recorded since they are not a result of the command
+        except FileNotFoundError as error:
+            record['missing'] = str(error)
+            self._write(record, start)
+            raise
+
+        except Exception as error:
+            record['error'] = {'type': type(error).__name__, 'message': str(error)}
+            self._write(record, start)
+            raise
+
+        record.update(out=out, err=err)
+        self._write(record, start)
+        return out, err
+
+    def _write(self, record: dict, start: float) -> None:
+        """Append a record to the recording file
+
+        Args:
+            record: The record to write
+            start: Value of ``time.perf_counter`` when the command started
+        """
+
+        record['duration'] = round(time.perf_counter() - start, 6)
+        with self._lock, _open_recording(self.path, 'a') as file:
+            file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+class CommandReplayer:
+    """Answer shell commands using results from a recording file
+
+    Commands repeated within a recording are answered in the order they
+    were recorded, with the last result repeated once earlier results are
+    used up.
+    """
+
+    def __init__(self, path: Union[str, Path], delay: bool = False) -> None:
+        """Load recorded commands from the given file
+
+        Args:
+            path: Path of a recording file written by ``CommandRecorder``
+            delay: Wait for the recorded duration before returning each result
+        """
+
+        self.path = Path(path)
+        self.delay = delay
+        self._lock = Lock()
+        self._records: Dict[Tuple[str, ...], List[dict]] = defaultdict(list)
+        self._positions: Dict[Tuple[str, ...], int] = defaultdict(int)
+
+        with _open_recording(self.path, 'r') as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records[tuple(record['argv'])].append(record)
+
+    def __call__(self, args: List[str]) -> Tuple[str, str]:
+        """Return the recorded result of a shell command
+
+        Args:
+            args: A sequence of program arguments
+
+        Returns:
+            The recorded output to STDOUT and STDERR
+
+        Raises:
+            CmdNotRecordedError: If the command does not appear in the recording
+            FileNotFoundError: If the program was missing when the command was recorded
+            Exception: The recorded exception if the command raised one when it was recorded
+        """
+
+        key = tuple(args)
+        records = self._records.get(key)
+        if not records:
+            raise CmdNotRecordedError(f'Command was not recorded in {self.path}: {" ".join(args)}')
+
+        with self._lock:
+            position = self._positions[key]
+            self._positions[key] = min(position + 1, len(records) - 1)
+
+        record = records[position]
+        if self.delay:
+            time.sleep(record['duration'])
+
+        if 'missing' in record:
+            raise FileNotFoundError(record['missing'])
+
+        if 'error' in record:
+            raise self._recorded_exception(record['error']['type'], record['error']['message'])
+
+        return record['out'], record['err']
+
+    @staticmethod
+    def _recorded_exception(type_name: str, message: str) -> Exception:
+        """Return an exception matching one raised while recording
+
+        Args:
+            type_name: Name of the recorded exception type
+            message: The recorded exception message
+
+        Returns:
+            An instance of the recorded type, or a ``CmdError`` if the type is not a
+            built-in or application exception
+        """
+
+        exc_type = getattr(exceptions, type_name, None) or getattr(builtins, type_name, None)
+        if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+            return exc_type(message)
+
+        return CmdError(f'{type_name}: {message}')
+
+
+@lru_cache(maxsize=None)
+def _runner_from_settings(
+    record_path: Optional[str],
+    replay_path: Optional[str]
+) -> Optional[Callable[[List[str]], Tuple[str, str]]]:
+    """Return the runner enabled by application settings, if any
+
+    Replay takes precedence over recording when both settings are given.
+    """
+
+    if replay_path:
+        LOG.info(f'Replaying shell commands from {replay_path}')
+        return CommandReplayer(replay_path)
+
+    if record_path:
+        LOG.info(f'Recording shell commands to {record_path}')
+        return CommandRecorder(record_path)
+
+    return None
@@ -0,0 +1,426 @@
+"""A simulated Slurm installation for testing and benchmarking without a cluster.
+
+The ``SimulatedSlurm`` class generates Slurm accounts, users, partitions,
+and job usage in memory and answers the ``sacctmgr``, ``sreport``, ``sshare``,
+``sacct``, and ``sinfo`` commands issued by the ``bank.system`` module. Commands are
+intercepted by assigning the simulator as the command runner of the
+``ShellCmd`` class, so no Slurm binaries are required.
+
+Latency and failures can be injected to mimic a busy Slurm controller, and
+the number of calls made to each utility is recorded for later inspection.
+
+Usage Example
+-------------
+
+.. code-block:: python
+
+   >>> from bank.system.simulated import SimulatedSlurm
+   >>> from bank.system.slurm import Slurm
+   >>>
+   >>> simulator = SimulatedSlurm(num_accounts=10_000, latency={'sreport': 0.5})
+   >>> with simulator.activate():
+   ...     snapshot = Slurm.association_snapshot()
+   >>>
+   >>> simulator.calls['sacctmgr']
+   1
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from random import Random
+from threading import Lock
+from typing import Collection, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from bank import settings
+from bank.system.shell import ShellCmd
+from bank.system.slurm import Slurm
+
+# Output columns used when a ``format`` option is not given
+DEFAULT_ASSOC_FORMAT = ('Cluster', 'Account', 'User', 'GrpTRESRunMins')
+DEFAULT_SREPORT_FORMAT = ('Cluster', 'Account', 'Login', 'Proper', 'Used')
+DEFAULT_SSHARE_FORMAT = ('Account', 'User', 'RawShares', 'NormShares', 'RawUsage', 'EffectvUsage', 'FairShare')
+DEFAULT_SACCT_FORMAT = ('JobID', 'JobName', 'Partition', 'Account', 'AllocCPUS', 'State', 'ExitCode')
+
+
+def _parse_options(tokens: Collection[str]) -> Dict[str, str]:
+    """Return ``key=value`` command arguments as a dictionary with lowercase keys"""
+
+    options = dict()
+    for token in tokens:
+        key, sep, value = token.partition('=')
+        if sep:
+            options[key.lower()] = value
+
+    return options
+
+
+def _parse_flags(tokens: List[str]) -> Dict[str, str]:
+    """Return ``-f value`` and ``--flag=value`` command arguments as a dictionary keyed by flag"""
+
+    flags = dict()
+    for token, next_token in zip(tokens, tokens[1:] + ['']):
+        if token.startswith('--') and '=' in token:
+            key, _, value = token.partition('=')
+            flags[key] = value
+
+        elif token.startswith('-') and not next_token.startswith('-'):
+            flags[token] = next_token
+
+    return flags
+
+
+def _split_list(value: Optional[str]) -> Optional[List[str]]:
+    """Split a comma separated command argument into a list of values"""
+
+    if value is None:
+        return None
+
+    return [item for item in value.split(',') if item]
+
+
+class SimulatedSlurm:
+    """Generate and serve Slurm data for a configurable number of accounts
+
+    Instances are callable using the same signature as ``ShellCmd`` runners
+    and maintain their own state, so lock states and limits set by the
+    application are reflected in later queries.
+    """
+
+    version = 'slurm 23.02.0'
+
+    def __init__(
+        self,
+        num_accounts: int = 100,
+        clusters: Collection[str] = settings.clusters,
+        users_per_account: int = 5,
+        partitions_per_cluster: int = 3,
+        active_fraction: float = 1.0,
+        purchased_fraction: float = 0.0,
+        max_daily_usage: int = 100,
+        latency: Union[float, Mapping[str, float]] = 0,
+        failure_rate: Union[float, Mapping[str, float]] = 0,
+        seed: int = 0,
+    ) -> None:
+        """Generate Slurm data for a new simulated installation
+
+        Accounts are named ``account1``, ``account2``, and so on. Each user
+        in an active account is assigned a fixed daily usage on every cluster
+        so that reported usage scales with the length of the reporting window.
+        Job records reported by ``sacct`` consist of one hour long job per
+        user and day, starting at midnight and billed at the user's daily usage. Active accounts also
+        start with raw usage from a random number of days of activity.
+
+        Args:
+            num_accounts: Number of Slurm accounts to create
+            clusters: Names of the clusters to create
+            users_per_account: Number of users in each account
+            partitions_per_cluster: Number of shared partitions on each cluster
+            active_fraction: Fraction of accounts with running jobs
+            purchased_fraction: Fraction of accounts with a purchased partition on each cluster
+            max_daily_usage: Upper bound on the service units used by each user per day
+            latency: Seconds to wait before answering each command, optionally given per utility name
+            failure_rate: Probability of a command failing, optionally given per utility name
+            seed: Seed used to generate reproducible data and failures
+        """
+
+        self.clusters = tuple(clusters)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls: Counter = Counter()
+
+        self._lock = Lock()
+        self._random = Random(seed)
+
+        # Association level limits and usage keyed by account and cluster name
+        self.users: Dict[str, List[str]] = dict()
+        self.limits: Dict[Tuple[str, str], Dict[str, str]] = dict()
+        self.raw_usage: Dict[Tuple[str, str], int] = dict()
+        self.daily_usage: Dict[Tuple[str, str], Dict[str, int]] = dict()
+        self.partitions: Dict[str, List[str]] = {
+            cluster: [f'{cluster}-shared{i}' for i in range(1, partitions_per_cluster + 1)] for cluster in self.clusters
+        }
+
+        for i in range(1, num_accounts + 1):
+            self.add_account(f'account{i}', users_per_account)
+
+        for account in self.users:
+            is_active = self._random.random() < active_fraction
+            for cluster in self.clusters:
+                if self._random.random() < purchased_fraction:
+                    self.partitions[cluster].append(f'{account}-{cluster}')
+
+                if is_active:
+                    self.daily_usage[account, cluster] = {
+                        user: self._random.randint(0, max_daily_usage) for user in self.users[account]
+                    }
+                    days_active = self._random.randint(0, 365)
+                    self.raw_usage[account, cluster] = 3600 * days_active * sum(self.daily_usage[account, cluster].values())
+
+    def add_account(self, account: str, num_users: int = 1) -> None:
+        """Add an account without any usage to every simulated cluster
+
+        Args:
+            account: Name of the account
+            num_users: Number of users to create in the account
+        """
+
+        self.users[account] = [f'{account}_user{j}' for j in range(1, num_users + 1)]
+        for cluster in self.clusters:
+            self.limits[account, cluster] = {'grptresrunmins': '', 'grptresmins': ''}
+            self.raw_usage[account, cluster] = 0
+            self.daily_usage[account, cluster] = dict()
+
+    @contextmanager
+    def activate(self) -> Iterator[SimulatedSlurm]:
+        """Answer all ``ShellCmd`` calls with the simulator for the duration of the context
+
+        Cached Slurm data is cleared on entry and exit so values retrieved
+        from the simulator do not leak into code running outside the context.
+        """
+
+        previous_runner = ShellCmd.runner
+        ShellCmd.runner = self
+        Slurm.clear_cache()
+        try:
+            yield self
+
+        finally:
+            ShellCmd.runner = previous_runner
+            Slurm.clear_cache()
+
+    def _per_utility(self, value: Union[float, Mapping[str, float]], utility: str) -> float:
+        """Return a latency or failure setting for the given utility"""
+
+        if isinstance(value, Mapping):
+            return value.get(utility, 0)
+
+        return value
+
+    def __call__(self, args: List[str]) -> Tuple[str, str]:
+        """Execute a Slurm command against the simulated installation
+
+        Args:
+            args: A sequence of program arguments
+
+        Returns:
+            The output to STDOUT and STDERR as strings
+
+        Raises:
+            FileNotFoundError: If the program is not a simulated Slurm utility
+        """
+
+        utility, *options = args
+        handlers = {
+            'sacctmgr': self._sacctmgr,
+            'sreport': self._sreport,
+            'sshare': self._sshare,
+            'sacct': self._sacct,
+            'sinfo': self._sinfo
+        }
+        if utility not in handlers:
+            raise FileNotFoundError(f'No such file or directory: {utility!r}')
+
+        with self._lock:
+            self.calls[utility] += 1
+            failed = self._random.random() < self._per_utility(self.failure_rate, utility)
+
+        delay = self._per_utility(self.latency, utility)
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            return '', f'{utility}: error: Simulated failure'
+
+        with self._lock:
+            return handlers[utility](options)
+
+    def _sacctmgr(self, args: List[str]) -> Tuple[str, str]:
+        """Answer a ``sacctmgr`` command"""
+
+        if '--version' in args or '-V' in args:
+            return self.version, ''
+
+        words = [arg.lower() for arg in args if not arg.startswith('-') and '=' not in arg]
+        options = _parse_options(args)
+
+        if words[:2] == ['show', 'clusters'] or words[:2] == ['show', 'cluster']:
+            return '\n'.join(self.clusters), ''
+
+        if words[:1] == ['show'] and words[1:2] in (['assoc'], ['association'], ['associations']):
+            return self._show_associations(options), ''
+
+        if words[:2] == ['modify', 'account'] and 'set' in words:
+            set_index = [arg.lower() for arg in args].index('set')
+            return self._modify_accounts(_parse_options(args[:set_index]), _parse_options(args[set_index + 1:]))
+
+        return '', f'sacctmgr: error: Unsupported command: {" ".join(args)}'
+
+    def _show_associations(self, options: Dict[str, str]) -> str:
+        """Return association records matching the ``account`` and ``cluster`` filters"""
+
+        fields = _split_list(options.get('format')) or DEFAULT_ASSOC_FORMAT
+        accounts = _split_list(options.get('account', options.get('accounts')))
+        clusters = _split_list(options.get('cluster', options.get('clusters')))
+
+        lines = []
+        for account in accounts or self.users:
+            if account not in self.users:
+                continue
+
+            for cluster in clusters or self.clusters:
+                if (account, cluster) not in self.limits:
+                    continue
+
+                # Account level association followed by the association of each user
+                records = [dict(self.limits[account, cluster], user='')]
+                records.extend({'user': user, 'grptresrunmins': '', 'grptresmins': ''} for user in self.users[account])
+                for record in records:
+                    record.update(account=account, cluster=cluster)
+                    lines.append('|'.join(record.get(field.lower(), '') for field in fields))
+
+        return '\n'.join(lines)
+
+    def _modify_accounts(self, where: Dict[str, str], values: Dict[str, str]) -> Tuple[str, str]:
+        """Update limits or raw usage for the accounts matching the ``where`` filters"""
+
+        accounts = _split_list(where.get('account', where.get('accounts'))) or list(self.users)
+        clusters = _split_list(where.get('cluster', where.get('clusters'))) or self.clusters
+
+        modified = []
+        for account in accounts:
+            for cluster in clusters:
+                if (account, cluster) not in self.limits:
+                    continue
+
+                for key, value in values.items():
+                    if key == 'rawusage':
+                        self.raw_usage[account, cluster] = int(value)
+
+                    else:
+                        # Setting a limit to -1 removes it
+                        self.limits[account, cluster][key] = '' if value.endswith('=-1') else value
+
+                modified.append(account)
+
+        if not modified:
+            return ' Nothing modified', ''
+
+        return ' Modified account associations...\n' + '\n'.join(f'  A = {name}' for name in sorted(set(modified))), ''
+
+    def _sreport(self, args: List[str]) -> Tuple[str, str]:
+        """Answer an ``sreport cluster AccountUtilizationByUser`` command"""
+
+        if 'AccountUtilizationByUser' not in args:
+            return '', f'sreport: error: Unsupported command: {" ".join(args)}'
+
+        options = _parse_options(args)
+        fields = _split_list(options.get('format')) or DEFAULT_SREPORT_FORMAT
+        accounts = _split_list(options.get('account', options.get('accounts')))
+        cluster = options.get('cluster', options.get('clusters'))
+        days = (date.fromisoformat(options['end']) - date.fromisoformat(options['start'])).days
+        scale = 3600 if args[args.index('-t') + 1].lower() == 'seconds' else 1
+
+        lines = []
+        for account in accounts or self.users:
+            users = self.daily_usage.get((account, cluster), dict())
+            user_usage = {user: daily * days * scale for user, daily in users.items() if daily}
+            if not user_usage:
+                continue
+
+            # Account totals are reported first without a user name
+            records = [{'login': '', 'proper': '', 'used': sum(user_usage.values())}]
+            records.extend({'login': user, 'proper': user, 'used': used} for user, used in user_usage.items())
+            for record in records:
+                record.update(account=account, cluster=cluster)
+                lines.append('|'.join(str(record.get(field.lower(), '')) for field in fields))
+
+        return '\n'.join(lines), ''
+
+    def _sshare(self, args: List[str]) -> Tuple[str, str]:
+        """Answer an ``sshare`` command listing the raw usage of accounts and their users"""
+
+        flags = _parse_flags(args)
+        fields = _split_list(flags.get('--format', flags.get('-o'))) or DEFAULT_SSHARE_FORMAT
+        cluster = flags.get('-M', self.clusters[0])
+        if cluster not in self.clusters:
+            return '', f"sshare: error: No cluster '{cluster}' known by database."
+
+        accounts = _split_list(flags.get('-A', flags.get('--accounts'))) or self.users
+        lines = [f'CLUSTER: {cluster}']
+        for account in accounts:
+            if account not in self.users:
+                continue
+
+            # Raw usage of the account is split between users in proportion to their daily usage
+            raw_usage = self.raw_usage[account, cluster]
+            daily_usage = self.daily_usage.get((account, cluster), dict())
+            daily_total = sum(daily_usage.values())
+            records = [{'account': account, 'user': '', 'rawusage': raw_usage}]
+            if '-a' in args:
+                for user in self.users[account]:
+                    user_usage = raw_usage * daily_usage.get(user, 0) // daily_total if daily_total else 0
+                    records.append({'account': account, 'user': user, 'rawusage': user_usage})
+
+            for record in records:
+                record['grptresraw'] = f'cpu={record["rawusage"] // 60},billing={record["rawusage"] // 60}'
+                lines.append('|'.join(str(record.get(field.lower(), '')) for field in fields))
+
+        return '\n'.join(lines), ''
+
+    def _sacct(self, args: List[str]) -> Tuple[str, str]:
+        """Answer an ``sacct`` command listing jobs that ran between the ``-S`` and ``-E`` dates"""
+
+        flags = _parse_flags(args)
+        fields = _split_list(flags.get('--format', flags.get('-o'))) or DEFAULT_SACCT_FORMAT
+        cluster = flags.get('-M', self.clusters[0])
+        if cluster not in self.clusters:
+            return '', f"sacct: error: No cluster '{cluster}' known by database."
+
+        start = datetime.fromisoformat(flags['-S'])
+        end = datetime.fromisoformat(flags['-E']) if '-E' in flags else datetime.now()
+        accounts = _split_list(flags.get('-A', flags.get('--accounts'))) or self.users
+
+        # Jobs run from midnight to 1 AM and are reported if they overlap the requested time range
+        midnights = (datetime.combine(start.date() + timedelta(days=i), datetime.min.time())
+                     for i in range((end.date() - start.date()).days + 1))
+        job_starts = [midnight for midnight in midnights if start < midnight + timedelta(hours=1) and midnight < end]
+
+        lines = []
+        job_id = 0
+        for account in accounts:
+            for user, daily in self.daily_usage.get((account, cluster), dict()).items():
+                if not daily:
+                    continue
+
+                for job_start in job_starts:
+                    job_id += 1
+                    record = {
+                        'jobid': job_id,
+                        'account': account,
+                        'user': user,
+                        'cluster': cluster,
+                        'start': job_start.isoformat(),
+                        'end': (job_start + timedelta(hours=1)).isoformat(),
+                        'elapsedraw': 3600,
+                        'state': 'COMPLETED',
+                        'alloctres': f'billing={daily},cpu=1,node=1',
+                    }
+                    lines.append('|'.join(str(record.get(field.lower(), '')) for field in fields))
+
+        return '\n'.join(lines), ''
+
+    def _sinfo(self, args: List[str]) -> Tuple[str, str]:
+        """Answer an ``sinfo`` command listing partition names"""
+
+        cluster = args[args.index('-M') + 1]
+        if cluster not in self.partitions:
+            return '', f"sinfo: error: No cluster '{cluster}' known by database."
+
+        return '\n'.join(self.partitions[cluster]), ''
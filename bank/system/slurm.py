@@ -7,22 +7,56 @@ API Reference
 from __future__ import annotations
 
 from datetime import date
+from functools import lru_cache
 from logging import getLogger
-from typing import Dict, Optional, Union, Collection, Set
+from typing import Callable, Collection, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 from bank import settings
 from bank.exceptions import *
 from bank.system.shell import ShellCmd
+from bank.system.usage import usage_source
 
 LOG = getLogger('bank.system.slurm')
 
 
+def _chunk_names(names: Iterable[str], max_length: int) -> Iterator[List[str]]:
+    """Split names into groups whose comma separated length does not exceed a maximum
+
+    Args:
+        names: The names to split into groups
+        max_length: Maximum number of characters in each comma separated group
+
+    Yields:
+        Lists of names
+    """
+
+    chunk, length = [], 0
+    for name in names:
+        if chunk and length + len(name) + 1 > max_length:
+            yield chunk
+            chunk, length = [], 0
+
+        chunk.append(name)
+        length += len(name) + 1
+
+    if chunk:
+        yield chunk
+
+
 class Slurm:
     """High level interface for Slurm commandline utilities"""
 
+    # Maximum length of comma separated account lists passed to a single command
+    # Linux limits each commandline argument to 128 KiB
+    max_accounts_arg_length = 100_000
+
     @staticmethod
+    @lru_cache(maxsize=None)
     def is_installed() -> bool:
-        """Return whether ``sacctmgr`` is installed on the host machine"""
+        """Return whether ``sacctmgr`` is installed on the host machine
+
+        Values are cached for the lifetime of the running process. See the ``clear_cache`` method.
+        """
 
         LOG.debug('Checking for Slurm installation')
 
@@ -38,24 +72,31 @@ class Slurm:
         LOG.debug(f'Found Slurm version "{cmd.out}"')
         return True
 
-    @classmethod
-    def cluster_names(cls) -> Set[str]:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def cluster_names() -> FrozenSet[str]:
         """Return cluster names configured with Slurm
 
+        Values are cached for the lifetime of the running process. See the ``clear_cache`` method.
+
         Returns:
-            A tuple of cluster names
+            A set of cluster names
         """
 
         cmd = ShellCmd('sacctmgr show clusters format=Cluster --noheader --parsable2')
         cmd.raise_if_err()
 
-        clusters = set(cmd.out.split())
+        clusters = frozenset(cmd.out.split())
         LOG.debug(f'Found Slurm clusters {clusters}')
         return clusters
 
     @staticmethod
-    def partition_names(cluster: str) -> tuple[str]:
+    @lru_cache(maxsize=None)
+    def partition_names(cluster: str) -> Tuple[str, ...]:
         """Return partition names within cluster configured with Slurm
+
+        Values are cached for the lifetime of the running process. See the ``clear_cache`` method.
+
         Returns:
             A tuple of partition names within the cluster specified by cluster
         """
@@ -63,10 +104,216 @@ class Slurm:
         cmd = ShellCmd(f'sinfo -M {cluster} -o "%P" --noheader')
         cmd.raise_if_err()
 
-        partitions = cmd.out.split()
+        partitions = tuple(cmd.out.split())
 
         return partitions
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def association_snapshot() -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Return the account level associations for all Slurm accounts
+
+        Associations are gathered using a single ``sacctmgr`` call and cached
+        for the lifetime of the running process (see the ``clear_cache`` method).
+        The returned dictionary is shared between callers and should not be modified.
+
+        Returns:
+            A nested dictionary mapping account names to cluster names to association fields
+        """
+
+        cmd = ShellCmd('sacctmgr -n -P show assoc format=Account,User,Cluster,GrpTRESRunMins,GrpTRESMins')
+        cmd.raise_if_err()
+
+        snapshot = dict()
+        for line in cmd.out.splitlines():
+            account, user, cluster, grp_tres_run_mins, grp_tres_mins = line.split('|')
+
+            # Skip user level associations
+            if user:
+                continue
+
+            snapshot.setdefault(account, dict())[cluster] = {
+                'GrpTRESRunMins': grp_tres_run_mins,
+                'GrpTRESMins': grp_tres_mins
+            }
+
+        LOG.debug(f'Found associations for {len(snapshot)} Slurm accounts')
+        return snapshot
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Discard any cached values retrieved from Slurm"""
+
+        cls.is_installed.cache_clear()
+        cls.cluster_names.cache_clear()
+        cls.partition_names.cache_clear()
+        cls.association_snapshot.cache_clear()
+
+    @classmethod
+    def set_locked_state(cls, account_names: Collection[str], lock_state: bool, cluster: str) -> None:
+        """Lock or unlock multiple Slurm accounts on a given cluster
+
+        Accounts are updated in batches using as few ``sacctmgr`` calls as possible.
+
+        Args:
+            account_names: Names of the Slurm accounts to update
+            lock_state: Whether to lock (``True``) or unlock (``False``) the accounts
+            cluster: Name of the cluster to update the lock state on
+
+        Raises:
+            ClusterNotFoundError: If the given slurm cluster does not exist
+            CmdError: If a ``sacctmgr`` command errors out
+        """
+
+        if cluster not in cls.cluster_names():
+            raise ClusterNotFoundError(f'Cluster {cluster} is not configured with Slurm')
+
+        lock_state_int = 0 if lock_state else -1
+        try:
+            for chunk in _chunk_names(sorted(account_names), cls.max_accounts_arg_length):
+                LOG.info(f'Updating lock state for {len(chunk)} Slurm accounts on {cluster} to {lock_state}')
+                ShellCmd(f'sacctmgr -i modify account where account={",".join(chunk)} cluster={cluster} '
+                         f'set GrpTresRunMins=billing={lock_state_int}').raise_if_err()
+
+        finally:
+            cls.association_snapshot.cache_clear()
+
+    @classmethod
+    def set_billing_minutes_limits(cls, limits: Mapping[str, int], cluster: str) -> None:
+        """Set the ``GrpTRESMins`` billing limit of multiple Slurm accounts on a given cluster
+
+        Accounts sharing the same limit are updated together in batched ``sacctmgr`` calls. Limits
+        usually depend on each account's own balance and rarely coincide, so most accounts still
+        require a separate call.
+
+        Args:
+            limits: A dictionary mapping account names to their limit in billing minutes
+            cluster: Name of the cluster to update limits on
+
+        Raises:
+            ClusterNotFoundError: If the given slurm cluster does not exist
+            CmdError: If a ``sacctmgr`` command errors out
+        """
+
+        if cluster not in cls.cluster_names():
+            raise ClusterNotFoundError(f'Cluster {cluster} is not configured with Slurm')
+
+        accounts_by_limit = dict()
+        for account, limit in limits.items():
+            accounts_by_limit.setdefault(limit, []).append(account)
+
+        try:
+            for limit, account_names in sorted(accounts_by_limit.items()):
+                for chunk in _chunk_names(sorted(account_names), cls.max_accounts_arg_length):
+                    LOG.info(f'Setting GrpTRESMins for {len(chunk)} Slurm accounts on {cluster} to billing={limit}')
+                    ShellCmd(f'sacctmgr -i modify account where account={",".join(chunk)} cluster={cluster} '
+                             f'set GrpTRESMins=billing={limit}').raise_if_err()
+
+        finally:
+            cls.association_snapshot.cache_clear()
+
+    @classmethod
+    def reset_raw_usage(
+        cls,
+        account_names: Collection[str],
+        clusters: Collection[str],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> None:
+        """Reset the raw usage of multiple Slurm accounts to zero
+
+        Accounts are updated in batches using as few ``sacctmgr`` calls as possible.
+        Nothing is reset if no accounts or clusters are given.
+
+        Args:
+            account_names: Names of the Slurm accounts to reset
+            clusters: Names of the clusters to reset usage on
+            progress: Optionally called after each batch with the number of accounts reset so far and in total
+
+        Raises:
+            ClusterNotFoundError: If any of the given slurm clusters do not exist
+            CmdError: If a ``sacctmgr`` command errors out
+        """
+
+        missing_clusters = set(clusters).difference(cls.cluster_names())
+        if missing_clusters:
+            raise ClusterNotFoundError(f'Clusters {", ".join(sorted(missing_clusters))} are not configured with Slurm')
+
+        # An empty filter would match every association in ``sacctmgr``
+        if not (account_names and clusters):
+            LOG.info('No accounts or clusters given for resetting raw usage')
+            return
+
+        num_reset = 0
+        for chunk in _chunk_names(sorted(account_names), cls.max_accounts_arg_length):
+            LOG.info(f'Resetting raw usage for {len(chunk)} Slurm accounts on {", ".join(clusters)}')
+            ShellCmd(f'sacctmgr -i modify account where account={",".join(chunk)} cluster={",".join(clusters)} '
+                     f'set RawUsage=0').raise_if_err()
+
+            num_reset += len(chunk)
+            if progress:
+                progress(num_reset, len(account_names))
+
+    @staticmethod
+    def billing_minutes_used(cluster: str) -> Dict[str, int]:
+        """Return the billing minutes counted against the ``GrpTRESMins`` limit of every account on a given cluster
+
+        Values are taken from the ``GrpTRESRaw`` usage reported by a single ``sshare`` call.
+
+        Args:
+            cluster: The name of the cluster
+
+        Returns:
+            A dictionary mapping account names to billing minutes
+
+        Raises:
+            CmdError: If the ``sshare`` command errors out
+        """
+
+        cmd = ShellCmd(f'sshare -n -P -M {cluster} --format=Account,User,GrpTRESRaw')
+        cmd.raise_if_err()
+
+        usage = dict()
+        for line in cmd.out.splitlines():
+            # Skip cluster headers printed when the ``-M`` option is given
+            if '|' not in line:
+                continue
+
+            account, user, grp_tres_raw = line.split('|')
+            if user.strip():
+                continue
+
+            tres = dict(item.partition('=')[::2] for item in grp_tres_raw.split(',') if item)
+            usage[account.strip()] = int(float(tres.get('billing') or 0))
+
+        return usage
+
+    @classmethod
+    def cluster_usage_by_account(cls, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
+        """Return the total usage of every account with activity on a given cluster
+
+        Usage for all accounts is gathered using a single call to the usage
+        source selected by the ``usage_source`` setting. Accounts without any
+        usage in the given time range are not included in the returned dictionary.
+
+        Args:
+            cluster: The name of the cluster
+            start: Start date to generate a report with
+            end: End date to generate a report with
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary mapping account names to the number of service units used by each account
+
+        Raises:
+            ClusterNotFoundError: If the given slurm cluster does not exist
+            CmdError: If the underlying Slurm command errors out
+        """
+
+        if cluster not in cls.cluster_names():
+            raise ClusterNotFoundError(f'Cluster {cluster} is not configured with Slurm')
+
+        return usage_source().usage_by_account(cluster, start, end, in_hours)
+
 
 class SlurmAccount:
     """Common administrative tasks relating to Slurm user accounts"""
@@ -101,6 +348,8 @@ class SlurmAccount:
     def check_account_exists(account_name: str) -> bool:
         """Return whether the given Slurm account exists
 
+        Accounts are looked up in the cached association snapshot (see ``Slurm.association_snapshot``).
+
         Args:
             account_name: The name of the Slurm account
 
@@ -108,8 +357,7 @@ class SlurmAccount:
             Boolean value indicating whether the account exists
         """
 
-        cmd = ShellCmd(f'sacctmgr -n show assoc account={account_name}')
-        return bool(cmd.out)
+        return account_name in Slurm.association_snapshot()
 
     def get_locked_state(self, cluster: str) -> bool:
         """Return whether the current slurm account is locked
@@ -147,10 +395,14 @@ class SlurmAccount:
 
         lock_state_int = 0 if lock_state else -1
         ShellCmd(f'sacctmgr -i modify account where account={self.account_name} cluster={cluster} set GrpTresRunMins=billing={lock_state_int}').raise_if_err()
+        Slurm.association_snapshot.cache_clear()
 
     def get_cluster_usage_per_user(self, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
         """Return the raw account usage per user on a given cluster
 
+        Usage is retrieved from the usage source selected by the ``usage_source``
+        setting (see the ``bank.system.usage`` module).
+
         Args:
             cluster: The name of the cluster
             in_hours: Return usage in units of hours instead of seconds
@@ -167,25 +419,7 @@ class SlurmAccount:
         if cluster not in Slurm.cluster_names() and cluster != 'all_clusters':
             raise ClusterNotFoundError(f'Cluster {cluster} is not configured with Slurm')
 
-        time = 'Hours'
-        if not in_hours:
-            time = 'Seconds'
-
-        cmd = ShellCmd(f"sreport cluster AccountUtilizationByUser -Pn -T Billing -t {time} cluster={cluster} "
-                       f"Account={self.account_name} start={start.strftime('%Y-%m-%d')} end={end.strftime('%Y-%m-%d')} format=Proper,Used")
-
-        try:
-            account_total, *data = cmd.out.split('\n')
-        except ValueError:
-            return None
-
-        out_data = dict()
-        for line in data:
-            user, usage = line.split('|')
-            usage = int(usage)
-            out_data[user] = usage
-
-        return out_data
+        return usage_source().usage_per_user(self.account_name, cluster, start, end, in_hours)
 
     def get_cluster_usage_total(
         self,
@@ -232,3 +466,70 @@ class SlurmAccount:
         clusters_as_str = ','.join(settings.clusters)
         ShellCmd(f'sacctmgr -i modify account where account={self.account_name} cluster={clusters_as_str} '
                  f'set RawUsage=0')
+
+    def usage_snapshot(self, start: date, end: date, in_hours: bool = True) -> UsageSnapshot:
+        """Return an object that retrieves and caches the account usage over a fixed date range
+
+        Args:
+            start: Start date to generate usage reports with
+            end: End date to generate usage reports with
+            in_hours: Report usage in units of hours instead of seconds
+
+        Returns:
+            A ``UsageSnapshot`` instance
+        """
+
+        return UsageSnapshot(self, start, end, in_hours)
+
+
+class UsageSnapshot:
+    """Usage of a Slurm account over a fixed date range
+
+    Usage is retrieved from Slurm the first time it is requested for a given
+    cluster and reused afterwards. A single snapshot can therefore be shared
+    between multiple consumers without repeating Slurm queries.
+    """
+
+    def __init__(self, account: SlurmAccount, start: date, end: date, in_hours: bool = True) -> None:
+        """Track the usage of the given account
+
+        Args:
+            account: The Slurm account to report usage for
+            start: Start date to generate usage reports with
+            end: End date to generate usage reports with
+            in_hours: Report usage in units of hours instead of seconds
+        """
+
+        self.account = account
+        self.start = start
+        self.end = end
+        self.in_hours = in_hours
+        self._usage_per_user: Dict[str, Optional[Dict[str, int]]] = dict()
+
+    def per_user(self, cluster: str) -> Optional[Dict[str, int]]:
+        """Return the account usage per user on a given cluster
+
+        Args:
+            cluster: The name of the cluster
+
+        Returns:
+            A dictionary with the number of service units used by each user in the account
+        """
+
+        if cluster not in self._usage_per_user:
+            self._usage_per_user[cluster] = self.account.get_cluster_usage_per_user(
+                cluster, self.start, self.end, self.in_hours)
+
+        return self._usage_per_user[cluster]
+
+    def total(self, clusters: Optional[Collection[str]] = None) -> int:
+        """Return the account usage summed across users and clusters
+
+        Args:
+            clusters: Names of the clusters to sum usage over, defaulting to all clusters in application settings
+
+        Returns:
+            The total usage of the account
+        """
+
+        return sum(sum((self.per_user(cluster) or dict()).values()) for cluster in clusters or settings.clusters)
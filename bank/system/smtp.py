@@ -7,22 +7,127 @@ API Reference
 from __future__ import annotations
 
 from email.message import EmailMessage
+from functools import lru_cache
 from logging import getLogger
-from smtplib import SMTP
+from smtplib import SMTP, SMTPServerDisconnected
 from string import Formatter
-from typing import Any, Optional, Tuple, cast
-
-from bs4 import BeautifulSoup
+from typing import Any, Optional, Tuple, Union, cast
 
+from bank import settings
 from bank.exceptions import FormattingError
 
 LOG = getLogger('bank.system.smtp')
 
 
+class SMTPSession:
+    """A reusable connection to an SMTP server
+
+    The connection is opened when the first message is sent and is
+    replaced after sending a fixed number of messages or if the server
+    drops the connection. Instances can be passed to ``EmailTemplate.send_to``
+    in place of an ``SMTP`` instance.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> None:
+        """Configure a connection to the given SMTP server
+
+        Arguments default to the corresponding ``smtp_*`` application settings.
+
+        Args:
+            host: Host name of the SMTP server
+            port: Port number of the SMTP server
+            max_messages: Number of messages to send before reconnecting
+            timeout: Number of seconds to wait for the server before raising an error
+        """
+
+        self.host = settings.smtp_host if host is None else host
+        self.port = settings.smtp_port if port is None else port
+        self.max_messages = settings.smtp_max_messages if max_messages is None else max_messages
+        self.timeout = settings.smtp_timeout if timeout is None else timeout
+        self.messages_sent = 0
+
+        self._smtp: Optional[SMTP] = None
+        self._messages_on_connection = 0
+
+    def __enter__(self) -> SMTPSession:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _connect(self) -> SMTP:
+        """Return an open connection to the SMTP server, replacing the current connection if necessary"""
+
+        if self._smtp is not None and self._messages_on_connection >= self.max_messages:
+            LOG.debug(f'Reconnecting to SMTP server after {self._messages_on_connection} messages')
+            self.close()
+
+        if self._smtp is None:
+            LOG.debug(f'Connecting to SMTP server {self.host}:{self.port}')
+            self._smtp = SMTP(self.host, self.port, timeout=self.timeout)
+            self._messages_on_connection = 0
+
+        return self._smtp
+
+    def send_message(self, msg: EmailMessage) -> None:
+        """Send an email message
+
+        If the server drops the connection, the message is retried once using a new connection.
+
+        Args:
+            msg: The message to send
+        """
+
+        try:
+            self._connect().send_message(msg)
+
+        except (SMTPServerDisconnected, ConnectionError):
+            LOG.warning('Lost connection to the SMTP server, reconnecting')
+            self._discard_connection()
+            self._connect().send_message(msg)
+
+        self._messages_on_connection += 1
+        self.messages_sent += 1
+
+    def _discard_connection(self) -> None:
+        """Close the current connection without notifying the server"""
+
+        if self._smtp is not None:
+            self._smtp.close()
+            self._smtp = None
+
+    def close(self) -> None:
+        """Close the connection to the SMTP server if it is open"""
+
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+
+        except (SMTPServerDisconnected, ConnectionError):
+            pass
+
+        finally:
+            self._discard_connection()
+
+
 class EmailTemplate:
-    """A formattable email template"""
+    """A formattable email template
 
-    def __init__(self, template: str) -> None:
+    Templates built with ``compile`` parse their fields and plain text
+    rendering once. Formatting a compiled template fills in the HTML and
+    plain text versions of the message side by side, so neither has to be
+    parsed again for each message.
+    """
+
+    def __init__(self, template: str, text: Optional[str] = None, fields: Optional[Tuple[str, ...]] = None) -> None:
         """A formattable email template
 
         Email messages passed at init should follow the standard python
@@ -30,10 +135,32 @@ class EmailTemplate:
 
         Args:
             template: A partially unformatted email template
+            text: Optional plain text rendering of the template, determined from the template if not given
+            fields: Optional names of the unformatted fields in the template, determined from the template if not given
         """
 
         self._msg = template
-        self._formatter = Formatter()
+        self._text = text
+        self._fields = fields
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def compile(cls, template: str) -> EmailTemplate:
+        """Return a template with its fields and plain text rendering precomputed
+
+        Compiled templates are cached and shared between calls with the same template.
+
+        Args:
+            template: A partially unformatted email template
+
+        Returns:
+            An ``EmailTemplate`` instance
+        """
+
+        email = cls(template)
+        email._fields = email.fields
+        email._text = email.text
+        return email
 
     @property
     def msg(self) -> str:
@@ -42,19 +169,39 @@ class EmailTemplate:
         return self._msg
 
     @property
-    def fields(self) -> Tuple[str]:
+    def text(self) -> str:
+        """Return the email template with any HTML markup removed"""
+
+        if self._text is None:
+            self._text = self._html_to_text(self._msg)
+
+        return self._text
+
+    @staticmethod
+    def _html_to_text(html: str) -> str:
+        """Return the given string with any HTML markup removed"""
+
+        # Imported here since most commands never send email
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html, "html.parser").get_text()
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
         """Return any unformatted fields in the email template
 
         Returns:
             A tuple of unique field names
         """
 
-        # Create an iterator over all fields
-        all_fields = (cast(str, field_name) for _, field_name, *_ in self._formatter.parse(self.msg))
+        if self._fields is None:
+            # Create an iterator over all fields
+            all_fields = (cast(str, field_name) for _, field_name, *_ in Formatter().parse(self.msg))
+
+            # Keep only unique fields that are not None
+            self._fields = tuple(set(field for field in all_fields if field is not None))
 
-        # Keep only unique fields that are not None
-        unique_fields = set(field for field in all_fields if field is not None)
-        return tuple(unique_fields)
+        return self._fields
 
     def format(self, **kwargs: Any) -> EmailTemplate:
         """Format the email template
@@ -71,16 +218,27 @@ class EmailTemplate:
             FormattingError: One missing or extra fields
         """
 
+        fields = set(self.fields)
         passed_fields = set(kwargs)
-        extra_fields = passed_fields - set(self.fields)
+        extra_fields = passed_fields - fields
         if extra_fields:
             raise FormattingError(f'Invalid field names: {extra_fields}')
 
-        missing_fields = set(self.fields) - passed_fields
+        missing_fields = fields - passed_fields
         if missing_fields:
             raise FormattingError(f'Missing field names: {missing_fields}')
 
-        return EmailTemplate(self._msg.format(**kwargs))
+        # Format the plain text alongside the HTML when it has already been rendered.
+        # String values may contain markup or entities of their own, which are converted to plain text.
+        text = None
+        if self._text is not None:
+            text_kwargs = {
+                name: self._html_to_text(value) if isinstance(value, str) and ('<' in value or '&' in value) else value
+                for name, value in kwargs.items()
+            }
+            text = self._text.format(**text_kwargs)
+
+        return EmailTemplate(self._msg.format(**kwargs), text=text, fields=())
 
     def _raise_missing_fields(self) -> None:
         """Raise an error if the template message has any unformatted fields
@@ -93,14 +251,20 @@ class EmailTemplate:
             LOG.error('Could not send email. Missing fields found')
             raise FormattingError(f'Message has unformatted fields: {self.fields}')
 
-    def send_to(self, to: str, subject: str, ffrom: str, smtp: Optional[SMTP] = None) -> EmailMessage:
+    def send_to(
+        self,
+        to: str,
+        subject: str,
+        ffrom: str,
+        smtp: Optional[Union[SMTP, SMTPSession]] = None
+    ) -> EmailMessage:
         """Send the email template to the given address
 
         Args:
             to: The email address to send the message to
             subject: The subject line of the email
             ffrom: The address of the message sender
-            smtp: optionally use an existing SMTP server instance
+            smtp: Optionally use an existing SMTP connection, which is left open after sending
 
         Returns:
             A copy of the email message
@@ -110,20 +274,39 @@ class EmailTemplate:
         """
 
         LOG.debug(f'Sending email to {to}')
-        self._raise_missing_fields()
+        msg = self.render(to, subject, ffrom)
+        if smtp is not None:
+            smtp.send_message(msg)
 
-        # Extract the text from the email
-        soup = BeautifulSoup(self._msg, "html.parser")
-        email_text = soup.get_text()
+        else:
+            with SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout) as smtp_server:
+                smtp_server.send_message(msg)
+
+        return msg
+
+    def render(self, to: str, subject: str, ffrom: str) -> EmailMessage:
+        """Build an email message from the template without sending it
+
+        The message includes the template as HTML and a plain text alternative.
+
+        Args:
+            to: The email address to send the message to
+            subject: The subject line of the email
+            ffrom: The address of the message sender
+
+        Returns:
+            The email message
+
+        Raises:
+            FormattingError: If the email template has unformatted fields
+        """
+
+        self._raise_missing_fields()
 
         msg = EmailMessage()
-        msg.set_content(email_text)
+        msg.set_content(self.text)
         msg.add_alternative(self._msg, subtype="html")
         msg["Subject"] = subject
         msg["From"] = ffrom
         msg["To"] = to
-
-        with smtp or SMTP("localhost") as smtp_server:
-            smtp_server.send_message(msg)
-
         return msg
@@ -0,0 +1,663 @@
+"""Interchangeable sources of Slurm usage data.
+
+Account usage can be gathered from several Slurm utilities, each with
+different trade-offs. The source used by the application is selected using
+the ``usage_source`` setting.
+
+.. list-table::
+   :header-rows: 1
+
+   * - Name
+     - Description
+   * - ``sreport``
+     - Usage over any date range from the rolled up accounting tables. This is the default source and
+       supports the ``usage_cache_path`` and ``usage_chunk_queries`` settings.
+   * - ``sshare``
+     - Raw usage accumulated by each association since its last reset, gathered for every account using
+       a single call per cluster. The requested date range is ignored, so this source only reflects
+       proposal usage when raw usage is reset at the start of each proposal and usage decay is disabled.
+       It cannot be used to charge daily usage in ``admin update_status`` unless ``usage_ingestion`` is enabled.
+   * - ``sacct``
+     - Billing time of individual jobs that overlap the requested date range. Job records are available
+       as soon as jobs start, making this source suited to short, near-real-time windows.
+
+Usage Example
+-------------
+
+.. code-block:: python
+
+   >>> from datetime import date, timedelta
+   >>> from bank.system.usage import usage_source
+   >>>
+   >>> end = date.today()
+   >>> usage_source('sacct').usage_by_account('smp', end - timedelta(days=1), end)
+   {'account1': 120, 'account2': 4}
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from logging import getLogger
+from typing import Dict, Iterator, List, Optional, Protocol, Tuple
+
+from bank import settings
+from bank.system.shell import ShellCmd
+from bank.system.usage_cache import UsageCache
+
+LOG = getLogger('bank.system.usage')
+
+
+def _month_windows(start: date, end: date) -> List[Tuple[date, date]]:
+    """Split a date range into consecutive windows that do not cross calendar month boundaries
+
+    Args:
+        start: Start date of the range
+        end: End date of the range (exclusive)
+
+    Returns:
+        A list of start and end date pairs covering the range
+    """
+
+    windows = []
+    while start < end:
+        next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        windows.append((start, min(next_month, end)))
+        start = next_month
+
+    return windows
+
+
+def _to_hours(usage_in_seconds: Dict[str, int]) -> Dict[str, int]:
+    """Convert usage values from seconds to hours"""
+
+    return {key: round(seconds / 3600) for key, seconds in usage_in_seconds.items()}
+
+
+class UsageSource(Protocol):
+    """Interface shared by all sources of Slurm usage data"""
+
+    name: str
+
+    # Whether reported usage is limited to the requested date range
+    windowed: bool
+
+    def usage_by_account(self, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
+        """Return the total usage of every account with activity on a given cluster
+
+        Accounts without any usage are not included in the returned dictionary.
+
+        Args:
+            cluster: The name of the cluster
+            start: Start date of the usage window
+            end: End date of the usage window
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary mapping account names to the number of service units used by each account
+
+        Raises:
+            CmdError: If the underlying Slurm command errors out
+        """
+
+    def usage_per_user(
+        self, account: str, cluster: str, start: date, end: date, in_hours: bool = True
+    ) -> Optional[Dict[str, int]]:
+        """Return the usage of a single account per user on a given cluster
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Start date of the usage window
+            end: End date of the usage window
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary with the number of service units used by each user, or ``None`` if Slurm did not respond
+        """
+
+
+class SreportUsage:
+    """Usage from ``sreport cluster AccountUtilizationByUser`` reports"""
+
+    name = 'sreport'
+    windowed = True
+
+    def usage_by_account(self, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
+        """Return the total usage of every account with activity on a given cluster
+
+        Usage for all accounts is gathered using a single ``sreport`` call.
+
+        Args:
+            cluster: The name of the cluster
+            start: Start date to generate a report with
+            end: End date to generate a report with
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary mapping account names to the number of service units used by each account
+
+        Raises:
+            CmdError: If the ``sreport`` command errors out
+        """
+
+        unit = 'Hours' if in_hours else 'Seconds'
+        cmd = ShellCmd(f"sreport cluster AccountUtilizationByUser -Pn -T Billing -t {unit} cluster={cluster} "
+                       f"start={start.strftime('%Y-%m-%d')} end={end.strftime('%Y-%m-%d')} format=Account,Login,Used")
+        cmd.raise_if_err()
+
+        out_data = dict()
+        for line in cmd.out.splitlines():
+            account, user, usage = line.split('|')
+
+            # Account totals are reported on lines without a user name
+            if user or not int(usage):
+                continue
+
+            out_data[account] = int(usage)
+
+        return out_data
+
+    def usage_per_user(
+        self, account: str, cluster: str, start: date, end: date, in_hours: bool = True
+    ) -> Optional[Dict[str, int]]:
+        """Return the usage of a single account per user on a given cluster
+
+        If a usage cache is configured in application settings, reports for
+        calendar months that closed before yesterday are served from the
+        cache and only the remaining (live) part of the date range is queried
+        from Slurm. If chunked queries are enabled, the date range is split
+        into monthly windows that are queried concurrently and retried
+        individually on failure. In either case, usage is gathered in seconds
+        and converted to hours after summing.
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Start date to generate a report with
+            end: End date to generate a report with
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary with the number of service units used by each user in the account
+        """
+
+        cache = UsageCache.from_settings()
+        if cache is None and not settings.usage_chunk_queries:
+            return self._parse_usage_per_user(self._run_usage_report(account, cluster, start, end, in_hours).out)
+
+        usage_in_seconds = self._get_windowed_usage_per_user(account, cluster, start, end, cache)
+        if usage_in_seconds is None or not in_hours:
+            return usage_in_seconds
+
+        return _to_hours(usage_in_seconds)
+
+    @staticmethod
+    def _run_usage_report(account: str, cluster: str, start: date, end: date, in_hours: bool = True) -> ShellCmd:
+        """Run ``sreport`` for the account usage per user on a given cluster and date range"""
+
+        unit = 'Hours' if in_hours else 'Seconds'
+        return ShellCmd(f"sreport cluster AccountUtilizationByUser -Pn -T Billing -t {unit} cluster={cluster} "
+                        f"Account={account} start={start.strftime('%Y-%m-%d')} end={end.strftime('%Y-%m-%d')} format=Proper,Used")
+
+    @staticmethod
+    def _parse_usage_per_user(output: str) -> Optional[Dict[str, int]]:
+        """Parse per-user usage from the output of an ``sreport`` usage report"""
+
+        try:
+            account_total, *data = output.split('\n')
+        except ValueError:
+            return None
+
+        out_data = dict()
+        for line in data:
+            user, usage = line.split('|')
+            usage = int(usage)
+            out_data[user] = usage
+
+        return out_data
+
+    def _query_usage_window(self, account: str, cluster: str, start: date, end: date) -> Optional[Dict[str, int]]:
+        """Return the account usage per user in seconds for a single date window
+
+        When chunked queries are enabled, failed queries are retried as defined
+        by the ``usage_chunk_retries`` and ``usage_chunk_retry_delay`` settings.
+        Otherwise, each window is queried once.
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Start date of the window
+            end: End date of the window
+
+        Returns:
+            A dictionary with the number of seconds used by each user, or ``None`` if every attempt failed
+        """
+
+        retries = settings.usage_chunk_retries if settings.usage_chunk_queries else 0
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(settings.usage_chunk_retry_delay * 2 ** (attempt - 1))
+
+            cmd = self._run_usage_report(account, cluster, start, end, in_hours=False)
+            if not cmd.err:
+                return self._parse_usage_per_user(cmd.out)
+
+            LOG.warning(f'Could not retrieve usage for {account} on {cluster} '
+                        f'from {start} to {end} (attempt {attempt + 1}): {cmd.err}')
+
+        return None
+
+    def _get_windowed_usage_per_user(
+        self,
+        account: str,
+        cluster: str,
+        start: date,
+        end: date,
+        cache: Optional[UsageCache] = None
+    ) -> Optional[Dict[str, int]]:
+        """Return the account usage per user in seconds, summed over a series of date windows
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Start date of the usage window
+            end: End date of the usage window
+            cache: Optionally read and store reports for closed months using the given cache
+
+        Returns:
+            A dictionary with the number of seconds used by each user, or ``None`` if any window could not be queried
+        """
+
+        # Reports ending before yesterday are no longer changed by running or pending jobs
+        cutoff = date.today() - timedelta(days=1)
+
+        total = Counter()
+        pending = []
+        live_start = start
+        for window_start, window_end in _month_windows(start, end):
+            if window_end > cutoff:
+                break
+
+            usage = cache.get(cluster, account, window_start, window_end, 'Seconds') if cache is not None else None
+            if usage is None:
+                pending.append((window_start, window_end))
+
+            else:
+                total.update(usage)
+
+            live_start = window_end
+
+        # Live windows are never cached and are only split up when queries are chunked
+        closed_windows = set(pending)
+        if live_start < end:
+            pending.extend(_month_windows(live_start, end) if settings.usage_chunk_queries else [(live_start, end)])
+
+        def query(window: Tuple[date, date]) -> Optional[Dict[str, int]]:
+            return self._query_usage_window(account, cluster, *window)
+
+        if settings.usage_chunk_queries and len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=settings.usage_chunk_workers) as executor:
+                results = list(executor.map(query, pending))
+
+        else:
+            results = list(map(query, pending))
+
+        for window, usage in zip(pending, results):
+            if usage is None:
+                return None
+
+            if cache is not None and window in closed_windows:
+                cache.set(cluster, account, *window, 'Seconds', usage)
+
+            total.update(usage)
+
+        return dict(total)
+
+
+class SshareUsage:
+    """Usage from the raw usage of each association as reported by ``sshare``
+
+    The ``RawUsage`` column is reported in (billing weighted) seconds and
+    covers the time since raw usage was last reset. Requested date ranges
+    are ignored.
+    """
+
+    name = 'sshare'
+    windowed = False
+
+    @staticmethod
+    def _run_sshare(cluster: str, account: Optional[str] = None) -> ShellCmd:
+        """Run ``sshare`` for all users of the given account, or of every account, on a given cluster"""
+
+        account_filter = f' -A {account}' if account else ''
+        return ShellCmd(f'sshare -a -n -P -M {cluster}{account_filter} --format=Account,User,RawUsage')
+
+    @staticmethod
+    def _parse_raw_usage(output: str) -> List[Tuple[str, str, int]]:
+        """Parse account names, user names, and raw usage in seconds from ``sshare`` output"""
+
+        records = []
+        for line in output.splitlines():
+            # Skip cluster headers printed when the ``-M`` option is given
+            if '|' not in line:
+                continue
+
+            account, user, raw_usage = line.split('|')
+            records.append((account.strip(), user.strip(), int(raw_usage or 0)))
+
+        return records
+
+    def usage_by_account(self, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
+        """Return the raw usage of every account with activity on a given cluster
+
+        Usage for all accounts is gathered using a single ``sshare`` call.
+
+        Args:
+            cluster: The name of the cluster
+            start: Ignored by this usage source
+            end: Ignored by this usage source
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary mapping account names to the number of service units used by each account
+
+        Raises:
+            CmdError: If the ``sshare`` command errors out
+        """
+
+        cmd = self._run_sshare(cluster)
+        cmd.raise_if_err()
+
+        # Account totals are reported on lines without a user name
+        usage = {account: raw for account, user, raw in self._parse_raw_usage(cmd.out) if not user and raw}
+        return _to_hours(usage) if in_hours else usage
+
+    def usage_per_user(
+        self, account: str, cluster: str, start: date, end: date, in_hours: bool = True
+    ) -> Optional[Dict[str, int]]:
+        """Return the raw usage of a single account per user on a given cluster
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Ignored by this usage source
+            end: Ignored by this usage source
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary with the number of service units used by each user, or ``None`` if Slurm did not respond
+        """
+
+        cmd = self._run_sshare(cluster, account)
+        if cmd.err:
+            LOG.warning(f'Could not retrieve usage for {account} on {cluster}: {cmd.err}')
+            return None
+
+        usage = {user: raw for acct, user, raw in self._parse_raw_usage(cmd.out) if acct == account and user}
+        return _to_hours(usage) if in_hours else usage
+
+
+class SacctUsage:
+    """Usage from the billing time of individual jobs as reported by ``sacct``
+
+    Each job contributes its billing TRES multiplied by the number of
+    seconds it ran within the requested date range. Jobs that are still
+    running are counted up to the current time.
+    """
+
+    name = 'sacct'
+    windowed = True
+
+    time_format = '%Y-%m-%dT%H:%M:%S'
+
+    @staticmethod
+    def _run_sacct(cluster: str, start: date, end: date, account: Optional[str] = None) -> ShellCmd:
+        """Run ``sacct`` for the allocations of the given account, or of every account, on a given cluster"""
+
+        account_filter = f' -A {account}' if account else ''
+        return ShellCmd(f'sacct -a -X -n -P -M {cluster}{account_filter} '
+                        f"-S {start.strftime('%Y-%m-%d')} -E {end.strftime('%Y-%m-%d')} "
+                        f'--format=Account,User,Start,End,AllocTRES')
+
+    @staticmethod
+    def _billing(alloc_tres: str) -> int:
+        """Return the billing value from an ``AllocTRES`` string, falling back to the number of CPUs"""
+
+        tres = dict(item.partition('=')[::2] for item in alloc_tres.split(',') if item)
+        return int(tres.get('billing') or tres.get('cpu') or 0)
+
+    @classmethod
+    def _parse_job_usage(cls, output: str, start: date, end: date) -> Counter:
+        """Return the usage in seconds of each account and user pair from ``sacct`` output"""
+
+        window_start = datetime.combine(start, datetime.min.time())
+        window_end = min(datetime.combine(end, datetime.min.time()), datetime.now())
+
+        usage = Counter()
+        for line in output.splitlines():
+            if '|' not in line:
+                continue
+
+            account, user, job_start, job_end, alloc_tres = line.split('|')
+
+            # Pending jobs have not started and do not contribute any usage
+            try:
+                job_start = max(datetime.strptime(job_start, cls.time_format), window_start)
+
+            except ValueError:
+                continue
+
+            try:
+                job_end = min(datetime.strptime(job_end, cls.time_format), window_end)
+
+            except ValueError:
+                job_end = window_end
+
+            seconds = (job_end - job_start).total_seconds()
+            if seconds > 0:
+                usage[account, user] += int(seconds) * cls._billing(alloc_tres)
+
+        return usage
+
+    def usage_by_account(self, cluster: str, start: date, end: date, in_hours: bool = True) -> Dict[str, int]:
+        """Return the total usage of every account with jobs on a given cluster
+
+        Usage for all accounts is gathered using a single ``sacct`` call.
+
+        Args:
+            cluster: The name of the cluster
+            start: Start date of the usage window
+            end: End date of the usage window
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary mapping account names to the number of service units used by each account
+
+        Raises:
+            CmdError: If the ``sacct`` command errors out
+        """
+
+        cmd = self._run_sacct(cluster, start, end)
+        cmd.raise_if_err()
+
+        usage = Counter()
+        for (account, _), seconds in self._parse_job_usage(cmd.out, start, end).items():
+            usage[account] += seconds
+
+        usage = dict(usage)
+        return _to_hours(usage) if in_hours else usage
+
+    def usage_per_user(
+        self, account: str, cluster: str, start: date, end: date, in_hours: bool = True
+    ) -> Optional[Dict[str, int]]:
+        """Return the usage of a single account per user on a given cluster
+
+        Args:
+            account: The name of the Slurm account
+            cluster: The name of the cluster
+            start: Start date of the usage window
+            end: End date of the usage window
+            in_hours: Return usage in units of hours instead of seconds
+
+        Returns:
+            A dictionary with the number of service units used by each user, or ``None`` if Slurm did not respond
+        """
+
+        cmd = self._run_sacct(cluster, start, end, account)
+        if cmd.err:
+            LOG.warning(f'Could not retrieve usage for {account} on {cluster} from {start} to {end}: {cmd.err}')
+            return None
+
+        job_usage = self._parse_job_usage(cmd.out, start, end)
+        usage = {user: seconds for (acct, user), seconds in job_usage.items() if acct == account}
+        return _to_hours(usage) if in_hours else usage
+
+    @classmethod
+    def _iter_job_usage(
+        cls, cluster: str, since: datetime, until: datetime, count_from: Optional[datetime], include_running: bool
+    ) -> Iterator[Tuple[str, str, int]]:
+        """Yield the usage of each job that ended within a time range, and optionally of each running job
+
+        See ``iter_completed_jobs`` for a description of the arguments.
+        """
+
+        cmd = (f'sacct -a -X -n -P -M {cluster} -S {since.strftime(cls.time_format)} -E {until.strftime(cls.time_format)} '
+               f'--format=Account,User,Start,End,ElapsedRaw,AllocTRES')
+
+        for line in ShellCmd.iter_lines(cmd):
+            if '|' not in line:
+                continue
+
+            account, user, job_start, job_end, elapsed, alloc_tres = line.split('|')
+            try:
+                job_end = datetime.strptime(job_end, cls.time_format)
+
+            # Running and pending jobs do not have an end time
+            except ValueError:
+                if not include_running:
+                    continue
+
+                job_end = until
+
+            if not since < job_end <= until:
+                continue
+
+            # Jobs that never started report an unknown start time and no elapsed time
+            elapsed = int(elapsed or 0)
+            try:
+                started_early = count_from is not None and datetime.strptime(job_start, cls.time_format) < count_from
+
+            except ValueError:
+                started_early = False
+
+            if started_early:
+                elapsed = min(elapsed, max(0, int((job_end - count_from).total_seconds())))
+
+            yield account, user, elapsed * cls._billing(alloc_tres)
+
+    @classmethod
+    def iter_completed_jobs(
+        cls, cluster: str, since: datetime, until: datetime, count_from: Optional[datetime] = None
+    ) -> Iterator[Tuple[str, str, int]]:
+        """Yield the usage of each job that ended within a time range
+
+        Output from ``sacct`` is streamed and parsed one line at a time.
+        Jobs ending exactly at ``since`` are excluded and jobs ending at
+        ``until`` are included, so consecutive time ranges count each job once.
+        Jobs that are still running are skipped until they end.
+
+        Args:
+            cluster: The name of the cluster
+            since: Exclusive start of the time range
+            until: Inclusive end of the time range
+            count_from: Only count the time jobs ran after this point, for jobs that started earlier
+
+        Yields:
+            The account name, user name, and billed seconds of each job
+
+        Raises:
+            CmdError: If the ``sacct`` command errors out
+        """
+
+        return cls._iter_job_usage(cluster, since, until, count_from, include_running=False)
+
+    @classmethod
+    def usage_after(cls, cluster: str, since: datetime, count_from: Optional[datetime] = None) -> Dict[str, int]:
+        """Return the usage of every account from jobs that ended after a point in time or are still running
+
+        Running jobs are counted up to the current time.
+
+        Args:
+            cluster: The name of the cluster
+            since: Exclusive lower bound on the end time of completed jobs
+            count_from: Only count the time jobs ran after this point, for jobs that started earlier
+
+        Returns:
+            A dictionary mapping account names to billed seconds
+
+        Raises:
+            CmdError: If the ``sacct`` command errors out
+        """
+
+        usage = Counter()
+        now = datetime.now().replace(microsecond=0)
+        for account, _, seconds in cls._iter_job_usage(cluster, since, now, count_from, include_running=True):
+            usage[account] += seconds
+
+        return dict(usage)
+
+
+USAGE_SOURCES: Dict[str, UsageSource] = {source.name: source for source in (SreportUsage(), SshareUsage(), SacctUsage())}
+
+
+def usage_source(name: Optional[str] = None) -> UsageSource:
+    """Return a usage source by name
+
+    Args:
+        name: Name of the usage source, defaulting to the ``usage_source`` setting
+
+    Returns:
+        The requested usage source
+
+    Raises:
+        ValueError: If there is no usage source with the given name
+    """
+
+    name = name or settings.usage_source
+    try:
+        return USAGE_SOURCES[name]
+
+    except KeyError:
+        raise ValueError(f'Unknown usage source {name!r}, expected one of {", ".join(USAGE_SOURCES)}') from None
+
+
+def windowed_usage_source(name: Optional[str] = None) -> UsageSource:
+    """Return a usage source by name, requiring that it reports usage within the requested date range
+
+    Sources that ignore the date range cannot be used to charge usage over
+    a fixed period, since the same usage would be charged again by every
+    subsequent period.
+
+    Args:
+        name: Name of the usage source, defaulting to the ``usage_source`` setting
+
+    Returns:
+        The requested usage source
+
+    Raises:
+        ValueError: If there is no usage source with the given name or the source ignores date ranges
+    """
+
+    source = usage_source(name)
+    if not source.windowed:
+        raise ValueError(f'The {source.name} usage source reports usage accumulated since the last raw usage reset '
+                         f'and cannot be used to charge usage over a date range. Select a different usage_source '
+                         f'or enable usage_ingestion.')
+
+    return source
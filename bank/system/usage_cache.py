@@ -0,0 +1,183 @@
+"""A persistent cache for Slurm usage reports covering closed date windows.
+
+Usage reported by Slurm for a date window that ended in the past does not
+change, so reports for closed windows can be stored and reused between
+application runs. The cache is kept in a standalone SQLite database, separate
+from the application database, and is enabled using the ``usage_cache_path``
+setting. Once the cache grows beyond ``usage_cache_max_entries`` entries, the
+least recently used entries are discarded. Write-ahead logging is only
+enabled when the cache is stored on a local file system, following the
+``db_sqlite_pragmas`` setting used for the application database.
+
+API Reference
+-------------
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+from weakref import WeakSet
+
+from bank import settings
+
+LOG = getLogger('bank.system.usage_cache')
+
+
+class UsageCache:
+    """Size bounded storage for per-user usage reports
+
+    Entries are keyed by cluster, account, window start and end dates, and
+    the unit of the reported values. Instances are safe to share between
+    threads and are reopened automatically in forked child processes.
+    """
+
+    # Number of writes between checks of the cache size
+    eviction_interval = 64
+
+    # Open instances that need a fresh lock in forked child processes
+    _instances: WeakSet[UsageCache] = WeakSet()
+
+    def __init__(self, path: Union[str, Path], max_entries: int = settings.usage_cache_max_entries) -> None:
+        """Open or create a cache at the given path
+
+        Args:
+            path: Path of the SQLite database used to store cached reports
+            max_entries: Maximum number of reports to keep before discarding the least recently used
+        """
+
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+        self._instances.add(self)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _open(cls, path: str, max_entries: int) -> UsageCache:
+        """Return a shared cache instance for the given path"""
+
+        return cls(path, max_entries)
+
+    @classmethod
+    def from_settings(cls) -> Optional[UsageCache]:
+        """Return the cache configured in application settings or ``None`` if caching is disabled"""
+
+        if not settings.usage_cache_path:
+            return None
+
+        return cls._open(str(settings.usage_cache_path), settings.usage_cache_max_entries)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Return a connection to the cache database, creating the schema on first use"""
+
+        # Connections inherited from a parent process are not safe to use
+        if self._connection is None or self._pid != os.getpid():
+            from bank.orm import DBConnection
+
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            pragmas = DBConnection._resolve_sqlite_pragmas(str(self.path), settings.db_sqlite_pragmas)
+            DBConnection._apply_pragmas(connection, pragmas)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS usage ('
+                'cluster TEXT, account TEXT, start TEXT, end TEXT, unit TEXT, usage TEXT, last_used REAL, '
+                'PRIMARY KEY (cluster, account, start, end, unit))')
+            connection.execute('CREATE INDEX IF NOT EXISTS usage_last_used ON usage (last_used)')
+            self._connection, self._pid = connection, os.getpid()
+
+        return self._connection
+
+    def get(self, cluster: str, account: str, start: date, end: date, unit: str) -> Optional[Dict[str, int]]:
+        """Return cached usage for a date window
+
+        Args:
+            cluster: Name of the cluster
+            account: Name of the Slurm account
+            start: Start date of the window
+            end: End date of the window
+            unit: Unit of the reported usage values
+
+        Returns:
+            A dictionary mapping user names to usage, or ``None`` if the window is not cached
+        """
+
+        key = (cluster, account, start.isoformat(), end.isoformat(), unit)
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT usage FROM usage WHERE cluster=? AND account=? AND start=? AND end=? AND unit=?', key).fetchone()
+
+            if row is None:
+                return None
+
+            self.connection.execute(
+                'UPDATE usage SET last_used=? WHERE cluster=? AND account=? AND start=? AND end=? AND unit=?',
+                (time.time(), *key))
+
+        return json.loads(row[0])
+
+    def set(self, cluster: str, account: str, start: date, end: date, unit: str, usage: Dict[str, int]) -> None:
+        """Store usage for a closed date window
+
+        Args:
+            cluster: Name of the cluster
+            account: Name of the Slurm account
+            start: Start date of the window
+            end: End date of the window
+            unit: Unit of the reported usage values
+            usage: A dictionary mapping user names to usage
+        """
+
+        key = (cluster, account, start.isoformat(), end.isoformat(), unit)
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)', (*key, json.dumps(usage), time.time()))
+
+            self._writes += 1
+            if self._writes % self.eviction_interval == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Discard the least recently used entries once the cache exceeds its maximum size"""
+
+        excess = self.connection.execute('SELECT COUNT(*) FROM usage').fetchone()[0] - self.max_entries
+        if excess > 0:
+            LOG.debug(f'Discarding {excess} entries from the usage cache')
+            self.connection.execute(
+                'DELETE FROM usage WHERE rowid IN (SELECT rowid FROM usage ORDER BY last_used LIMIT ?)', (excess,))
+
+    def __len__(self) -> int:
+        """Return the number of cached entries"""
+
+        with self._lock:
+            return self.connection.execute('SELECT COUNT(*) FROM usage').fetchone()[0]
+
+    def clear(self) -> None:
+        """Discard all cached entries"""
+
+        with self._lock:
+            self.connection.execute('DELETE FROM usage')
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        """Replace locks inherited from the parent process
+
+        A lock held by another thread at the time of the fork is never released in the child process.
+        """
+
+        for cache in cls._instances:
+            cache._lock = Lock()
+
+
+# Locks must not be shared between processes
+os.register_at_fork(after_in_child=UsageCache._after_fork)
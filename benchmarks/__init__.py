@@ -0,0 +1,9 @@
+"""Performance benchmarks for the banking application.
+
+Benchmarks are not part of the test suite and are run individually as
+python modules from the project root. For example:
+
+.. code-block:: bash
+
+   python -m benchmarks.db_contention --help
+"""
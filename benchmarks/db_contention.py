@@ -0,0 +1,128 @@
+"""Benchmark database throughput under concurrent readers and writers.
+
+Separate processes mimic administrators running commandline calls while
+the nightly account update is writing to the database. The benchmark is
+run once with the engine options from application settings and once with
+SQLite defaults (rollback journal and no busy timeout) for comparison.
+"""
+
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from multiprocessing import Pool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+
+from bank import settings
+from bank.orm import Account, Allocation, DBConnection, Proposal
+
+# Engine options matching SQLite defaults
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'busy_timeout': 0}
+
+
+def build_database(url: str, num_accounts: int) -> None:
+    """Populate a new database with accounts holding an active proposal"""
+
+    DBConnection.configure(url)
+    with DBConnection.session() as session:
+        for i in range(num_accounts):
+            proposal = Proposal(
+                start_date=date.today() - timedelta(days=30),
+                end_date=date.today() + timedelta(days=335),
+                allocations=[Allocation(cluster_name=cluster, service_units_total=100_000) for cluster in settings.clusters])
+
+            session.add(Account(name=f'account{i}', proposals=[proposal]))
+
+        session.commit()
+
+
+def run_worker(args: Tuple[str, str, Dict, float, int]) -> Tuple[str, int, int]:
+    """Repeatedly read from or write to the database until the duration has elapsed
+
+    Returns:
+        The worker role, the number of successful operations, and the number of lock errors
+    """
+
+    role, url, pragmas, duration, num_accounts = args
+    settings.db_sqlite_pragmas = pragmas
+    DBConnection.configure(url)
+
+    completed = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        account_name = f'account{completed % num_accounts}'
+        try:
+            with DBConnection.session() as session:
+                if role == 'reader':
+                    query = select(Allocation).join(Proposal).join(Account).where(Account.name == account_name)
+                    session.execute(query).scalars().all()
+
+                else:
+                    subquery = select(Proposal.id).join(Account).where(Account.name == account_name)
+                    session.execute(
+                        update(Allocation)
+                        .where(Allocation.proposal_id.in_(subquery))
+                        .values(service_units_used=Allocation.service_units_used + 1))
+                    session.commit()
+
+            completed += 1
+
+        except OperationalError as exception:
+            if 'database is locked' not in str(exception):
+                raise
+
+            errors += 1
+
+    return role, completed, errors
+
+
+def run_benchmark(url: str, pragmas: Dict, readers: int, writers: int, duration: float, num_accounts: int) -> Dict:
+    """Run concurrent workers against the given database and summarize their throughput"""
+
+    jobs = [('reader', url, pragmas, duration, num_accounts)] * readers
+    jobs += [('writer', url, pragmas, duration, num_accounts)] * writers
+    with Pool(len(jobs)) as pool:
+        results = pool.map(run_worker, jobs)
+
+    summary = dict()
+    for role in ('reader', 'writer'):
+        role_results = [result for result in results if result[0] == role]
+        summary[role] = {
+            'ops_per_second': sum(r[1] for r in role_results) / duration,
+            'lock_errors': sum(r[2] for r in role_results)}
+
+    return summary
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4, help='number of concurrent reader processes')
+    parser.add_argument('--writers', type=int, default=2, help='number of concurrent writer processes')
+    parser.add_argument('--duration', type=float, default=5, help='seconds to run each configuration for')
+    parser.add_argument('--accounts', type=int, default=500, help='number of accounts in the database')
+    parser.add_argument('--directory', type=Path, help='directory to create the database in (e.g., an NFS mount)')
+    args = parser.parse_args()
+
+    configurations = {'settings': settings.db_sqlite_pragmas, 'baseline': BASELINE_PRAGMAS}
+    for name, pragmas in configurations.items():
+        with TemporaryDirectory(dir=args.directory) as tempdir:
+            url = f'sqlite:///{Path(tempdir) / "bank.db"}'
+            settings.db_sqlite_pragmas = pragmas
+            build_database(url, args.accounts)
+            DBConnection.engine.dispose()
+
+            summary = run_benchmark(url, pragmas, args.readers, args.writers, args.duration, args.accounts)
+            for role, stats in summary.items():
+                print(f'{name:>8} {role:>6}s: {stats["ops_per_second"]:10.1f} ops/s {stats["lock_errors"]:6d} lock errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark email rendering throughput for compiled and uncompiled templates.
+
+Usage warnings are formatted and rendered into email messages without being
+sent. Uncompiled templates parse their fields and convert the full HTML
+message to plain text for every message, while compiled templates do both
+once and format the HTML and plain text versions side by side.
+"""
+
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+from bank import settings
+from bank.system.smtp import EmailTemplate
+
+# A usage table comparable in size to the one included in usage warnings
+USAGE_TABLE = '\n'.join(f'|  user{i:<10}|  {i * 1000:>10}  |  {i / 10:>6.1f}%  |' for i in range(40))
+
+
+def render_messages(num_messages: int, build_template: Callable[[str], EmailTemplate]) -> float:
+    """Render usage warnings and return the number of messages rendered per second"""
+
+    start = time.perf_counter()
+    for i in range(num_messages):
+        template = build_template(settings.usage_warning)
+        template.format(perc=90, start='01/01/2023', usage=USAGE_TABLE, investment='').render(
+            f'account{i}@example.com', 'Usage alert', settings.from_address)
+
+    return num_messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5_000, help='number of messages to render')
+    args = parser.parse_args()
+
+    for name, build_template in (('compiled', EmailTemplate.compile), ('uncompiled', EmailTemplate)):
+        rate = render_messages(args.messages, build_template)
+        print(f'{name:>10}: {rate:10.1f} messages/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark common banking operations against a synthetic database and simulated Slurm.
+
+Each scale builds a new ``SyntheticBank`` database with the requested number
+of accounts and a matching ``SimulatedSlurm`` installation. The nightly
+status update, account summaries, usage notifications, and locked account
+listings are timed, and the number of SQL statements and Slurm commands
+issued by each operation is recorded.
+
+Results are written as JSON so runs from different releases can be compared
+using the ``--compare`` option before deploying.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+import bank
+from bank import settings
+from bank.account_logic import AccountServices, AdminServices
+from bank.orm import DBConnection
+from bank.synthetic import SyntheticBank
+from bank.system.simulated import SimulatedSlurm
+
+
+def count_statements(counter: Counter) -> None:
+    """Count SQL statements executed by the application engine"""
+
+    @event.listens_for(DBConnection.engine, 'before_cursor_execute')
+    def _count(*args, **kwargs) -> None:
+        counter['sql'] += 1
+
+
+def measure(name: str, operation: Callable[[], None], calls: int, simulator: SimulatedSlurm, counter: Counter) -> Dict:
+    """Time an operation and return the statistics recorded while it ran"""
+
+    counter.clear()
+    simulator.calls.clear()
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        operation()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'operation': name,
+        'calls': calls,
+        'seconds': elapsed,
+        'seconds_per_call': elapsed / calls,
+        'sql_statements': counter['sql'],
+        'slurm_commands': dict(simulator.calls),
+    }
+
+
+def run_scale(directory: Optional[Path], num_accounts: int, sample: int) -> Iterator[Dict]:
+    """Build a database and Slurm installation with the given number of accounts and benchmark each operation"""
+
+    sample_names = [f'account{i}' for i in range(1, min(sample, num_accounts) + 1)]
+    simulator = SimulatedSlurm(num_accounts=num_accounts, active_fraction=0.5)
+    counter = Counter()
+
+    with TemporaryDirectory(dir=directory) as tempdir, simulator.activate():
+        DBConnection.configure(f'sqlite:///{Path(tempdir) / "bank.db"}')
+        SyntheticBank(num_accounts).populate()
+        count_statements(counter)
+
+        operations = (
+            ('list_locked_accounts', lambda: AdminServices.list_locked_accounts(settings.clusters[0]), 1),
+            ('info', lambda: [AccountServices(name).info() for name in sample_names], len(sample_names)),
+            ('notify', lambda: [AccountServices(name).notify() for name in sample_names], len(sample_names)),
+            ('update_account_status', AdminServices.update_account_status, 1),
+        )
+
+        for name, operation, calls in operations:
+            yield dict(measure(name, operation, calls, simulator, counter), accounts=num_accounts)
+
+        DBConnection.engine.dispose()
+
+
+def compare(results: List[Dict], previous_path: Path) -> None:
+    """Print the change in runtime relative to a previous set of results"""
+
+    previous = {(r['accounts'], r['operation']): r for r in json.loads(previous_path.read_text())['results']}
+    print(f'\nCompared to {previous_path}:')
+    for result in results:
+        old = previous.get((result['accounts'], result['operation']))
+        if old is None:
+            continue
+
+        ratio = result['seconds_per_call'] / old['seconds_per_call']
+        print(f'{result["accounts"]:>8} {result["operation"]:>22}: {ratio:6.2f}x time, '
+              f'{result["sql_statements"] - old["sql_statements"]:+d} SQL statements')
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, nargs='+', default=[100, 1_000], help='database sizes to benchmark')
+    parser.add_argument('--sample', type=int, default=20, help='number of accounts to run per account operations on')
+    parser.add_argument('--directory', type=Path, help='directory to create the database in (e.g., an NFS mount)')
+    parser.add_argument('--output', type=Path, help='write results to the given JSON file')
+    parser.add_argument('--compare', type=Path, help='JSON results from a previous run to compare against')
+    args = parser.parse_args()
+
+    # Spool notifications so the benchmark does not require a mail server
+    settings.email_spool = True
+
+    results = []
+    for num_accounts in args.accounts:
+        for result in run_scale(args.directory, num_accounts, args.sample):
+            results.append(result)
+            slurm_commands = sum(result['slurm_commands'].values())
+            print(f'{num_accounts:>8} {result["operation"]:>22}: {result["seconds_per_call"]:9.4f} s/call '
+                  f'{result["sql_statements"]:8d} SQL statements {slurm_commands:8d} Slurm commands')
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            'version': bank.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'argv': sys.argv[1:],
+            'results': results,
+        }, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
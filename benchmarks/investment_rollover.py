@@ -0,0 +1,112 @@
+"""Benchmark rolling over expired investments on a large synthetic database.
+
+The set based rollover implemented by ``AdminServices.rollover_investments``
+is compared against a baseline that processes expired investments one at
+a time using the ORM and commits after each rollover.
+"""
+
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+from math import floor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from sqlalchemy import insert, select
+
+from bank import settings
+from bank.account_logic import AdminServices
+from bank.orm import Account, DBConnection, Investment
+
+
+def build_database(url: str, num_accounts: int) -> None:
+    """Populate a new database with accounts holding two expired investments and one active investment"""
+
+    DBConnection.configure(url)
+    today = date.today()
+    with DBConnection.session() as session:
+        session.execute(insert(Account), [{'id': i, 'name': f'account{i}'} for i in range(1, num_accounts + 1)])
+        session.execute(insert(Investment), [
+            {
+                'account_id': i,
+                'start_date': today + timedelta(days=offset),
+                'end_date': today + timedelta(days=offset + 365),
+                'service_units': 10_000,
+                'current_sus': 10_000 - (i % 1000),
+                'rollover_sus': 0,
+                'withdrawn_sus': 0
+            } for i in range(1, num_accounts + 1) for offset in (-730, -365, 0)
+        ])
+        session.commit()
+
+
+def baseline_rollover() -> None:
+    """Roll over expired investments one at a time"""
+
+    today = date.today()
+    with DBConnection.session() as session:
+        expired_ids = session.execute(
+            select(Investment.id)
+            .where(Investment.end_date <= today)
+            .where(Investment.current_sus > 0)
+            .order_by(Investment.account_id, Investment.start_date)).scalars().all()
+
+    for inv_id in expired_ids:
+        with DBConnection.session() as session:
+            investment = session.get(Investment, inv_id)
+            next_investment = session.execute(
+                select(Investment)
+                .where(Investment.account_id == investment.account_id)
+                .where(Investment.start_date >= investment.end_date)
+                .order_by(Investment.start_date)).scalars().first()
+
+            if next_investment is None:
+                continue
+
+            rollover_sus = floor(investment.current_sus * settings.inv_rollover_fraction)
+            next_investment.current_sus += rollover_sus
+            next_investment.rollover_sus += rollover_sus
+            investment.current_sus = 0
+            session.commit()
+
+
+def set_based_rollover() -> None:
+    """Roll over expired investments using the application implementation"""
+
+    with redirect_stdout(StringIO()):
+        AdminServices.rollover_investments()
+
+
+def time_rollover(rollover: Callable[[], None], directory: Path, num_accounts: int) -> float:
+    """Return the number of seconds taken to roll over investments in a new database"""
+
+    with TemporaryDirectory(dir=directory) as tempdir:
+        build_database(f'sqlite:///{Path(tempdir) / "bank.db"}', num_accounts)
+        start = time.perf_counter()
+        rollover()
+        elapsed = time.perf_counter() - start
+        DBConnection.engine.dispose()
+
+    return elapsed
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10_000, help='number of accounts in the database')
+    parser.add_argument('--directory', type=Path, help='directory to create the database in (e.g., an NFS mount)')
+    args = parser.parse_args()
+
+    for name, rollover in (('set based', set_based_rollover), ('baseline', baseline_rollover)):
+        elapsed = time_rollover(rollover, args.directory, args.accounts)
+        print(f'{name:>9}: {elapsed:8.2f} s for {2 * args.accounts} expired investments')
+
+
+if __name__ == '__main__':
+    main()
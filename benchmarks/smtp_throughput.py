@@ -0,0 +1,72 @@
+"""Benchmark email delivery throughput with and without connection reuse.
+
+Messages are delivered to a local ``aiosmtpd`` server. The benchmark compares
+opening a new SMTP connection for every message against sending all messages
+over a shared ``SMTPSession``.
+"""
+
+from __future__ import annotations
+
+import socket
+import time
+from argparse import ArgumentParser
+from typing import Optional
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+
+from bank.system.smtp import EmailTemplate, SMTPSession
+
+TEMPLATE = EmailTemplate('<html><body><p>Your account has exceeded 90% usage.</p></body></html>')
+
+
+def find_free_port() -> int:
+    """Return a free TCP port on the loopback interface"""
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def send_messages(num_messages: int, port: int, smtp: Optional[SMTPSession]) -> float:
+    """Send messages to the local server and return the number of messages sent per second"""
+
+    start = time.perf_counter()
+    for i in range(num_messages):
+        if smtp is None:
+            # Mirror the default behavior of ``send_to`` using a new connection per message
+            with SMTPSession('127.0.0.1', port) as single_use:
+                TEMPLATE.send_to(f'account{i}@example.com', 'Usage alert', 'noreply@example.com', smtp=single_use)
+
+        else:
+            TEMPLATE.send_to(f'account{i}@example.com', 'Usage alert', 'noreply@example.com', smtp=smtp)
+
+    return num_messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2_000, help='number of messages to send')
+    parser.add_argument('--max-messages', type=int, default=100, help='messages to send before reconnecting')
+    args = parser.parse_args()
+
+    port = find_free_port()
+    controller = Controller(Sink(), hostname='127.0.0.1', port=port)
+    controller.start()
+    try:
+        rate = send_messages(args.messages, port, None)
+        print(f'{"per message":>12}: {rate:8.1f} messages/s')
+
+        with SMTPSession('127.0.0.1', port, max_messages=args.max_messages) as smtp:
+            rate = send_messages(args.messages, port, smtp)
+
+        print(f'{"shared":>12}: {rate:8.1f} messages/s')
+
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark the latency of each usage source against simulated Slurm utilities.
+
+Usage for every account on a cluster, and usage per user for a sample of
+individual accounts, is retrieved from each backend in ``bank.system.usage``
+over windows of increasing length. A fixed latency can be added to every
+simulated command to approximate the round trip to a Slurm controller, in
+which case the number of commands issued dominates the measured time.
+"""
+
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from typing import Callable
+
+from bank.system.simulated import SimulatedSlurm
+from bank.system.usage import USAGE_SOURCES
+
+
+def timed(operation: Callable[[], None]) -> float:
+    """Return the number of seconds taken to run an operation"""
+
+    start = time.perf_counter()
+    operation()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Parse commandline arguments and print benchmark results"""
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=1_000, help='number of simulated accounts')
+    parser.add_argument('--sample', type=int, default=20, help='number of accounts to query usage per user for')
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 30, 365], help='lengths of the usage windows')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every simulated command')
+    args = parser.parse_args()
+
+    simulator = SimulatedSlurm(num_accounts=args.accounts, latency=args.latency)
+    cluster = simulator.clusters[0]
+    sample_names = [f'account{i}' for i in range(1, min(args.sample, args.accounts) + 1)]
+    end = date.today()
+
+    with simulator.activate():
+        for days in args.days:
+            start = end - timedelta(days=days)
+            for name, source in USAGE_SOURCES.items():
+                simulator.calls.clear()
+                by_account = timed(lambda: source.usage_by_account(cluster, start, end))
+                per_user = timed(lambda: [source.usage_per_user(acct, cluster, start, end) for acct in sample_names])
+                print(f'{days:>5} days {name:>8}: {by_account:9.4f} s all accounts '
+                      f'{per_user / len(sample_names):9.4f} s/account {sum(simulator.calls.values()):6d} commands')
+
+
+if __name__ == '__main__':
+    main()
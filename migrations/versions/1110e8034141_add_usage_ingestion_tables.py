@@ -0,0 +1,40 @@
+"""Add tables for incremental usage ingestion
+
+Revision ID: 1110e8034141
+Revises: a6e7632cc571
+Create Date: 2026-10-18 14:37:05.218467
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '1110e8034141'
+down_revision = 'a6e7632cc571'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade the database schema to the next version"""
+
+    op.create_table(
+        'usage_watermark',
+        sa.Column('cluster', sa.String, primary_key=True),
+        sa.Column('watermark', sa.DateTime, nullable=False),
+        sa.Column('started', sa.DateTime, nullable=False)
+    )
+
+    op.create_table(
+        'usage_remainder',
+        sa.Column('account_name', sa.String, primary_key=True),
+        sa.Column('cluster', sa.String, primary_key=True),
+        sa.Column('seconds', sa.Integer, nullable=False)
+    )
+
+
+def downgrade():
+    """Downgrade the database schema to the previous version"""
+
+    op.drop_table('usage_remainder')
+    op.drop_table('usage_watermark')
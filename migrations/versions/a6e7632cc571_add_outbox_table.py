@@ -0,0 +1,43 @@
+"""Add a table for spooling outgoing email
+
+Revision ID: a6e7632cc571
+Revises: 14c78107b748
+Create Date: 2026-10-18 10:12:44.513920
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a6e7632cc571'
+down_revision = '14c78107b748'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Upgrade the database schema to the next version"""
+
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('recipient', sa.String, nullable=False),
+        sa.Column('subject', sa.String, nullable=False),
+        sa.Column('message', sa.Text, nullable=False),
+        sa.Column('created', sa.DateTime, nullable=False),
+        sa.Column('next_attempt', sa.DateTime, nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False),
+        sa.Column('last_error', sa.String),
+        sa.Column('sent', sa.DateTime)
+    )
+
+    op.create_index('ix_outbox_next_attempt', 'outbox', ['next_attempt'])
+    op.create_index('ix_outbox_sent', 'outbox', ['sent'])
+
+
+def downgrade():
+    """Downgrade the database schema to the previous version"""
+
+    op.drop_index('ix_outbox_sent', table_name='outbox')
+    op.drop_index('ix_outbox_next_attempt', table_name='outbox')
+    op.drop_table('outbox')
@@ -1,5 +1,11 @@
+import socket
 from datetime import date, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from tempfile import TemporaryDirectory
 
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
 from sqlalchemy import select
 
 from bank import settings
@@ -140,3 +146,65 @@ class InvestmentSetup(EmptyAccountSetup):
             )
 
             add_investment_to_test_account(inv)
+
+
+class CountingHandler(Sink):
+    """SMTP handler that records delivered messages and the sessions they arrived on"""
+
+    def __init__(self) -> None:
+        self.sessions = []
+        self.recipients = []
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.sessions.append(session.peer)
+        self.recipients.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+
+class TemporaryDatabase:
+    """Mixin class that points ``DBConnection`` at a temporary SQLite database"""
+
+    def setUp(self) -> None:
+        """Configure the connection to use a temporary database"""
+
+        super().setUp()
+        self._original_state = DBConnection.url, DBConnection.engine, DBConnection._session_factory
+        self.tempdir = TemporaryDirectory()
+        self.db_path = Path(self.tempdir.name) / 'test.db'
+        DBConnection.configure(f'sqlite:///{self.db_path}')
+
+    def tearDown(self) -> None:
+        """Restore the original connection configuration"""
+
+        DBConnection.engine.dispose()
+        DBConnection.url, DBConnection.engine, DBConnection._session_factory = self._original_state
+        self.tempdir.cleanup()
+        super().tearDown()
+
+
+class LocalSMTPServer:
+    """Mixin class that runs a local SMTP server for the duration of each test"""
+
+    def setUp(self) -> None:
+        """Start the SMTP server on a free port"""
+
+        super().setUp()
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+
+        self.handler = CountingHandler()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+
+    @staticmethod
+    def build_message(index: int) -> EmailMessage:
+        """Return a new email message"""
+
+        msg = EmailMessage()
+        msg.set_content(f'Message {index}')
+        msg['Subject'] = f'Message {index}'
+        msg['From'] = 'sender@example.com'
+        msg['To'] = 'recipient@example.com'
+        return msg
@@ -1,11 +1,20 @@
+import socket
+from datetime import datetime, timedelta
+from io import StringIO
 from unittest import TestCase
+from unittest.mock import patch
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from bank import settings
 from bank.account_logic import AdminServices
-from bank.system.slurm import SlurmAccount
-from tests._utils import EmptyAccountSetup
+from bank.exceptions import CmdError
+from bank.orm import Account, Allocation, DBConnection, Investment, Outbox, Proposal, UsageRemainder, UsageWatermark
+from bank.system.simulated import SimulatedSlurm
+from bank.system.usage import SacctUsage
+from bank.system.slurm import Slurm, SlurmAccount
+from tests._utils import account_investments_query, add_investment_to_test_account, add_proposal_to_test_account, \
+    EmptyAccountSetup, LocalSMTPServer, ProposalSetup, TemporaryDatabase, TODAY, TOMORROW, YESTERDAY
 
 
 class FindUnlockedAccounts(EmptyAccountSetup, TestCase):
@@ -53,3 +62,679 @@ class FindUnlockedAccounts(EmptyAccountSetup, TestCase):
         unlocked_accounts_by_cluster = self.admin_services.find_unlocked_account_names()
         self.assertNotIn(self.slurm_account1.account_name, unlocked_accounts_by_cluster[settings.test_cluster])
         self.assertIn(self.slurm_account2.account_name, unlocked_accounts_by_cluster[settings.test_cluster])
+
+
+class GetAccountsWithPendingChanges(EmptyAccountSetup, TestCase):
+    """Test the selection of accounts that may change status without new usage"""
+
+    def test_idle_account_not_found(self) -> None:
+        """Test an account with a long-running, healthy proposal is not returned"""
+
+        add_proposal_to_test_account(Proposal(
+            start_date=TODAY - timedelta(days=100),
+            end_date=TODAY + timedelta(days=100),
+            allocations=[Allocation(cluster_name=settings.test_cluster, service_units_total=1_000)]
+        ))
+
+        accounts = AdminServices._get_accounts_with_pending_changes(YESTERDAY, TODAY)
+        self.assertNotIn(settings.test_accounts[0], accounts)
+
+    def test_expiring_proposal_found(self) -> None:
+        """Test an account with a proposal ending in the date range is returned"""
+
+        add_proposal_to_test_account(Proposal(
+            start_date=TODAY - timedelta(days=100),
+            end_date=TODAY,
+            allocations=[Allocation(cluster_name=settings.test_cluster, service_units_total=1_000)]
+        ))
+
+        accounts = AdminServices._get_accounts_with_pending_changes(YESTERDAY, TODAY)
+        self.assertIn(settings.test_accounts[0], accounts)
+
+    def test_starting_investment_found(self) -> None:
+        """Test an account with an investment starting in the date range is returned"""
+
+        add_investment_to_test_account(Investment(
+            start_date=TODAY,
+            end_date=TODAY + timedelta(days=365),
+            service_units=1_000,
+            current_sus=1_000
+        ))
+
+        accounts = AdminServices._get_accounts_with_pending_changes(YESTERDAY, TODAY)
+        self.assertIn(settings.test_accounts[0], accounts)
+
+    def test_overdrawn_proposal_found(self) -> None:
+        """Test an account with an overdrawn allocation on its active proposal is returned"""
+
+        add_proposal_to_test_account(Proposal(
+            start_date=TODAY - timedelta(days=100),
+            end_date=TODAY + timedelta(days=100),
+            allocations=[Allocation(
+                cluster_name=settings.test_cluster,
+                service_units_total=1_000,
+                service_units_used=1_500)]
+        ))
+
+        accounts = AdminServices._get_accounts_with_pending_changes(YESTERDAY, TODAY)
+        self.assertIn(settings.test_accounts[0], accounts)
+
+
+@patch.object(settings, 'inv_rollover_fraction', 0.5)
+class RolloverInvestments(EmptyAccountSetup, TestCase):
+    """Test unused service units are carried over from expired investments"""
+
+    def setUp(self) -> None:
+        """Add a sequence of two expired investments and one active investment to the test account"""
+
+        super().setUp()
+        for offset, current_sus in ((-730, 1_001), (-365, 200), (0, 1_000)):
+            add_investment_to_test_account(Investment(
+                start_date=TODAY + timedelta(days=offset),
+                end_date=TODAY + timedelta(days=offset + 365),
+                service_units=1_000,
+                current_sus=current_sus,
+                rollover_sus=0,
+                withdrawn_sus=0
+            ))
+
+    @staticmethod
+    def get_investment_sus() -> list:
+        """Return the current and rollover service units of each test investment ordered by start date"""
+
+        with DBConnection.session() as session:
+            investments = session.execute(account_investments_query.order_by(Investment.start_date)).scalars()
+            return [(inv.current_sus, inv.rollover_sus) for inv in investments]
+
+    def test_rollovers_are_chained(self) -> None:
+        """Test service units rolled into an expired investment are carried over again"""
+
+        rollovers = AdminServices._get_investment_rollovers(TODAY)
+        self.assertEqual([1_001, 700], [rollover['expiring_sus'] for rollover in rollovers])
+        self.assertEqual([500, 350], [rollover['rollover_sus'] for rollover in rollovers])
+
+    def test_rollover_applied(self) -> None:
+        """Test expired investments are zeroed out and service units are added to the following investment"""
+
+        with patch('sys.stdout', new_callable=StringIO):
+            AdminServices.rollover_investments()
+
+        self.assertEqual([(0, 0), (0, 500), (1_350, 350)], self.get_investment_sus())
+
+        # Running the rollover again should not change anything
+        with patch('sys.stdout', new_callable=StringIO):
+            AdminServices.rollover_investments()
+
+        self.assertEqual([(0, 0), (0, 500), (1_350, 350)], self.get_investment_sus())
+
+    def test_dry_run(self) -> None:
+        """Test a dry run reports rollovers without modifying the database"""
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            AdminServices.rollover_investments(dry_run=True)
+
+        self.assertIn('dry run', stdout.getvalue())
+        self.assertEqual([(1_001, 0), (200, 0), (1_000, 0)], self.get_investment_sus())
+
+
+@patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+@patch.object(Slurm, 'partition_names', lambda cluster: ('partition1', f'{settings.test_accounts[1]}-partition'))
+class SweepExpired(ProposalSetup, TestCase):
+    """Test accounts without an active proposal or investment are locked"""
+
+    def test_expired_accounts_found(self) -> None:
+        """Test accounts are found only if they have no active proposal or investment"""
+
+        self.assertEqual({settings.test_accounts[1]}, AdminServices._get_expired_account_names())
+
+    def test_exhausted_proposal_is_expired(self) -> None:
+        """Test an account with an exhausted proposal is considered expired"""
+
+        with DBConnection.session() as session:
+            for allocation in session.execute(select(Allocation)).scalars():
+                allocation.service_units_used = allocation.service_units_total
+
+            session.commit()
+
+        self.assertIn(settings.test_accounts[0], AdminServices._get_expired_account_names())
+
+    def test_unlocked_accounts_locked(self) -> None:
+        """Test expired accounts are locked unless already locked, ignored, or holding a purchased partition"""
+
+        associations = {
+            account: {settings.test_cluster: {'GrpTRESRunMins': ''}}
+            for account in (*settings.test_accounts, 'expired1', 'expired2', 'locked', 'ignored')
+        }
+        associations['locked'][settings.test_cluster]['GrpTRESRunMins'] = 'billing=0'
+
+        expired = {settings.test_accounts[1], 'expired1', 'expired2', 'locked', 'ignored', 'not_in_slurm'}
+        with patch.object(Slurm, 'association_snapshot', return_value=associations), \
+                patch.object(AdminServices, '_get_expired_account_names', return_value=expired), \
+                patch.object(settings, 'ignore_accounts', ('ignored',)), \
+                patch.object(Slurm, 'set_locked_state') as set_locked_state, \
+                patch('sys.stdout', new_callable=StringIO):
+            AdminServices.sweep_expired()
+
+        set_locked_state.assert_called_once_with(['expired1', 'expired2'], True, settings.test_cluster)
+
+    def test_dry_run(self) -> None:
+        """Test a dry run reports accounts without locking them"""
+
+        associations = {settings.test_accounts[1]: {settings.test_cluster: {'GrpTRESRunMins': ''}}}
+        with patch.object(Slurm, 'association_snapshot', return_value=associations), \
+                patch.object(Slurm, 'partition_names', lambda cluster: ()), \
+                patch.object(Slurm, 'set_locked_state') as set_locked_state, \
+                patch('sys.stdout', new_callable=StringIO) as stdout:
+            AdminServices.sweep_expired(dry_run=True)
+
+        set_locked_state.assert_not_called()
+        self.assertIn(settings.test_accounts[1], stdout.getvalue())
+
+
+class NotifyAll(ProposalSetup, TestCase):
+    """Test notifications are sent to all accounts with an active proposal"""
+
+    def test_accounts_share_connection(self) -> None:
+        """Test every account with an active proposal is notified over the same SMTP connection"""
+
+        with patch('bank.account_logic.AccountServices') as account_services, \
+                patch('sys.stdout', new_callable=StringIO):
+            AdminServices.notify_all()
+
+        account_services.assert_called_once_with(settings.test_accounts[0])
+        smtp = account_services.return_value.notify.call_args.kwargs['smtp']
+        self.assertIsNone(smtp._smtp, 'Expected the unused SMTP connection to be closed')
+
+    def test_failures_do_not_stop_run(self) -> None:
+        """Test an error notifying one account is reported instead of raised"""
+
+        with patch('bank.account_logic.AccountServices') as account_services, \
+                patch('sys.stdout', new_callable=StringIO) as stdout, \
+                self.assertLogs('bank.account_services', level='ERROR'):
+            account_services.return_value.notify.side_effect = RuntimeError
+            AdminServices.notify_all()
+
+        self.assertIn('1 failed', stdout.getvalue())
+
+
+@patch.object(settings, 'email_rate_limit', 0)
+class SendMail(LocalSMTPServer, TestCase):
+    """Test spooled messages are delivered from the outbox"""
+
+    def setUp(self) -> None:
+        """Add spooled messages to an empty outbox"""
+
+        super().setUp()
+        with DBConnection.session() as session:
+            session.query(Outbox).delete()
+            for i in range(5):
+                msg = self.build_message(i)
+                msg.replace_header('To', f'recipient{i}@example.com')
+                session.add(Outbox(recipient=msg['To'], subject=msg['Subject'], message=msg.as_string()))
+
+            session.commit()
+
+    @staticmethod
+    def get_outbox() -> list:
+        """Return the delivery status of each message in the outbox"""
+
+        with DBConnection.session() as session:
+            return session.execute(select(Outbox).order_by(Outbox.id)).scalars().all()
+
+    def send_mail(self, port: int, **kwargs) -> None:
+        """Deliver spooled messages to the SMTP server on the given port"""
+
+        with patch.object(settings, 'smtp_host', '127.0.0.1'), \
+                patch.object(settings, 'smtp_port', port), \
+                patch('sys.stdout', new_callable=StringIO):
+            AdminServices.send_mail(**kwargs)
+
+    @patch.object(settings, 'email_batch_size', 2)
+    def test_messages_delivered(self) -> None:
+        """Test all pending messages are delivered and marked as sent"""
+
+        self.send_mail(self.port)
+
+        self.assertEqual([f'recipient{i}@example.com' for i in range(5)], self.handler.recipients)
+        self.assertEqual(1, len(set(self.handler.sessions)))
+        self.assertTrue(all(message.sent for message in self.get_outbox()))
+
+        # Delivered messages are not sent again
+        self.send_mail(self.port)
+        self.assertEqual(5, len(self.handler.recipients))
+
+    def test_delivery_limit(self) -> None:
+        """Test no more than the given number of messages are delivered"""
+
+        self.send_mail(self.port, limit=3)
+        self.assertEqual(3, len(self.handler.recipients))
+        self.assertEqual(3, sum(message.sent is not None for message in self.get_outbox()))
+
+    def test_failed_delivery_rescheduled(self) -> None:
+        """Test messages that fail to deliver are rescheduled instead of retried immediately"""
+
+        # Find a port that no server is listening on
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            closed_port = sock.getsockname()[1]
+
+        with self.assertLogs('bank.account_services', level='WARNING'):
+            self.send_mail(closed_port)
+
+        for message in self.get_outbox():
+            self.assertIsNone(message.sent)
+            self.assertEqual(1, message.attempts)
+            self.assertGreater(message.next_attempt, datetime.now())
+            self.assertTrue(message.last_error)
+
+    @patch.object(settings, 'email_max_attempts', 1)
+    def test_abandoned_after_max_attempts(self) -> None:
+        """Test messages are not delivered once the maximum number of attempts is reached"""
+
+        with DBConnection.session() as session:
+            session.execute(update(Outbox).values(attempts=1, next_attempt=datetime.now()))
+            session.commit()
+
+        self.send_mail(self.port)
+        self.assertFalse(self.handler.recipients)
+
+
+@patch('bank.settings.usage_ingestion_delay', 0)
+class IngestUsage(TemporaryDatabase, TestCase):
+    """Tests for the incremental ingestion of usage from completed jobs"""
+
+    clusters = ('cluster1', 'cluster2')
+
+    def setUp(self) -> None:
+        """Create an account with an active proposal and answer ``sacct`` calls from a list of jobs"""
+
+        super().setUp()
+        self.jobs = []
+        self.simulator = SimulatedSlurm(num_accounts=2, clusters=self.clusters, active_fraction=0)
+
+        for context in (self.simulator.activate(), patch('bank.settings.clusters', self.clusters)):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+        with DBConnection.session() as session:
+            proposal = Proposal(start_date=YESTERDAY, end_date=TOMORROW, allocations=[
+                Allocation(cluster_name=self.clusters[0], service_units_total=10, service_units_used=0)
+            ])
+            session.add(Account(name='account1', proposals=[proposal]))
+            yesterday = datetime.now() - timedelta(days=1)
+            session.add(UsageWatermark(cluster=self.clusters[0], watermark=yesterday, started=yesterday))
+            session.commit()
+
+    def sacct(self, args) -> tuple:
+        """Return the queued jobs for ``sacct`` calls and defer all other commands to the simulator"""
+
+        if args[0] != 'sacct':
+            return self.simulator(args)
+
+        cluster = args[args.index('-M') + 1]
+        return '\n'.join(
+            f'{account}|user|{end - timedelta(seconds=seconds):%Y-%m-%dT%H:%M:%S}|{end:%Y-%m-%dT%H:%M:%S}|{seconds}|'
+            f'billing={billing},cpu=1'
+            for account, job_cluster, end, seconds, billing in self.jobs if job_cluster == cluster), ''
+
+    def add_job(self, seconds: int, billing: int = 1, account: str = 'account1') -> None:
+        """Queue a job that completed shortly before the current time"""
+
+        self.jobs.append((account, self.clusters[0], datetime.now().replace(microsecond=0) - timedelta(minutes=1), seconds, billing))
+
+    def ingest(self) -> None:
+        """Run an ingestion with ``sacct`` answered from the queued jobs"""
+
+        with patch('bank.system.shell.ShellCmd.runner', self.sacct):
+            AdminServices.ingest_usage()
+
+    def get_used(self) -> int:
+        """Return the service units used on the account allocation"""
+
+        with DBConnection.session() as session:
+            return session.execute(select(Allocation.service_units_used)).scalar()
+
+    def test_usage_charged(self) -> None:
+        """Test billed job time is charged to the account allocation in hours"""
+
+        self.add_job(seconds=7200, billing=3)
+        self.ingest()
+        self.assertEqual(6, self.get_used())
+
+    def test_jobs_charged_once(self) -> None:
+        """Test jobs ending before the watermark are not charged again"""
+
+        self.add_job(seconds=3600)
+        self.ingest()
+        self.ingest()
+        self.assertEqual(1, self.get_used())
+
+        with DBConnection.session() as session:
+            watermarks = dict(session.execute(select(UsageWatermark.cluster, UsageWatermark.watermark)).all())
+
+        self.assertCountEqual(self.clusters, watermarks)
+        self.assertLess(datetime.now() - watermarks[self.clusters[0]], timedelta(minutes=1))
+
+    def test_partial_hours_carried_forward(self) -> None:
+        """Test seconds left over from each ingestion are charged once they add up to an hour"""
+
+        self.add_job(seconds=2400)
+        self.ingest()
+        self.assertEqual(0, self.get_used())
+
+        self.jobs.clear()
+        with DBConnection.session() as session:
+            session.execute(update(UsageWatermark).values(watermark=datetime.now() - timedelta(hours=1)))
+            session.commit()
+
+        self.add_job(seconds=2400)
+        self.ingest()
+        self.assertEqual(1, self.get_used())
+
+        with DBConnection.session() as session:
+            self.assertEqual(1200, session.execute(select(UsageRemainder.seconds)).scalar())
+
+    def test_recent_jobs_deferred(self) -> None:
+        """Test jobs ending within the ingestion delay are left for a later ingestion"""
+
+        self.add_job(seconds=3600)
+        with patch('bank.settings.usage_ingestion_delay', 600):
+            self.ingest()
+
+        self.assertEqual(0, self.get_used())
+        with DBConnection.session() as session:
+            watermark = session.execute(select(UsageWatermark.watermark)
+                                        .where(UsageWatermark.cluster == self.clusters[0])).scalar()
+
+        self.assertLessEqual(watermark, datetime.now() - timedelta(seconds=600))
+        self.ingest()
+        self.assertEqual(1, self.get_used())
+
+    def test_time_before_ingestion_started_not_charged(self) -> None:
+        """Test only the part of a job after ingestion started on the cluster is charged"""
+
+        two_hours_ago = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+        with DBConnection.session() as session:
+            session.execute(update(UsageWatermark).values(watermark=two_hours_ago, started=two_hours_ago))
+            session.commit()
+
+        self.add_job(seconds=3 * 3600)
+        self.ingest()
+        self.assertEqual(1, self.get_used())
+
+        with DBConnection.session() as session:
+            self.assertEqual(3600 - 60, session.execute(select(UsageRemainder.seconds)).scalar())
+
+    def test_new_clusters_start_at_midnight(self) -> None:
+        """Test ingestion on clusters without a watermark starts from midnight"""
+
+        self.ingest()
+        midnight = datetime.combine(datetime.now().date(), datetime.min.time())
+        with DBConnection.session() as session:
+            watermark = session.execute(select(UsageWatermark)
+                                        .where(UsageWatermark.cluster == self.clusters[1])).scalar()
+            self.assertEqual(midnight, watermark.started)
+
+    def test_overdrawn_account_locked(self) -> None:
+        """Test accounts are locked as soon as ingested usage exceeds their allocation"""
+
+        self.add_job(seconds=11 * 3600)
+        self.ingest()
+        self.assertTrue(SlurmAccount('account1').get_locked_state(self.clusters[0]))
+
+    def test_failed_ingestion_not_recorded(self) -> None:
+        """Test watermarks are not advanced when ``sacct`` fails"""
+
+        with DBConnection.session() as session:
+            original = session.execute(select(UsageWatermark.watermark)).scalar()
+
+        def fail_sacct(args):
+            return ('', 'sacct: error') if args[0] == 'sacct' else self.simulator(args)
+
+        with patch('bank.system.shell.ShellCmd.runner', fail_sacct), self.assertRaises(CmdError):
+            AdminServices.ingest_usage()
+
+        with DBConnection.session() as session:
+            self.assertEqual([original], session.execute(select(UsageWatermark.watermark)).scalars().all())
+
+
+@patch('bank.settings.usage_source', 'sshare')
+class CumulativeUsageSource(TemporaryDatabase, TestCase):
+    """Test nightly status updates do not charge usage from sources that ignore date ranges"""
+
+    clusters = ('cluster1',)
+
+    def setUp(self) -> None:
+        """Create an account with raw usage in a simulated Slurm installation"""
+
+        super().setUp()
+        self.simulator = SimulatedSlurm(num_accounts=1, clusters=self.clusters, active_fraction=1)
+        self.simulator.raw_usage['account1', self.clusters[0]] = 36000
+
+        for context in (self.simulator.activate(), patch('bank.settings.clusters', self.clusters)):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+        with DBConnection.session() as session:
+            proposal = Proposal(start_date=YESTERDAY, end_date=TOMORROW, allocations=[
+                Allocation(cluster_name=self.clusters[0], service_units_total=1000, service_units_used=0)
+            ])
+            session.add(Account(name='account1', proposals=[proposal]))
+            session.commit()
+
+    def get_used(self) -> int:
+        """Return the service units used on the account allocation"""
+
+        with DBConnection.session() as session:
+            return session.execute(select(Allocation.service_units_used)).scalar()
+
+    def test_nightly_updates_rejected(self) -> None:
+        """Test consecutive nightly updates raise an error instead of charging raw usage again"""
+
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, 'sshare'):
+                AdminServices.update_account_status()
+
+        self.assertEqual(0, self.get_used())
+        self.assertEqual(0, self.simulator.calls['sshare'])
+
+    @patch('bank.settings.usage_ingestion', True)
+    def test_allowed_with_usage_ingestion(self) -> None:
+        """Test nightly updates run when usage is charged by ingestion instead"""
+
+        AdminServices.update_account_status()
+        AdminServices.update_account_status()
+        self.assertEqual(0, self.get_used())
+
+
+class SyncLimits(TemporaryDatabase, TestCase):
+    """Tests for pushing available service units into Slurm ``GrpTRESMins`` limits"""
+
+    clusters = ('cluster1', 'cluster2')
+
+    def setUp(self) -> None:
+        """Create accounts with and without available service units in a simulated Slurm installation"""
+
+        super().setUp()
+        self.simulator = SimulatedSlurm(num_accounts=3, clusters=self.clusters, active_fraction=0)
+        self.simulator.raw_usage['account1', self.clusters[0]] = 6000
+
+        for context in (self.simulator.activate(), patch('bank.settings.clusters', self.clusters)):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+        with DBConnection.session() as session:
+            proposal = Proposal(start_date=YESTERDAY, end_date=TOMORROW, allocations=[
+                Allocation(cluster_name=self.clusters[0], service_units_total=100, service_units_used=40),
+                Allocation(cluster_name='all_clusters', service_units_total=10, service_units_used=0)
+            ])
+            investment = Investment(start_date=YESTERDAY, end_date=TOMORROW, service_units=5, current_sus=5,
+                                    withdrawn_sus=0, rollover_sus=0)
+            session.add(Account(name='account1', proposals=[proposal], investments=[investment]))
+            session.add(Account(name='account2'))
+            session.commit()
+
+    def get_limit(self, account: str, cluster: str) -> str:
+        """Return the ``GrpTRESMins`` limit of an account in the simulator"""
+
+        return self.simulator.limits[account, cluster]['grptresmins']
+
+    def sync(self, dry_run: bool = False) -> str:
+        """Run a limit synchronization and return its output"""
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            AdminServices.sync_limits(dry_run=dry_run)
+
+        return stdout.getvalue()
+
+    def test_limits_include_usage_and_available_sus(self) -> None:
+        """Test limits combine existing raw usage with allocation, floating, and investment service units"""
+
+        self.sync()
+        self.assertEqual(f'billing={100 + 60 * (60 + 10 + 5)}', self.get_limit('account1', self.clusters[0]))
+        self.assertEqual(f'billing={60 * (10 + 5)}', self.get_limit('account1', self.clusters[1]))
+        self.assertEqual('billing=0', self.get_limit('account2', self.clusters[0]))
+
+    def test_uncharged_usage_excluded(self) -> None:
+        """Test raw usage that has not been charged yet is not counted toward the limit"""
+
+        with patch.object(SacctUsage, 'usage_after', return_value={'account1': 40 * 60 + 1}):
+            self.sync()
+
+        self.assertEqual(f'billing={100 - 41 + 60 * 75}', self.get_limit('account1', self.clusters[0]))
+        self.assertEqual('billing=0', self.get_limit('account2', self.clusters[0]))
+
+    def test_uncharged_usage_since_midnight(self) -> None:
+        """Test usage since midnight is uncharged when usage is charged by daily status updates"""
+
+        midnight = datetime.combine(TODAY, datetime.min.time())
+        with patch.object(SacctUsage, 'usage_after', return_value={'account1': 60}) as usage_after:
+            self.assertEqual({'account1': 60}, AdminServices._get_uncharged_seconds(self.clusters[0]))
+
+        usage_after.assert_called_once_with(self.clusters[0], midnight, midnight)
+
+    @patch('bank.settings.usage_ingestion', True)
+    def test_uncharged_usage_since_watermark(self) -> None:
+        """Test jobs after the watermark and carried forward seconds are uncharged when usage is ingested"""
+
+        started, watermark = datetime(2024, 1, 1), datetime(2024, 1, 2)
+        with DBConnection.session() as session:
+            session.add(UsageWatermark(cluster=self.clusters[0], watermark=watermark, started=started))
+            session.add(UsageRemainder(account_name='account1', cluster=self.clusters[0], seconds=100))
+            session.add(UsageRemainder(account_name='account2', cluster=self.clusters[0], seconds=5))
+            session.commit()
+
+        with patch.object(SacctUsage, 'usage_after', return_value={'account1': 60}) as usage_after:
+            uncharged = AdminServices._get_uncharged_seconds(self.clusters[0])
+
+        usage_after.assert_called_once_with(self.clusters[0], watermark, started)
+        self.assertEqual({'account1': 160, 'account2': 5}, uncharged)
+
+    def test_accounts_outside_bank_unchanged(self) -> None:
+        """Test accounts without a database entry are not limited"""
+
+        self.sync()
+        self.assertEqual('', self.get_limit('account3', self.clusters[0]))
+
+    def test_unchanged_limits_skipped(self) -> None:
+        """Test limits within the tolerance of their current value are not updated"""
+
+        self.sync()
+        self.simulator.limits['account1', self.clusters[1]]['grptresmins'] = f'billing={60 * 15 + 30}'
+        with patch.object(Slurm, 'set_billing_minutes_limits') as set_limits:
+            self.sync()
+
+        set_limits.assert_not_called()
+
+    def test_purchased_partition_skipped(self) -> None:
+        """Test accounts are not limited on clusters where they have a purchased partition"""
+
+        self.simulator.partitions[self.clusters[0]].append(f'account1-{self.clusters[0]}')
+        self.sync()
+        self.assertEqual('', self.get_limit('account1', self.clusters[0]))
+        self.assertNotEqual('', self.get_limit('account1', self.clusters[1]))
+
+    def test_limits_synced_after_raw_usage_reset(self) -> None:
+        """Test limits of reset accounts no longer include the raw usage from before the reset"""
+
+        self.sync()
+        with patch('sys.stdout', new_callable=StringIO):
+            AdminServices.reset_raw_usage(accounts=['account1'])
+
+        self.assertEqual(f'billing={60 * 75}', self.get_limit('account1', self.clusters[0]))
+
+    def test_unlimited_accounts_not_limited_after_reset(self) -> None:
+        """Test resetting raw usage does not add limits to accounts without one"""
+
+        with patch('sys.stdout', new_callable=StringIO):
+            AdminServices.reset_raw_usage(accounts=['account1'])
+
+        self.assertEqual('', self.get_limit('account1', self.clusters[0]))
+
+    def test_dry_run(self) -> None:
+        """Test limits are printed but not updated during a dry run"""
+
+        output = self.sync(dry_run=True)
+        self.assertIn(f'account1: billing={100 + 60 * 75}', output)
+        self.assertEqual('', self.get_limit('account1', self.clusters[0]))
+
+
+class ResetRawUsage(TestCase):
+    """Tests for resetting the raw usage of multiple accounts"""
+
+    clusters = ('cluster1', 'cluster2')
+
+    def setUp(self) -> None:
+        """Activate a simulated Slurm installation where every account has raw usage"""
+
+        self.simulator = SimulatedSlurm(num_accounts=5, clusters=self.clusters)
+        for key in self.simulator.raw_usage:
+            self.simulator.raw_usage[key] = 100
+
+        for context in (self.simulator.activate(), patch('bank.settings.clusters', self.clusters)):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+    def reset(self, **kwargs) -> str:
+        """Reset raw usage and return the printed output"""
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            AdminServices.reset_raw_usage(**kwargs)
+
+        return stdout.getvalue()
+
+    def test_all_accounts_reset(self) -> None:
+        """Test every account is reset on every cluster except ignored accounts"""
+
+        self.simulator.add_account('root')
+        self.simulator.raw_usage['root', self.clusters[0]] = 100
+
+        output = self.reset(all_accounts=True)
+        self.assertEqual({('root', self.clusters[0]): 100}, {k: v for k, v in self.simulator.raw_usage.items() if v})
+        self.assertIn('Reset 5/5 accounts', output)
+
+    @patch.object(Slurm, 'max_accounts_arg_length', 20)
+    def test_progress_reported_per_batch(self) -> None:
+        """Test progress is printed after each batched command"""
+
+        output = self.reset(all_accounts=True)
+        self.assertIn('Reset 2/5 accounts', output)
+        self.assertIn('Reset raw usage for 5 accounts on 2 clusters', output)
+
+    def test_selected_accounts_reset(self) -> None:
+        """Test only the given accounts are reset and unknown accounts are skipped"""
+
+        with self.assertLogs('bank.account_services', level='WARNING'):
+            self.reset(accounts=['account1', 'account2', 'fake_account'])
+
+        reset_accounts = {account for (account, _), usage in self.simulator.raw_usage.items() if not usage}
+        self.assertEqual({'account1', 'account2'}, reset_accounts)
+
+    def test_nothing_reset_without_clusters(self) -> None:
+        """Test no accounts are reset when none of the configured clusters exist in Slurm"""
+
+        with patch('bank.settings.clusters', ('fake_cluster',)):
+            output = self.reset(all_accounts=True)
+
+        self.assertIn('No accounts or clusters to reset', output)
+        self.assertTrue(all(self.simulator.raw_usage.values()))
@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from sqlalchemy import select
 
@@ -7,7 +10,8 @@ from bank import settings
 from bank.account_logic import InvestmentServices
 from bank.exceptions import MissingInvestmentError, MissingProposalError, AccountNotFoundError
 from bank.orm import Account, DBConnection, Investment
-from tests._utils import InvestmentSetup, ProposalSetup
+from bank.system import Slurm
+from tests._utils import InvestmentSetup, ProposalSetup, TODAY
 
 investments_query = select(Investment) \
     .join(Account) \
@@ -82,6 +86,73 @@ class CreateInvestment(ProposalSetup, TestCase):
             self.assertEqual(test_sus, total_sus)
 
 
+@patch.object(Slurm, 'association_snapshot', return_value={account: dict() for account in settings.test_accounts})
+class CreateFromFile(ProposalSetup, TestCase):
+    """Tests for the bulk creation of investments from a file"""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for writing CSV files"""
+
+        super().setUp()
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def write_csv(self, *lines: str) -> Path:
+        """Write the given lines to a temporary CSV file and return its path"""
+
+        path = Path(self.tempdir.name) / 'investments.csv'
+        path.write_text('\n'.join(lines) + '\n')
+        return path
+
+    def test_investments_are_created(self, *args) -> None:
+        """Test investments are created for each row in the file"""
+
+        start = TODAY.strftime(settings.date_format)
+        end = (TODAY + timedelta(days=100)).strftime(settings.date_format)
+        path = self.write_csv(
+            'account,sus,start,end,num_inv',
+            f'{settings.test_accounts[0]},1000,,,',
+            f'{settings.test_accounts[0]},3000,{start},{end},3')
+
+        InvestmentServices.create_from_file(path)
+
+        with DBConnection.session() as session:
+            investments = session.execute(investments_query.order_by(Investment.id)).scalars().all()
+            self.assertEqual([1000, 1000, 1000, 1000], [inv.service_units for inv in investments])
+            self.assertEqual(TODAY + timedelta(days=100), investments[1].end_date)
+
+    def test_nothing_created_on_invalid_row(self, *args) -> None:
+        """Test no investments are created if any row in the file is invalid"""
+
+        path = self.write_csv('account,sus', f'{settings.test_accounts[0]},1000', f'{settings.test_accounts[0]},0')
+        with self.assertRaisesRegex(ValueError, 'line 3'):
+            InvestmentServices.create_from_file(path)
+
+        with DBConnection.session() as session:
+            self.assertFalse(session.execute(investments_query).scalars().all())
+
+    def test_error_on_missing_column(self, *args) -> None:
+        """Test an error is raised if a required column is missing"""
+
+        path = self.write_csv('account,start', f'{settings.test_accounts[0]},')
+        with self.assertRaisesRegex(ValueError, 'sus'):
+            InvestmentServices.create_from_file(path)
+
+    def test_error_on_missing_slurm_account(self, *args) -> None:
+        """Test an error is raised for accounts that do not exist in Slurm"""
+
+        path = self.write_csv('account,sus', f'{settings.nonexistent_account},1000')
+        with self.assertRaises(AccountNotFoundError):
+            InvestmentServices.create_from_file(path)
+
+    def test_error_on_missing_proposal(self, *args) -> None:
+        """Test an error is raised for accounts without a proposal"""
+
+        path = self.write_csv('account,sus', f'{settings.test_accounts[1]},1000')
+        with self.assertRaises(MissingProposalError):
+            InvestmentServices.create_from_file(path)
+
+
 class DeleteInvestment(ProposalSetup, InvestmentSetup, TestCase):
     """Tests the deletion of investments with ``delete``"""
 
@@ -1,5 +1,9 @@
+import json
 from datetime import date, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from sqlalchemy import join, select
 from dateutil.relativedelta import relativedelta
@@ -8,6 +12,7 @@ from bank import settings
 from bank.account_logic import ProposalServices
 from bank.exceptions import MissingProposalError, ProposalExistsError, AccountNotFoundError
 from bank.orm import Account, Allocation, DBConnection, Proposal
+from bank.system import Slurm
 from tests._utils import active_proposal_query, account_proposals_query, DAY_AFTER_TOMORROW, DAY_BEFORE_YESTERDAY, \
     EmptyAccountSetup, ProposalSetup, TODAY, TOMORROW, YESTERDAY
 
@@ -69,6 +74,124 @@ class CreateProposal(EmptyAccountSetup, TestCase):
             self.account.create(**{settings.test_cluster: -1})
 
 
+@patch.object(Slurm, 'association_snapshot', return_value={account: dict() for account in settings.test_accounts})
+class CreateFromFile(ProposalSetup, TestCase):
+    """Tests for the bulk creation of proposals from a file"""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for writing input files"""
+
+        super().setUp()
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def write_file(self, name: str, content: str) -> Path:
+        """Write the given content to a temporary file and return its path"""
+
+        path = Path(self.tempdir.name) / name
+        path.write_text(content)
+        return path
+
+    @staticmethod
+    def fmt(value: date) -> str:
+        """Format a date using the application date format"""
+
+        return value.strftime(settings.date_format)
+
+    def test_proposals_created_from_csv(self, *args) -> None:
+        """Test proposals and allocations are created for each row of a CSV file"""
+
+        path = self.write_file('proposals.csv', '\n'.join([
+            f'account,start,end,{settings.clusters[0]}',
+            f'{settings.test_accounts[1]},{self.fmt(TODAY)},{self.fmt(TOMORROW)},100',
+            f'{settings.test_accounts[1]},{self.fmt(TOMORROW)},{self.fmt(DAY_AFTER_TOMORROW)},200',
+        ]))
+
+        ProposalServices.create_from_file(path)
+
+        query = select(Allocation.service_units_total) \
+            .join(Proposal).join(Account) \
+            .where(Account.name == settings.test_accounts[1]) \
+            .where(Allocation.cluster_name == settings.clusters[0]) \
+            .order_by(Proposal.start_date)
+
+        with DBConnection.session() as session:
+            self.assertEqual([100, 200], session.execute(query).scalars().all())
+
+    def test_proposals_created_from_json(self, *args) -> None:
+        """Test proposals are created for each object in a JSON file"""
+
+        records = [{'account': settings.test_accounts[1], 'all_clusters': 500}]
+        path = self.write_file('proposals.json', json.dumps(records))
+
+        ProposalServices.create_from_file(path)
+
+        query = select(Proposal).join(Account).where(Account.name == settings.test_accounts[1])
+        with DBConnection.session() as session:
+            proposal = session.execute(query).scalars().one()
+            self.assertEqual(TODAY, proposal.start_date)
+
+    def test_all_conflicts_reported(self, *args) -> None:
+        """Test overlaps with existing proposals and other rows are reported together"""
+
+        far_future = TODAY + timedelta(days=3650)
+        path = self.write_file('proposals.csv', '\n'.join([
+            'account,start,end',
+            f'{settings.test_accounts[0]},{self.fmt(TOMORROW)},{self.fmt(DAY_AFTER_TOMORROW)}',
+            f'{settings.test_accounts[1]},{self.fmt(far_future)},{self.fmt(far_future + timedelta(days=10))}',
+            f'{settings.test_accounts[1]},{self.fmt(far_future + timedelta(days=5))},'
+            f'{self.fmt(far_future + timedelta(days=20))}',
+        ]))
+
+        with self.assertRaises(ProposalExistsError) as error:
+            ProposalServices.create_from_file(path)
+
+        self.assertIn('line 2', str(error.exception))
+        self.assertIn('line 4', str(error.exception))
+        with DBConnection.session() as session:
+            self.assertEqual(0, session.query(Proposal).join(Account)
+                             .where(Account.name == settings.test_accounts[1]).count())
+
+    def test_adjacent_proposals_do_not_conflict(self, *args) -> None:
+        """Test proposals that end on the start date of another proposal do not overlap"""
+
+        ranges = [(TODAY, TOMORROW, 'new', True), (TOMORROW, DAY_AFTER_TOMORROW, 'existing', False)]
+        self.assertEqual([], ProposalServices._find_overlaps(ranges))
+
+    def test_existing_overlaps_ignored(self, *args) -> None:
+        """Test overlaps between two existing proposals are not reported"""
+
+        ranges = [(TODAY, DAY_AFTER_TOMORROW, 'existing 1', False), (TOMORROW, DAY_AFTER_TOMORROW, 'existing 2', False)]
+        self.assertEqual([], ProposalServices._find_overlaps(ranges))
+
+    def test_force_allows_overlap(self, *args) -> None:
+        """Test overlapping proposals are created when ``force`` is set"""
+
+        with DBConnection.session() as session:
+            num_proposals = len(session.execute(account_proposals_query).scalars().all())
+
+        path = self.write_file('proposals.csv', f'account\n{settings.test_accounts[0]}\n')
+        with self.assertWarns(UserWarning):
+            ProposalServices.create_from_file(path, force=True)
+
+        with DBConnection.session() as session:
+            self.assertEqual(num_proposals + 1, len(session.execute(account_proposals_query).scalars().all()))
+
+    def test_error_on_missing_slurm_account(self, *args) -> None:
+        """Test an error is raised for accounts that do not exist in Slurm"""
+
+        path = self.write_file('proposals.csv', f'account\n{settings.nonexistent_account}\n')
+        with self.assertRaises(AccountNotFoundError):
+            ProposalServices.create_from_file(path)
+
+    def test_error_on_unknown_field(self, *args) -> None:
+        """Test an error is raised for fields that are not a date or cluster name"""
+
+        path = self.write_file('proposals.csv', f'account,fake_cluster\n{settings.test_accounts[1]},100\n')
+        with self.assertRaisesRegex(ValueError, 'fake_cluster'):
+            ProposalServices.create_from_file(path)
+
+
 class DeleteProposal(ProposalSetup, TestCase):
     """Test the deletion of proposals via the ``delete`` method"""
 
@@ -1,8 +1,19 @@
 """Tests for the ``CommandLineApplication`` class"""
 
+import subprocess
+import sys
+from textwrap import dedent
 from unittest import TestCase
+from unittest.mock import patch
 
+from sqlalchemy import select
+
+from bank import settings
+from bank.account_logic import AdminServices
 from bank.cli.app import CommandLineApplication
+from bank.orm import Account, DBConnection
+from bank.system.slurm import Slurm
+from tests._utils import TemporaryDatabase
 
 
 class HasSubparsers(TestCase):
@@ -33,3 +44,107 @@ class HasSubparsers(TestCase):
         """Test the application parser has an ``investment`` subparser"""
 
         self.assertIn('investment', self.cli_choices)
+
+
+class LazySubparsers(TestCase):
+    """Test subparsers are only built for the selected command"""
+
+    def test_unselected_commands_available(self) -> None:
+        """Test every command remains available when no subparsers are built"""
+
+        choices = CommandLineApplication(commands=()).subparsers.choices
+        self.assertCountEqual(CommandLineApplication.commands, choices)
+
+    def test_selected_command(self) -> None:
+        """Test the first positional argument is selected when it names a command"""
+
+        self.assertEqual({'account'}, CommandLineApplication._selected_commands(['account', 'info', 'sam']))
+        self.assertEqual(set(), CommandLineApplication._selected_commands(['--version']))
+        self.assertEqual(set(), CommandLineApplication._selected_commands(['fake_command']))
+
+
+@patch.object(Slurm, 'cluster_names', lambda: frozenset({settings.test_cluster}))
+class BatchCommands(TemporaryDatabase, TestCase):
+    """Test batch commands commit changes for each account separately"""
+
+    account_names = ('account1', 'account2', 'account3')
+
+    class FailingAccountServices:
+        """Stand in for ``AccountServices`` that records each update and fails on the last account"""
+
+        def __init__(self, account_name: str) -> None:
+            self.account_name = account_name
+
+        def update_status(self, usage=None) -> None:
+            with DBConnection.session() as session:
+                session.add(Account(name=self.account_name))
+                session.commit()
+
+            if self.account_name == BatchCommands.account_names[-1]:
+                raise RuntimeError(f'Failed to update {self.account_name}')
+
+    def test_earlier_accounts_committed(self) -> None:
+        """Test updates to earlier accounts are kept when a later account fails"""
+
+        with patch.object(AdminServices, 'find_unlocked_account_names',
+                          return_value={settings.test_cluster: set(self.account_names)}), \
+                patch.object(AdminServices, '_get_usage_by_account',
+                             return_value={name: {settings.test_cluster: 1} for name in self.account_names}), \
+                patch.object(AdminServices, '_get_accounts_with_pending_changes', return_value=set()), \
+                patch('bank.account_logic.AccountServices', self.FailingAccountServices), \
+                self.assertRaises(RuntimeError):
+            CommandLineApplication.run(['admin', 'update_status'])
+
+        with DBConnection.engine.connect() as connection:
+            committed = connection.execute(select(Account.name)).scalars().all()
+
+        self.assertCountEqual(self.account_names[:-1], committed)
+
+
+class StartupTime(TestCase):
+    """Benchmark the time needed to start the commandline application"""
+
+    # Maximum cumulative import time allowed for the commandline application (in seconds)
+    import_budget = 0.25
+
+    # Modules that should only be imported by commands that need them
+    deferred_modules = ('sqlalchemy', 'sqlalchemy_utils', 'prettytable', 'bs4', 'dateutil', 'bank.account_logic')
+
+    @staticmethod
+    def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+        """Run python code in a new interpreter and return the completed process"""
+
+        return subprocess.run([sys.executable, *options, '-c', code], capture_output=True, text=True, check=True)
+
+    def test_import_time_within_budget(self) -> None:
+        """Test the commandline application imports within the time budget"""
+
+        # Import times are reported on STDERR as ``import time: self [us] | cumulative | name``
+        stderr = self.run_python('import bank.cli.app', '-X', 'importtime').stderr
+        cumulative_times = {
+            line.split('|')[2].strip(): int(line.split('|')[1])
+            for line in stderr.splitlines() if line.startswith('import time:') and 'cumulative' not in line
+        }
+
+        import_time = cumulative_times['bank.cli.app'] / 1_000_000
+        self.assertLess(import_time, self.import_budget, f'Importing bank.cli.app took {import_time:.3f} seconds')
+
+    def test_heavy_modules_deferred(self) -> None:
+        """Test printing the application version does not import heavy dependencies"""
+
+        code = dedent("""
+            import sys
+            from bank.cli.app import CommandLineApplication
+
+            try:
+                CommandLineApplication.run(['--version'])
+
+            except SystemExit:
+                pass
+
+            print(*sys.modules, sep='\\n')
+        """)
+
+        imported_modules = self.run_python(code).stdout.splitlines()
+        for module in self.deferred_modules:
+            self.assertNotIn(module, imported_modules)
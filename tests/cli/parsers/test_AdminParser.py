@@ -25,6 +25,52 @@ class UpdateStatus(CLIAsserts, TestCase):
             AdminParser().parse_args(['update_status', 'account1'])
 
 
+class IngestUsage(CLIAsserts, TestCase):
+    """Test the ``ingest_usage`` subparser"""
+
+    def test_no_arguments(self) -> None:
+        """Test the subparser call is valid without any additional arguments"""
+
+        self.assert_parser_matches_func_signature(AdminParser(), 'ingest_usage')
+
+
+class SyncLimits(CLIAsserts, TestCase):
+    """Test the ``sync_limits`` subparser"""
+
+    def test_dry_run_argument(self) -> None:
+        """Test the subparser call is valid with and without the ``--dry-run`` argument"""
+
+        self.assert_parser_matches_func_signature(AdminParser(), 'sync_limits')
+        self.assert_parser_matches_func_signature(AdminParser(), 'sync_limits --dry-run')
+
+
+class ResetRawUsage(CLIAsserts, TestCase):
+    """Test the ``reset_raw_usage`` subparser"""
+
+    def test_all_accounts(self) -> None:
+        """Test the subparser call is valid with the ``--all`` argument"""
+
+        self.assert_parser_matches_func_signature(AdminParser(), 'reset_raw_usage --all')
+
+    def test_account_names(self) -> None:
+        """Test the ``--accounts`` argument accepts multiple account names"""
+
+        args = AdminParser().parse_args(['reset_raw_usage', '--accounts', 'account1', 'account2'])
+        self.assertEqual(['account1', 'account2'], args.accounts)
+
+    def test_error_without_accounts(self) -> None:
+        """Test a ``SystemExit`` error is raised if neither ``--all`` or ``--accounts`` is given"""
+
+        with self.assertRaises(SystemExit):
+            AdminParser().parse_args(['reset_raw_usage'])
+
+    def test_error_on_both_arguments(self) -> None:
+        """Test a ``SystemExit`` error is raised if ``--all`` and ``--accounts`` are both given"""
+
+        with self.assertRaisesRegex(SystemExit, 'not allowed with argument'):
+            AdminParser().parse_args(['reset_raw_usage', '--all', '--accounts', 'account1'])
+
+
 class ListLocked(CLIAsserts, TestCase):
     """Test the ``list_locked`` subparser"""
 
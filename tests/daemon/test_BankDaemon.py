@@ -0,0 +1,220 @@
+"""Tests for the ``BankDaemon`` and ``DaemonClient`` classes."""
+
+import os
+import sys
+import warnings
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank import __version__, settings
+from bank.cli.app import CommandLineApplication
+from bank.daemon import BankDaemon, DaemonClient
+from bank.system.identity import caller_uid
+from bank.system.slurm import Slurm
+
+
+class ForwardWithoutDaemon(TestCase):
+    """Test commands are not forwarded when the daemon is not running"""
+
+    def test_missing_socket(self) -> None:
+        """Test ``None`` is returned when the socket file does not exist"""
+
+        with TemporaryDirectory() as tempdir:
+            client = DaemonClient(os.path.join(tempdir, 'bankd.sock'))
+            self.assertFalse(client.is_running())
+            self.assertIsNone(client.forward(['--version']))
+
+    def test_disabled_socket(self) -> None:
+        """Test ``None`` is returned when no socket path is configured"""
+
+        self.assertIsNone(DaemonClient(None).forward(['--version']))
+
+    @patch.object(Slurm, 'cluster_names', return_value=frozenset({settings.test_cluster}))
+    def test_busy_daemon(self, *args) -> None:
+        """Test ``None`` is returned when the daemon does not accept the request in time"""
+
+        with TemporaryDirectory() as tempdir:
+            socket_path = os.path.join(tempdir, 'bankd.sock')
+            daemon = BankDaemon(socket_path)
+            try:
+                self.assertIsNone(DaemonClient(socket_path, timeout=0.1).forward(['--version']))
+
+            finally:
+                daemon.server_close()
+
+    def test_batch_commands_run_locally(self) -> None:
+        """Test batch commands are executed locally without contacting the daemon"""
+
+        with patch.object(sys, 'argv', ['crc-bank', 'admin', 'update_status']), \
+                patch.object(DaemonClient, 'forward') as forward, \
+                patch.object(CommandLineApplication, 'run') as run:
+            CommandLineApplication.execute()
+
+        forward.assert_not_called()
+        run.assert_called_once_with(['admin', 'update_status'])
+
+    def test_other_commands_forwarded(self) -> None:
+        """Test commands other than batch commands are offered to the daemon first"""
+
+        with patch.object(sys, 'argv', ['crc-bank', 'account', 'info', '--account', 'sam']), \
+                patch.object(DaemonClient, 'forward', return_value=0) as forward, \
+                self.assertRaises(SystemExit):
+            CommandLineApplication.execute()
+
+        forward.assert_called_once_with(['account', 'info', '--account', 'sam'])
+
+
+@patch.object(Slurm, 'cluster_names', return_value=frozenset({settings.test_cluster}))
+class ForwardToDaemon(TestCase):
+    """Test commands are executed by a running daemon"""
+
+    def setUp(self) -> None:
+        """Start a daemon in a background thread"""
+
+        self.tempdir = TemporaryDirectory()
+        self.socket_path = os.path.join(self.tempdir.name, 'bankd.sock')
+        self.daemon = BankDaemon(self.socket_path)
+        self.thread = Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        """Stop the daemon and clean up the socket file"""
+
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.server_close()
+        self.tempdir.cleanup()
+
+    def forward(self, argv: list) -> tuple:
+        """Forward the given arguments and return the exit status, STDOUT, and STDERR"""
+
+        stdout, stderr = StringIO(), StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            status = DaemonClient(self.socket_path).forward(argv)
+
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_daemon_is_running(self, *args) -> None:
+        """Test the client detects the running daemon"""
+
+        self.assertTrue(DaemonClient(self.socket_path).is_running())
+
+    def test_socket_permissions(self, *args) -> None:
+        """Test the socket file is only accessible by its owner"""
+
+        self.assertEqual(0o600, os.stat(self.socket_path).st_mode & 0o777)
+
+    def test_output_returned(self, *args) -> None:
+        """Test the command output and exit status are returned to the client"""
+
+        status, stdout, _ = self.forward(['--version'])
+        self.assertEqual(0, status)
+        self.assertEqual(__version__, stdout.strip())
+
+    def test_error_returned(self, *args) -> None:
+        """Test parsing errors are reported with a non-zero exit status"""
+
+        status, _, stderr = self.forward(['fake_command'])
+        self.assertEqual(1, status)
+        self.assertIn('fake_command', stderr)
+
+    def test_second_daemon_refused(self, *args) -> None:
+        """Test a ``RuntimeError`` is raised when binding to a socket that is in use"""
+
+        with self.assertRaises(RuntimeError):
+            BankDaemon(self.socket_path)
+
+
+class PeerCredentials(TestCase):
+    """Test privilege checks use the credentials of the calling process"""
+
+    def test_authorized_users(self) -> None:
+        """Test only root and the user running the daemon are authorized"""
+
+        self.assertTrue(BankDaemon.is_authorized(0))
+        self.assertTrue(BankDaemon.is_authorized(os.geteuid()))
+        self.assertFalse(BankDaemon.is_authorized(os.geteuid() + 1))
+
+    def test_caller_uid_defaults_to_current_user(self) -> None:
+        """Test the effective user ID is returned outside a forwarded command"""
+
+        self.assertEqual(os.geteuid(), caller_uid())
+
+    @patch.object(Slurm, 'cluster_names', return_value=frozenset({settings.test_cluster}))
+    def test_caller_uid_is_peer_uid(self, *args) -> None:
+        """Test forwarded commands are attributed to the peer instead of the daemon"""
+
+        observed = []
+        with TemporaryDirectory() as tempdir, \
+                patch('bank.cli.app.CommandLineApplication.run', side_effect=lambda argv: observed.append(caller_uid())):
+            daemon = BankDaemon(os.path.join(tempdir, 'bankd.sock'))
+            try:
+                daemon.run_command(['--version'], tempdir, uid=0)
+                daemon.run_command(['--version'], tempdir, uid=12345)
+
+            finally:
+                daemon.server_close()
+
+        self.assertEqual([0, 12345], observed)
+        self.assertEqual(os.geteuid(), caller_uid())
+
+
+class Warnings(TestCase):
+    """Test warnings are reported for every forwarded command"""
+
+    @patch.object(Slurm, 'cluster_names', return_value=frozenset({settings.test_cluster}))
+    def test_repeated_warnings_reported(self, *args) -> None:
+        """Test the same warning is written to STDERR of every command that raises it"""
+
+        def warn(argv) -> None:
+            warnings.warn('Proposals overlap')
+
+        with TemporaryDirectory() as tempdir, patch('bank.cli.app.CommandLineApplication.run', side_effect=warn):
+            daemon = BankDaemon(os.path.join(tempdir, 'bankd.sock'))
+            try:
+                responses = [daemon.run_command(['--version'], tempdir) for _ in range(2)]
+
+            finally:
+                daemon.server_close()
+
+        for response in responses:
+            self.assertIn('Proposals overlap', response['stderr'])
+
+
+class CacheRefresh(TestCase):
+    """Test which cached Slurm data is refreshed between forwarded commands"""
+
+    def setUp(self) -> None:
+        """Create a daemon with a cache lifetime longer than the test"""
+
+        self.tempdir = TemporaryDirectory()
+        self.daemon = BankDaemon(os.path.join(self.tempdir.name, 'bankd.sock'), cache_ttl=3600)
+
+    def tearDown(self) -> None:
+        """Close the daemon and clean up the socket file"""
+
+        self.daemon.server_close()
+        self.tempdir.cleanup()
+
+    @patch('bank.cli.app.CommandLineApplication.run')
+    def test_associations_refreshed_every_command(self, *args) -> None:
+        """Test the association snapshot is cleared before each command"""
+
+        with patch.object(Slurm.association_snapshot, 'cache_clear') as clear_snapshot:
+            self.daemon.run_command(['--version'], self.tempdir.name)
+            self.daemon.run_command(['--version'], self.tempdir.name)
+
+        self.assertEqual(2, clear_snapshot.call_count)
+
+    @patch('bank.cli.app.CommandLineApplication.run')
+    def test_names_cached_within_ttl(self, *args) -> None:
+        """Test cluster and partition names are not cleared before the cache expires"""
+
+        with patch.object(Slurm, 'clear_cache') as clear_cache:
+            self.daemon.run_command(['--version'], self.tempdir.name)
+
+        clear_cache.assert_not_called()
@@ -0,0 +1,220 @@
+"""Tests for the ``DBConnection`` class."""
+
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from sqlalchemy import inspect, select
+
+from bank import settings
+from bank.orm import Account, DBConnection
+from tests._utils import TemporaryDatabase
+
+
+class LazyInitialization(TemporaryDatabase, TestCase):
+    """Test the database is only initialized on first use"""
+
+    def test_configure_does_not_connect(self) -> None:
+        """Test configuring the connection does not create the database file"""
+
+        self.assertFalse(self.db_path.exists())
+
+    def test_session_creates_schema(self) -> None:
+        """Test the database schema is created when the first session is requested"""
+
+        with DBConnection.session():
+            pass
+
+        self.assertTrue(self.db_path.exists())
+        table_names = inspect(DBConnection.engine).get_table_names()
+        self.assertCountEqual(DBConnection.metadata.tables, table_names)
+
+    def test_import_does_not_configure(self) -> None:
+        """Test importing the package does not configure the database connection"""
+
+        code = 'import bank.orm; print(bank.orm.DBConnection.engine)'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual('None', output.stdout.strip())
+
+
+class SqlitePragmas(TemporaryDatabase, TestCase):
+    """Test SQLite pragmas are applied to new connections"""
+
+    def test_pragmas_applied(self) -> None:
+        """Test pragma values from application settings are set on new connections"""
+
+        with DBConnection.engine.connect() as connection:
+            busy_timeout = connection.exec_driver_sql('PRAGMA busy_timeout').scalar()
+            cache_size = connection.exec_driver_sql('PRAGMA cache_size').scalar()
+
+        self.assertEqual(settings.db_sqlite_pragmas['busy_timeout'], busy_timeout)
+        self.assertEqual(settings.db_sqlite_pragmas['cache_size'], cache_size)
+
+    @patch.object(DBConnection, '_read_mount_table', return_value='/dev/sda1 / ext4 rw 0 0')
+    def test_wal_on_local_filesystem(self, *args) -> None:
+        """Test write-ahead logging is enabled for databases on local file systems"""
+
+        pragmas = DBConnection._resolve_sqlite_pragmas('/data/bank.db', {'journal_mode': 'auto', 'synchronous': 'auto'})
+        self.assertEqual({'journal_mode': 'WAL', 'synchronous': 'NORMAL'}, pragmas)
+
+    @patch.object(DBConnection, '_read_mount_table', return_value='/dev/sda1 / ext4 rw 0 0\nserver:/ihome /ihome nfs4 rw 0 0')
+    def test_no_wal_on_network_filesystem(self, *args) -> None:
+        """Test write-ahead logging is disabled for databases on network file systems"""
+
+        pragmas = DBConnection._resolve_sqlite_pragmas('/ihome/bank.db', {'journal_mode': 'auto', 'synchronous': 'auto'})
+        self.assertEqual({'journal_mode': 'DELETE', 'synchronous': 'FULL'}, pragmas)
+
+    @patch.object(DBConnection, '_read_mount_table', return_value='')
+    def test_no_wal_on_unknown_filesystem(self, *args) -> None:
+        """Test write-ahead logging is disabled when the file system cannot be determined"""
+
+        pragmas = DBConnection._resolve_sqlite_pragmas('/data/bank.db', {'journal_mode': 'auto'})
+        self.assertEqual({'journal_mode': 'DELETE'}, pragmas)
+
+    def test_explicit_values_preserved(self) -> None:
+        """Test pragma values other than ``auto`` are not modified"""
+
+        pragmas = {'journal_mode': 'TRUNCATE', 'synchronous': 'OFF', 'busy_timeout': 10}
+        self.assertEqual(pragmas, DBConnection._resolve_sqlite_pragmas('/data/bank.db', pragmas))
+
+
+class ConcurrentSessions(TemporaryDatabase, TestCase):
+    """Test the connection can be shared by multiple threads and processes"""
+
+    num_workers = 8
+
+    def test_lazy_initialization_from_threads(self) -> None:
+        """Test concurrent threads can trigger lazy initialization and write to the database"""
+
+        def add_account(index: int) -> int:
+            with DBConnection.session() as session:
+                session.add(Account(name=f'account{index}'))
+                session.commit()
+                return id(DBConnection.engine)
+
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            engine_ids = set(executor.map(add_account, range(self.num_workers * 4)))
+
+        self.assertEqual(1, len(engine_ids))
+        with DBConnection.session() as session:
+            self.assertEqual(self.num_workers * 4, session.query(Account).count())
+
+    def test_scoped_session_per_thread(self) -> None:
+        """Test each thread receives its own scoped session"""
+
+        def get_session_ids(_) -> tuple:
+            with DBConnection.scoped_session() as outer, DBConnection.scoped_session() as inner:
+                return id(outer), id(inner)
+
+        with DBConnection.scoped_session() as main_session:
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                session_ids = list(executor.map(get_session_ids, range(self.num_workers)))
+
+        for outer_id, inner_id in session_ids:
+            self.assertEqual(outer_id, inner_id)
+            self.assertNotEqual(id(main_session), outer_id)
+
+    def test_scoped_session_released_on_exit(self) -> None:
+        """Test a new scoped session is created after the previous one exits"""
+
+        with DBConnection.scoped_session() as first_session:
+            pass
+
+        self.assertIsNone(DBConnection._scoped_session.get())
+        with DBConnection.scoped_session() as second_session:
+            self.assertIsNot(first_session, second_session)
+
+    def test_worker_threads_outside_unit_of_work(self) -> None:
+        """Test worker threads do not join a unit of work opened by the submitting thread"""
+
+        def get_session_id(_) -> int:
+            with DBConnection.scoped_session() as session:
+                return id(session)
+
+        with DBConnection.unit_of_work() as unit_of_work:
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                session_ids = list(executor.map(get_session_id, range(self.num_workers)))
+
+        self.assertNotIn(id(unit_of_work), session_ids)
+
+    @skipUnless(hasattr(os, 'fork'), 'Requires os.fork')
+    def test_forked_child_uses_new_connections(self) -> None:
+        """Test a forked child process can use the database without disturbing the parent"""
+
+        with DBConnection.session() as session:
+            session.add(Account(name='parent'))
+            session.commit()
+
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            exit_code = 1
+            try:
+                with DBConnection.session() as session:
+                    session.add(Account(name='child'))
+                    session.commit()
+
+                exit_code = 0
+
+            finally:
+                os._exit(exit_code)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, os.waitstatus_to_exitcode(status))
+        with DBConnection.session() as session:
+            self.assertCountEqual(['parent', 'child'], session.scalars(select(Account.name)).all())
+
+
+class UnitOfWork(TemporaryDatabase, TestCase):
+    """Test database operations are grouped into a single transaction by ``unit_of_work``"""
+
+    @staticmethod
+    def count_accounts() -> int:
+        """Return the number of committed accounts using a connection outside any unit of work"""
+
+        with DBConnection.engine.connect() as connection:
+            return len(connection.execute(select(Account.name)).all())
+
+    def test_sessions_are_shared(self) -> None:
+        """Test sessions requested within a unit of work share the same underlying session"""
+
+        with DBConnection.unit_of_work() as unit_of_work:
+            with DBConnection.session() as first_session, DBConnection.session() as second_session:
+                self.assertIs(unit_of_work, first_session)
+                self.assertIs(unit_of_work, second_session)
+
+            with DBConnection.scoped_session() as scoped_session, DBConnection.unit_of_work() as nested_unit:
+                self.assertIs(unit_of_work, scoped_session)
+                self.assertIs(unit_of_work, nested_unit)
+
+        self.assertIsNot(unit_of_work, DBConnection.session())
+
+    def test_commit_deferred_until_exit(self) -> None:
+        """Test changes are flushed by ``commit`` but only committed when the unit of work exits"""
+
+        with DBConnection.unit_of_work():
+            with DBConnection.session() as session:
+                session.add(Account(name='account1'))
+                session.commit()
+
+            # Flushed changes are visible within the unit of work
+            with DBConnection.session() as session:
+                self.assertEqual(1, session.query(Account).count())
+
+            self.assertEqual(0, self.count_accounts())
+
+        self.assertEqual(1, self.count_accounts())
+
+    def test_rollback_on_error(self) -> None:
+        """Test all changes are discarded if an error is raised within the unit of work"""
+
+        with self.assertRaises(RuntimeError), DBConnection.unit_of_work():
+            with DBConnection.session() as session:
+                session.add(Account(name='account1'))
+                session.commit()
+
+            raise RuntimeError
+
+        self.assertEqual(0, self.count_accounts())
@@ -0,0 +1,117 @@
+"""Tests for the ``SyntheticBank`` class."""
+
+from datetime import date
+from unittest import TestCase
+
+from sqlalchemy import func, select
+
+from bank import settings
+from bank.orm import Account, Allocation, DBConnection, Investment, Proposal
+from bank.synthetic import SyntheticBank
+from tests._utils import TemporaryDatabase
+
+TODAY = date(2024, 6, 1)
+
+
+class Populate(TemporaryDatabase, TestCase):
+    """Test data written to the database by the ``populate`` method"""
+
+    def setUp(self) -> None:
+        """Populate a temporary database with synthetic data"""
+
+        super().setUp()
+        self.counts = SyntheticBank(num_accounts=200, years=3, seed=1, today=TODAY).populate(batch_size=500)
+
+    def test_row_counts(self) -> None:
+        """Test the returned row counts match the database contents"""
+
+        with DBConnection.session() as session:
+            for table in (Account, Proposal, Allocation, Investment):
+                count = session.execute(select(func.count()).select_from(table)).scalar()
+                self.assertEqual(self.counts[table.__tablename__], count)
+
+        self.assertEqual(200, self.counts['account'])
+
+    def test_multi_year_histories(self) -> None:
+        """Test accounts have several proposals with allocations on known clusters"""
+
+        with DBConnection.session() as session:
+            proposals_per_account = session.execute(
+                select(func.count(Proposal.id)).group_by(Proposal.account_id)).scalars().all()
+            cluster_names = set(session.execute(select(Allocation.cluster_name)).scalars())
+
+        self.assertGreaterEqual(min(proposals_per_account), 2)
+        self.assertTrue(cluster_names <= set(settings.clusters) | {'all_clusters'})
+
+    def test_proposals_do_not_overlap(self) -> None:
+        """Test each proposal for an account starts after the previous one ends"""
+
+        with DBConnection.session() as session:
+            proposals = session.execute(
+                select(Proposal.account_id, Proposal.start_date, Proposal.end_date)
+                .order_by(Proposal.account_id, Proposal.start_date)).all()
+
+        for previous, current in zip(proposals, proposals[1:]):
+            if previous.account_id == current.account_id:
+                self.assertGreaterEqual(current.start_date, previous.end_date)
+
+    def test_usage_within_allocation(self) -> None:
+        """Test allocations are never overdrawn"""
+
+        with DBConnection.session() as session:
+            overdrawn = session.execute(
+                select(func.count(Allocation.id))
+                .where(Allocation.service_units_used > Allocation.service_units_total)).scalar()
+
+        self.assertEqual(0, overdrawn)
+
+    def test_investment_balances(self) -> None:
+        """Test investment balances are non-negative and include rollovers and withdrawals"""
+
+        with DBConnection.session() as session:
+            investments = session.execute(select(Investment)).scalars().all()
+
+        self.assertTrue(investments)
+        self.assertTrue(all(inv.current_sus >= 0 for inv in investments))
+        self.assertTrue(any(inv.rollover_sus for inv in investments))
+        self.assertTrue(any(inv.withdrawn_sus for inv in investments))
+
+    def test_reproducible(self) -> None:
+        """Test the same seed generates the same data"""
+
+        with DBConnection.session() as session:
+            first = session.execute(select(Allocation.service_units_used).order_by(Allocation.id)).scalars().all()
+            session.execute(Allocation.__table__.delete())
+            session.execute(Proposal.__table__.delete())
+            session.execute(Investment.__table__.delete())
+            session.execute(Account.__table__.delete())
+            session.commit()
+
+        SyntheticBank(num_accounts=200, years=3, seed=1, today=TODAY).populate()
+        with DBConnection.session() as session:
+            second = session.execute(select(Allocation.service_units_used).order_by(Allocation.id)).scalars().all()
+
+        self.assertEqual(first, second)
+
+    def test_error_on_existing_accounts(self) -> None:
+        """Test a ``RuntimeError`` is raised instead of adding to a populated database"""
+
+        with self.assertRaises(RuntimeError):
+            SyntheticBank(num_accounts=1).populate()
+
+
+class FewClusters(TemporaryDatabase, TestCase):
+    """Test proposals span multiple clusters when only a few clusters are configured"""
+
+    def test_multi_cluster_proposals(self) -> None:
+        """Test proposals are allocated on up to every configured cluster"""
+
+        clusters = ('cluster1', 'cluster2')
+        SyntheticBank(num_accounts=50, years=1, clusters=clusters, seed=1, today=TODAY).populate()
+        with DBConnection.session() as session:
+            clusters_per_proposal = set(session.execute(
+                select(func.count(Allocation.id))
+                .where(Allocation.cluster_name != 'all_clusters')
+                .group_by(Allocation.proposal_id)).scalars())
+
+        self.assertEqual({1, 2}, clusters_per_proposal)
@@ -0,0 +1,29 @@
+"""Tests for the ``caller_uid`` function."""
+
+import os
+from unittest import TestCase
+
+from bank.system.identity import acting_as, caller_uid
+
+
+class CallerUid(TestCase):
+    """Test the user ID of the invoking process is reported"""
+
+    def test_defaults_to_current_user(self) -> None:
+        """Test the effective user ID of the current process is returned by default"""
+
+        self.assertEqual(os.geteuid(), caller_uid())
+
+    def test_acting_as_other_user(self) -> None:
+        """Test the given user ID is returned within an ``acting_as`` context and restored afterwards"""
+
+        with acting_as(12345):
+            self.assertEqual(12345, caller_uid())
+
+        self.assertEqual(os.geteuid(), caller_uid())
+
+    def test_acting_as_none(self) -> None:
+        """Test the current process is used when no user ID is given"""
+
+        with acting_as(None):
+            self.assertEqual(os.geteuid(), caller_uid())
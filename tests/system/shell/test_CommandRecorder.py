@@ -0,0 +1,103 @@
+"""Tests for the ``CommandRecorder`` class."""
+
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.system.shell import CommandRecorder, _open_recording, _runner_from_settings, ShellCmd
+
+
+class Recording(TestCase):
+    """Test commands are executed and written to the recording file"""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for recording files"""
+
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = Path(self.tempdir.name) / 'commands.jsonl'
+        self.addCleanup(setattr, ShellCmd, 'runner', None)
+
+    def read_records(self, path: Path) -> list:
+        """Return the records written to a recording file"""
+
+        with _open_recording(path, 'r') as file:
+            return [json.loads(line) for line in file]
+
+    def test_results_recorded(self) -> None:
+        """Test the output of each command is returned and recorded"""
+
+        ShellCmd.runner = CommandRecorder(self.path)
+        cmd = ShellCmd('echo hello world')
+
+        self.assertEqual('hello world', cmd.out)
+        record, = self.read_records(self.path)
+        self.assertEqual(['echo', 'hello', 'world'], record['argv'])
+        self.assertEqual('hello world', record['out'])
+        self.assertEqual('', record['err'])
+        self.assertGreaterEqual(record['duration'], 0)
+
+    def test_records_appended(self) -> None:
+        """Test records are appended in the order commands are run"""
+
+        ShellCmd.runner = CommandRecorder(self.path)
+        ShellCmd('echo first')
+        ShellCmd('echo second')
+        self.assertEqual(['first', 'second'], [r['out'] for r in self.read_records(self.path)])
+
+    def test_compressed_recording(self) -> None:
+        """Test recordings are compressed when the file name ends in ``.gz``"""
+
+        path = self.path.with_suffix('.jsonl.gz')
+        ShellCmd.runner = CommandRecorder(path)
+        ShellCmd('echo compressed')
+
+        self.assertEqual(b'\x1f\x8b', path.read_bytes()[:2])
+        self.assertEqual('compressed', self.read_records(path)[0]['out'])
+
+    def test_missing_program_recorded(self) -> None:
+        """Test missing executables are recorded and the original error is raised"""
+
+        ShellCmd.runner = CommandRecorder(self.path)
+        with self.assertRaises(FileNotFoundError):
+            ShellCmd('not_a_real_program_name')
+
+        self.assertIn('missing', self.read_records(self.path)[0])
+
+    def test_exception_recorded(self) -> None:
+        """Test exceptions raised by the runner are recorded and the original error is raised"""
+
+        def runner(args):
+            raise PermissionError('Permission denied')
+
+        ShellCmd.runner = CommandRecorder(self.path, runner=runner)
+        with self.assertRaises(PermissionError):
+            ShellCmd('sacctmgr show clusters')
+
+        record, = self.read_records(self.path)
+        self.assertEqual({'type': 'PermissionError', 'message': 'Permission denied'}, record['error'])
+        self.assertNotIn('out', record)
+
+    def test_interrupt_not_recorded(self) -> None:
+        """Test commands interrupted before finishing are not recorded"""
+
+        def runner(args):
+            raise KeyboardInterrupt
+
+        ShellCmd.runner = CommandRecorder(self.path, runner=runner)
+        with self.assertRaises(KeyboardInterrupt):
+            ShellCmd('sacctmgr show clusters')
+
+        self.assertFalse(self.path.exists())
+
+    def test_enabled_by_settings(self) -> None:
+        """Test commands are recorded when the ``shell_record_path`` setting is given"""
+
+        _runner_from_settings.cache_clear()
+        self.addCleanup(_runner_from_settings.cache_clear)
+        with patch('bank.settings.shell_record_path', str(self.path)):
+            ShellCmd('echo from settings')
+
+        self.assertEqual('from settings', self.read_records(self.path)[0]['out'])
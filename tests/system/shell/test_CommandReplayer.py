@@ -0,0 +1,82 @@
+"""Tests for the ``CommandReplayer`` class."""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.exceptions import CmdNotRecordedError
+from bank.system.shell import CommandRecorder, CommandReplayer, _runner_from_settings, ShellCmd
+
+
+class Replay(TestCase):
+    """Test recorded commands are answered without running a subprocess"""
+
+    def setUp(self) -> None:
+        """Record commands with a runner returning a sequence of results"""
+
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = Path(self.tempdir.name) / 'commands.jsonl'
+        self.addCleanup(setattr, ShellCmd, 'runner', None)
+
+        results = iter([('unlocked', ''), ('locked', ''), ('', 'sacctmgr: error'), PermissionError('Permission denied')])
+
+        def runner(args):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+
+            return result
+
+        ShellCmd.runner = CommandRecorder(self.path, runner=runner)
+        ShellCmd('sacctmgr show assoc account=account1')
+        ShellCmd('sacctmgr show assoc account=account1')
+        ShellCmd('sacctmgr show clusters')
+        with self.assertRaises(PermissionError):
+            ShellCmd('sacctmgr show runawayjobs')
+
+        ShellCmd.runner = CommandReplayer(self.path)
+
+    def test_results_replayed_in_order(self) -> None:
+        """Test repeated commands are answered in the recorded order, repeating the last result"""
+
+        with patch.object(ShellCmd, '_subprocess_call') as subprocess_call:
+            outputs = [ShellCmd('sacctmgr show assoc account=account1').out for _ in range(3)]
+
+        subprocess_call.assert_not_called()
+        self.assertEqual(['unlocked', 'locked', 'locked'], outputs)
+
+    def test_errors_replayed(self) -> None:
+        """Test output to STDERR is replayed"""
+
+        self.assertEqual('sacctmgr: error', ShellCmd('sacctmgr show clusters').err)
+
+    def test_exceptions_replayed(self) -> None:
+        """Test exceptions raised while recording are raised again"""
+
+        with self.assertRaisesRegex(PermissionError, 'Permission denied'):
+            ShellCmd('sacctmgr show runawayjobs')
+
+    def test_error_on_unrecorded_command(self) -> None:
+        """Test a ``CmdNotRecordedError`` is raised for commands missing from the recording"""
+
+        with self.assertRaises(CmdNotRecordedError):
+            ShellCmd('sacctmgr show assoc account=account2')
+
+    @patch('bank.system.shell.time.sleep')
+    def test_recorded_delay(self, mock_sleep) -> None:
+        """Test the recorded duration is waited out when requested"""
+
+        ShellCmd.runner = CommandReplayer(self.path, delay=True)
+        ShellCmd('sacctmgr show clusters')
+        mock_sleep.assert_called_once()
+
+    def test_enabled_by_settings(self) -> None:
+        """Test commands are replayed when the ``shell_replay_path`` setting is given"""
+
+        ShellCmd.runner = None
+        _runner_from_settings.cache_clear()
+        self.addCleanup(_runner_from_settings.cache_clear)
+        with patch('bank.settings.shell_replay_path', str(self.path)):
+            self.assertEqual('sacctmgr: error', ShellCmd('sacctmgr show clusters').err)
@@ -65,3 +65,61 @@ class RaisingStdErr(TestCase):
         with self.assertRaises(CmdError) as cm:
             ShellCmd("ls fake_dir").raise_if_err()
             self.assertEqual(str(cm.exception), "ls: cannot access 'fake_dir': No such file or directory")
+
+
+class CustomRunner(TestCase):
+    """Test commands can be executed by a runner other than the default subprocess call"""
+
+    def tearDown(self) -> None:
+        """Restore the default runner"""
+
+        ShellCmd.runner = None
+
+    def test_runner_receives_parsed_args(self) -> None:
+        """Test the runner is called with the split command and its output is captured"""
+
+        calls = []
+        ShellCmd.runner = lambda args: calls.append(args) or ('out', 'err')
+
+        cmd = ShellCmd("sacctmgr show assoc format='Account,User'")
+        self.assertEqual([['sacctmgr', 'show', 'assoc', 'format=Account,User']], calls)
+        self.assertEqual('out', cmd.out)
+        self.assertEqual('err', cmd.err)
+
+    def test_default_runner_restored(self) -> None:
+        """Test commands run in a subprocess when no runner is assigned"""
+
+        ShellCmd.runner = None
+        self.assertEqual('hello world', ShellCmd('echo hello world').out)
+
+
+class IterLines(TestCase):
+    """Tests for streaming command output with the ``iter_lines`` method"""
+
+    def tearDown(self) -> None:
+        """Restore the default runner"""
+
+        ShellCmd.runner = None
+
+    def test_subprocess_output_streamed(self) -> None:
+        """Test output is yielded one line at a time without trailing newlines"""
+
+        self.assertEqual(['1', '2', '3'], list(ShellCmd.iter_lines('seq 3')))
+
+    def test_error_after_output(self) -> None:
+        """Test a ``CmdError`` is raised once output is exhausted if the command writes to STDERR"""
+
+        with self.assertRaises(CmdError):
+            list(ShellCmd.iter_lines('ls fake_dir'))
+
+    def test_runner_output_streamed(self) -> None:
+        """Test output from a custom runner is split into lines"""
+
+        ShellCmd.runner = lambda args: ('a\nb', '')
+        self.assertEqual(['a', 'b'], list(ShellCmd.iter_lines('sacct')))
+
+    def test_error_on_empty_command(self) -> None:
+        """Test a ``ValueError`` is raised for empty commands"""
+
+        with self.assertRaises(ValueError):
+            list(ShellCmd.iter_lines(' '))
@@ -0,0 +1,169 @@
+"""Tests for the ``SimulatedSlurm`` class."""
+
+from datetime import date, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.exceptions import CmdError
+from bank.system.shell import ShellCmd
+from bank.system.simulated import SimulatedSlurm
+from bank.system.slurm import Slurm, SlurmAccount
+
+CLUSTERS = ('cluster1', 'cluster2')
+
+
+class Activation(TestCase):
+    """Test the simulator intercepts shell commands only while active"""
+
+    def test_runner_assigned_within_context(self) -> None:
+        """Test ``ShellCmd`` uses the simulator inside the context and the previous runner afterwards"""
+
+        simulator = SimulatedSlurm(num_accounts=1, clusters=CLUSTERS)
+        with simulator.activate():
+            self.assertIs(simulator, ShellCmd.runner)
+            self.assertTrue(Slurm.is_installed())
+
+        self.assertIsNone(ShellCmd.runner)
+
+    def test_cache_cleared(self) -> None:
+        """Test cached Slurm data from the simulator is discarded on exit"""
+
+        with SimulatedSlurm(num_accounts=1, clusters=CLUSTERS).activate():
+            self.assertEqual(frozenset(CLUSTERS), Slurm.cluster_names())
+
+        self.assertEqual(0, Slurm.cluster_names.cache_info().currsize)
+
+    def test_unknown_program(self) -> None:
+        """Test programs other than Slurm utilities are reported as missing"""
+
+        with SimulatedSlurm(num_accounts=1).activate(), self.assertRaises(FileNotFoundError):
+            ShellCmd('squeue')
+
+
+class GeneratedData(TestCase):
+    """Test Slurm queries are answered from the generated data"""
+
+    def setUp(self) -> None:
+        """Activate a simulator with a reproducible number of accounts"""
+
+        self.simulator = SimulatedSlurm(num_accounts=20, clusters=CLUSTERS, users_per_account=3, purchased_fraction=0.5)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+    def test_association_snapshot(self) -> None:
+        """Test account level associations are returned for every account and cluster"""
+
+        snapshot = Slurm.association_snapshot()
+        self.assertEqual(20, len(snapshot))
+        self.assertCountEqual(CLUSTERS, snapshot['account1'])
+
+    def test_partitions(self) -> None:
+        """Test partition names include purchased partitions named after accounts"""
+
+        partitions = Slurm.partition_names(CLUSTERS[0])
+        self.assertIn(f'{CLUSTERS[0]}-shared1', partitions)
+        self.assertTrue(any(name.startswith('account') for name in partitions))
+
+    def test_account_exists(self) -> None:
+        """Test only generated accounts exist"""
+
+        self.assertTrue(SlurmAccount.check_account_exists('account1'))
+        self.assertFalse(SlurmAccount.check_account_exists('account21'))
+
+    def test_usage_scales_with_window(self) -> None:
+        """Test reported usage is proportional to the length of the reporting window"""
+
+        end = date.today()
+        account = SlurmAccount('account1')
+        one_day = account.get_cluster_usage_per_user(CLUSTERS[0], end - timedelta(days=1), end)
+        two_days = account.get_cluster_usage_per_user(CLUSTERS[0], end - timedelta(days=2), end)
+
+        expected = {user: daily for user, daily in self.simulator.daily_usage['account1', CLUSTERS[0]].items() if daily}
+        self.assertEqual(expected, one_day)
+        self.assertEqual({user: 2 * used for user, used in one_day.items()}, two_days)
+
+    def test_bulk_usage_matches_per_account_usage(self) -> None:
+        """Test the bulk usage report agrees with per account reports"""
+
+        end = date.today()
+        start = end - timedelta(days=7)
+        bulk_usage = Slurm.cluster_usage_by_account(CLUSTERS[0], start, end)
+        for account, total in bulk_usage.items():
+            per_user = SlurmAccount(account).get_cluster_usage_per_user(CLUSTERS[0], start, end)
+            self.assertEqual(total, sum(per_user.values()))
+
+    def test_usage_in_seconds(self) -> None:
+        """Test usage is reported in seconds when requested"""
+
+        end = date.today()
+        account = SlurmAccount('account1')
+        hours = account.get_cluster_usage_per_user(CLUSTERS[0], end - timedelta(days=1), end)
+        seconds = account.get_cluster_usage_per_user(CLUSTERS[0], end - timedelta(days=1), end, in_hours=False)
+        self.assertEqual({user: 3600 * used for user, used in hours.items()}, seconds)
+
+
+class StateChanges(TestCase):
+    """Test changes made through Slurm commands are reflected in later queries"""
+
+    def setUp(self) -> None:
+        """Activate a simulator with a reproducible number of accounts"""
+
+        self.simulator = SimulatedSlurm(num_accounts=5, clusters=CLUSTERS)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+    def test_bulk_lock_and_unlock(self) -> None:
+        """Test accounts locked in bulk are reported as locked until unlocked"""
+
+        Slurm.set_locked_state(['account1', 'account2'], True, CLUSTERS[0])
+        self.assertTrue(SlurmAccount('account1').get_locked_state(CLUSTERS[0]))
+        self.assertTrue(SlurmAccount('account2').get_locked_state(CLUSTERS[0]))
+        self.assertFalse(SlurmAccount('account1').get_locked_state(CLUSTERS[1]))
+        self.assertFalse(SlurmAccount('account3').get_locked_state(CLUSTERS[0]))
+
+        Slurm.set_locked_state(['account1'], False, CLUSTERS[0])
+        self.assertFalse(SlurmAccount('account1').get_locked_state(CLUSTERS[0]))
+
+    def test_reset_raw_usage(self) -> None:
+        """Test raw usage is reset on the given clusters"""
+
+        self.simulator.raw_usage['account1', CLUSTERS[0]] = 100
+        with patch('bank.settings.clusters', CLUSTERS):
+            SlurmAccount('account1').reset_raw_usage()
+
+        self.assertEqual(0, self.simulator.raw_usage['account1', CLUSTERS[0]])
+
+
+class InjectedBehavior(TestCase):
+    """Test latency and failures can be injected into simulated commands"""
+
+    def test_failures_raise_cmd_error(self) -> None:
+        """Test failed commands write to STDERR"""
+
+        with SimulatedSlurm(num_accounts=1, clusters=CLUSTERS, failure_rate={'sinfo': 1}).activate():
+            self.assertEqual(frozenset(CLUSTERS), Slurm.cluster_names())
+            with self.assertRaises(CmdError):
+                Slurm.partition_names(CLUSTERS[0])
+
+    @patch('bank.system.simulated.time.sleep')
+    def test_latency(self, mock_sleep) -> None:
+        """Test commands are delayed by the configured latency"""
+
+        with SimulatedSlurm(num_accounts=1, clusters=CLUSTERS, latency={'sacctmgr': 0.25}).activate():
+            Slurm.cluster_names()
+            Slurm.partition_names(CLUSTERS[0])
+
+        mock_sleep.assert_called_once_with(0.25)
+
+    def test_calls_counted(self) -> None:
+        """Test the number of calls to each utility is recorded"""
+
+        simulator = SimulatedSlurm(num_accounts=3, clusters=CLUSTERS)
+        with simulator.activate():
+            Slurm.association_snapshot()
+            Slurm.cluster_usage_by_account(CLUSTERS[0], date.today() - timedelta(days=1), date.today())
+
+        self.assertEqual(2, simulator.calls['sacctmgr'])
+        self.assertEqual(1, simulator.calls['sreport'])
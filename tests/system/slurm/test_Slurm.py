@@ -1,9 +1,11 @@
 """Tests for the ``Slurm`` class."""
 
+from datetime import date
 from unittest import TestCase
 from unittest.mock import patch
 
 from bank import settings
+from bank.exceptions import ClusterNotFoundError, CmdError
 from bank.system.slurm import Slurm
 
 
@@ -19,6 +21,12 @@ class ClusterNames(TestCase):
 class IsInstalled(TestCase):
     """Tests for the ``is_installed`` method"""
 
+    def setUp(self) -> None:
+        """Discard any cached result from previous tests"""
+
+        Slurm.is_installed.cache_clear()
+        self.addCleanup(Slurm.is_installed.cache_clear)
+
     @patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('slurm 0.0.0', ''))
     def test_is_installed_true(self, *args) -> None:
         """Test the return value is ``True`` when slurm is installed"""
@@ -31,7 +39,192 @@ class IsInstalled(TestCase):
 
         self.assertFalse(Slurm.is_installed())
 
+    def test_result_cached(self) -> None:
+        """Test ``sacctmgr`` is only queried once per process"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('slurm 0.0.0', '')) as subprocess_call:
+            Slurm.is_installed()
+            Slurm.is_installed()
+
+        subprocess_call.assert_called_once()
+
     def test_installed_in_test_env(self) -> None:
         """Test slurm is installed in the test environment"""
 
         self.assertTrue(Slurm.is_installed())
+
+
+class ClusterUsageByAccount(TestCase):
+    """Tests for the ``cluster_usage_by_account`` method"""
+
+    sreport_output = 'account1||150\naccount1|user1|100\naccount1|user2|50\naccount2||0\naccount3||25\naccount3|user3|25'
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_account_totals_parsed(self) -> None:
+        """Test account totals are returned for accounts with non-zero usage"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=(self.sreport_output, '')):
+            usage = Slurm.cluster_usage_by_account(settings.test_cluster, date.today(), date.today())
+
+        self.assertEqual({'account1': 150, 'account3': 25}, usage)
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_error_on_stderr(self) -> None:
+        """Test a ``CmdError`` is raised when ``sreport`` writes to STDERR"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sreport: error')), \
+                self.assertRaises(CmdError):
+            Slurm.cluster_usage_by_account(settings.test_cluster, date.today(), date.today())
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_error_invalid_cluster(self) -> None:
+        """Test a ``ClusterNotFoundError`` error is raised when passed a nonexistent cluster"""
+
+        with self.assertRaises(ClusterNotFoundError):
+            Slurm.cluster_usage_by_account('fake_cluster', date.today(), date.today())
+
+
+class SetLockedState(TestCase):
+    """Tests for the ``set_locked_state`` method"""
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    @patch.object(Slurm, 'max_accounts_arg_length', 20)
+    def test_accounts_locked_in_batches(self) -> None:
+        """Test accounts are split across as few commands as the argument length allows"""
+
+        accounts = [f'account{i}' for i in range(5)]
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', '')) as subprocess_call:
+            Slurm.set_locked_state(accounts, True, settings.test_cluster)
+
+        account_args = [call.args[0][5] for call in subprocess_call.call_args_list]
+        self.assertEqual(
+            ['account=account0,account1', 'account=account2,account3', 'account=account4'], account_args)
+        self.assertIn('GrpTresRunMins=billing=0', subprocess_call.call_args.args[0])
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_unlock(self) -> None:
+        """Test accounts are unlocked by removing the billing limit"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', '')) as subprocess_call:
+            Slurm.set_locked_state(['account1', 'account2'], False, settings.test_cluster)
+
+        subprocess_call.assert_called_once()
+        self.assertIn('account=account1,account2', subprocess_call.call_args.args[0])
+        self.assertIn('GrpTresRunMins=billing=-1', subprocess_call.call_args.args[0])
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_error_on_stderr(self) -> None:
+        """Test a ``CmdError`` is raised when ``sacctmgr`` writes to STDERR"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sacctmgr: error')), \
+                self.assertRaises(CmdError):
+            Slurm.set_locked_state(['account1'], True, settings.test_cluster)
+
+    def test_error_invalid_cluster(self) -> None:
+        """Test a ``ClusterNotFoundError`` error is raised when passed a nonexistent cluster"""
+
+        with patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster}), \
+                self.assertRaises(ClusterNotFoundError):
+            Slurm.set_locked_state(['account1'], True, 'fake_cluster')
+
+
+class SetBillingMinutesLimits(TestCase):
+    """Tests for the ``set_billing_minutes_limits`` method"""
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    @patch.object(Slurm, 'max_accounts_arg_length', 20)
+    def test_accounts_grouped_by_limit(self) -> None:
+        """Test accounts sharing a limit are updated together in batches"""
+
+        limits = {'account0': 0, 'account1': 0, 'account2': 0, 'account3': 600}
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', '')) as subprocess_call:
+            Slurm.set_billing_minutes_limits(limits, settings.test_cluster)
+
+        calls = [(call.args[0][5], call.args[0][-1]) for call in subprocess_call.call_args_list]
+        self.assertEqual([
+            ('account=account0,account1', 'GrpTRESMins=billing=0'),
+            ('account=account2', 'GrpTRESMins=billing=0'),
+            ('account=account3', 'GrpTRESMins=billing=600')
+        ], calls)
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_error_on_stderr(self) -> None:
+        """Test a ``CmdError`` is raised when ``sacctmgr`` writes to STDERR"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sacctmgr: error')), \
+                self.assertRaises(CmdError):
+            Slurm.set_billing_minutes_limits({'account1': 60}, settings.test_cluster)
+
+    def test_error_invalid_cluster(self) -> None:
+        """Test a ``ClusterNotFoundError`` error is raised when passed a nonexistent cluster"""
+
+        with patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster}), \
+                self.assertRaises(ClusterNotFoundError):
+            Slurm.set_billing_minutes_limits({'account1': 60}, 'fake_cluster')
+
+
+class BillingMinutesUsed(TestCase):
+    """Tests for the ``billing_minutes_used`` method"""
+
+    sshare_output = 'CLUSTER: smp\nroot||cpu=500,billing=700\n account1||cpu=100,billing=200\n account2||\n'
+
+    def test_account_usage_parsed(self) -> None:
+        """Test the billing value of each account is returned"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=(self.sshare_output, '')):
+            usage = Slurm.billing_minutes_used(settings.test_cluster)
+
+        self.assertEqual({'root': 700, 'account1': 200, 'account2': 0}, usage)
+
+    def test_error_on_stderr(self) -> None:
+        """Test a ``CmdError`` is raised when ``sshare`` writes to STDERR"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sshare: error')), \
+                self.assertRaises(CmdError):
+            Slurm.billing_minutes_used(settings.test_cluster)
+
+
+class ResetRawUsage(TestCase):
+    """Tests for the ``reset_raw_usage`` method"""
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster, 'cluster2'})
+    @patch.object(Slurm, 'max_accounts_arg_length', 20)
+    def test_accounts_reset_in_batches(self) -> None:
+        """Test accounts are reset on every given cluster using as few commands as the argument length allows"""
+
+        progress = []
+        accounts = [f'account{i}' for i in range(5)]
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', '')) as subprocess_call:
+            Slurm.reset_raw_usage(accounts, [settings.test_cluster, 'cluster2'], lambda *args: progress.append(args))
+
+        account_args = [call.args[0][5] for call in subprocess_call.call_args_list]
+        self.assertEqual(
+            ['account=account0,account1', 'account=account2,account3', 'account=account4'], account_args)
+        self.assertIn(f'cluster={settings.test_cluster},cluster2', subprocess_call.call_args.args[0])
+        self.assertIn('RawUsage=0', subprocess_call.call_args.args[0])
+        self.assertEqual([(2, 5), (4, 5), (5, 5)], progress)
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_error_on_stderr(self) -> None:
+        """Test a ``CmdError`` is raised when ``sacctmgr`` writes to STDERR"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sacctmgr: error')), \
+                self.assertRaises(CmdError):
+            Slurm.reset_raw_usage(['account1'], [settings.test_cluster])
+
+    def test_error_invalid_cluster(self) -> None:
+        """Test a ``ClusterNotFoundError`` error is raised when passed a nonexistent cluster"""
+
+        with patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster}), \
+                self.assertRaises(ClusterNotFoundError):
+            Slurm.reset_raw_usage(['account1'], [settings.test_cluster, 'fake_cluster'])
+
+    @patch.object(Slurm, 'cluster_names', lambda: {settings.test_cluster})
+    def test_nothing_reset_without_clusters(self) -> None:
+        """Test no ``sacctmgr`` command is run when no clusters or accounts are given"""
+
+        with patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', '')) as subprocess_call:
+            Slurm.reset_raw_usage(['account1'], [])
+            Slurm.reset_raw_usage([], [settings.test_cluster])
+
+        subprocess_call.assert_not_called()
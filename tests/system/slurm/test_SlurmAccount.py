@@ -1,12 +1,17 @@
 """Tests for the ``SlurmAccount`` class."""
 
-from datetime import date
+import time
+from datetime import date, timedelta
+from threading import Lock
+from tempfile import TemporaryDirectory
 from unittest import TestCase, skip
 from unittest.mock import patch
 
 from bank import settings
 from bank.exceptions import AccountNotFoundError, ClusterNotFoundError
+from bank.system.simulated import SimulatedSlurm
 from bank.system.slurm import Slurm, SlurmAccount
+from bank.system.usage_cache import UsageCache
 
 
 class Instantiation(TestCase):
@@ -45,6 +50,23 @@ class CheckAccountExists(TestCase):
         self.assertFalse(SlurmAccount.check_account_exists('fake_account'))
 
 
+class SnapshotLookup(TestCase):
+    """Test account existence is checked without additional ``sacctmgr`` calls"""
+
+    def test_single_snapshot_query(self) -> None:
+        """Test creating several accounts queries Slurm associations once"""
+
+        simulator = SimulatedSlurm(num_accounts=3, clusters=('cluster1',))
+        with simulator.activate():
+            for name in ('account1', 'account2', 'account3'):
+                SlurmAccount(name)
+
+            with self.assertRaises(AccountNotFoundError):
+                SlurmAccount('account4')
+
+        self.assertEqual(2, simulator.calls['sacctmgr'])
+
+
 class AccountLocking(TestCase):
     """Test the account is locked/unlocked by the appropriate getters/setters"""
 
@@ -140,3 +162,153 @@ class GetClusterUsage(TestCase):
 
         self.assertGreater(test_usage_seconds, 0)
         self.assertEqual(int(test_usage_seconds // 60), test_usage_hours)
+
+
+class CachedClusterUsage(TestCase):
+    """Test usage for closed months is served from the usage cache"""
+
+    def setUp(self) -> None:
+        """Enable the usage cache and answer Slurm commands with a simulator"""
+
+        tempdir = TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        cache_path = patch('bank.settings.usage_cache_path', f'{tempdir.name}/cache.db')
+        cache_path.start()
+        self.addCleanup(cache_path.stop)
+
+        self.simulator = SimulatedSlurm(num_accounts=1, clusters=('cluster1',), users_per_account=2)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.account = SlurmAccount('account1')
+        self.start = date.today() - timedelta(days=365)
+        self.end = date.today() + timedelta(days=30)
+
+    def test_matches_uncached_usage(self) -> None:
+        """Test cached usage matches usage reported over the whole date range"""
+
+        expected = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False)
+        with patch('bank.settings.usage_cache_path', None):
+            uncached = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False)
+
+        self.assertEqual(uncached, expected)
+
+    def test_closed_months_not_queried_again(self) -> None:
+        """Test only the live part of the date range is queried once closed months are cached"""
+
+        first = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end)
+        first_calls = self.simulator.calls['sreport']
+        self.assertGreater(first_calls, 10)
+
+        self.simulator.calls.clear()
+        second = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end)
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.simulator.calls['sreport'])
+
+    @patch('bank.settings.usage_chunk_retries', 0)
+    def test_failed_reports_not_cached(self) -> None:
+        """Test ``None`` is returned and nothing is cached when Slurm reports an error"""
+
+        self.simulator.failure_rate = {'sreport': 1}
+        self.assertIsNone(self.account.get_cluster_usage_per_user('cluster1', self.start, self.end))
+        self.assertEqual(0, len(UsageCache.from_settings()))
+
+    @patch('bank.settings.usage_chunk_retries', 2)
+    @patch('bank.settings.usage_chunk_retry_delay', 0)
+    def test_failed_reports_not_retried(self) -> None:
+        """Test failed reports are only retried when chunked queries are enabled"""
+
+        self.simulator.failure_rate = {'sreport': 1}
+        self.assertIsNone(self.account.get_cluster_usage_per_user('cluster1', self.start, self.end))
+        single_attempt_calls = self.simulator.calls['sreport']
+
+        self.simulator.calls.clear()
+        with patch('bank.settings.usage_chunk_retries', 0):
+            self.account.get_cluster_usage_per_user('cluster1', self.start, self.end)
+
+        self.assertEqual(self.simulator.calls['sreport'], single_attempt_calls)
+
+
+class ChunkedClusterUsage(TestCase):
+    """Test usage for long date ranges is gathered using concurrent monthly queries"""
+
+    def setUp(self) -> None:
+        """Enable chunked queries and answer Slurm commands with a simulator"""
+
+        for name, value in (('usage_chunk_queries', True), ('usage_chunk_workers', 3), ('usage_chunk_retry_delay', 0)):
+            setting = patch(f'bank.settings.{name}', value)
+            setting.start()
+            self.addCleanup(setting.stop)
+
+        self.simulator = SimulatedSlurm(num_accounts=1, clusters=('cluster1',), users_per_account=2)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.account = SlurmAccount('account1')
+        self.start = date(2023, 1, 15)
+        self.end = date(2024, 1, 15)
+
+    def test_matches_single_query(self) -> None:
+        """Test summed monthly usage matches usage reported over the whole date range"""
+
+        chunked = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False)
+        self.assertEqual(13, self.simulator.calls['sreport'])
+
+        with patch('bank.settings.usage_chunk_queries', False):
+            single = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False)
+
+        self.assertEqual(single, chunked)
+
+    def test_failed_chunks_retried(self) -> None:
+        """Test each monthly query is retried individually after a failure"""
+
+        failed = set()
+
+        def fail_first_attempt(args):
+            if args[0] == 'sreport' and tuple(args) not in failed:
+                failed.add(tuple(args))
+                return '', 'sreport: error: timeout'
+
+            return self.simulator(args)
+
+        with patch('bank.system.shell.ShellCmd.runner', fail_first_attempt):
+            usage = self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False)
+
+        self.assertEqual(13, len(failed))
+        self.assertEqual(13, self.simulator.calls['sreport'])
+        with patch('bank.settings.usage_chunk_queries', False):
+            self.assertEqual(self.account.get_cluster_usage_per_user('cluster1', self.start, self.end, in_hours=False), usage)
+
+    @patch('bank.settings.usage_chunk_retries', 1)
+    def test_none_after_retries_exhausted(self) -> None:
+        """Test ``None`` is returned when a monthly query fails on every attempt"""
+
+        self.simulator.failure_rate = {'sreport': 1}
+        self.assertIsNone(self.account.get_cluster_usage_per_user('cluster1', self.start, self.end))
+        self.assertEqual(26, self.simulator.calls['sreport'])
+
+    def test_bounded_parallelism(self) -> None:
+        """Test the number of concurrent queries does not exceed the configured number of workers"""
+
+        lock = Lock()
+        running = []
+        peak = []
+
+        def track_concurrency(args):
+            with lock:
+                running.append(None)
+                peak.append(len(running))
+
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+
+            return self.simulator(args)
+
+        with patch('bank.system.shell.ShellCmd.runner', track_concurrency):
+            self.account.get_cluster_usage_per_user('cluster1', self.start, self.end)
+
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 3)
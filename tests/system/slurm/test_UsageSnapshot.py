@@ -0,0 +1,55 @@
+"""Tests for the ``UsageSnapshot`` class."""
+
+from datetime import date
+from unittest import TestCase
+from unittest.mock import Mock
+
+from bank import settings
+from bank.system.slurm import UsageSnapshot
+
+
+class UsageCaching(TestCase):
+    """Test usage data is retrieved from Slurm once per cluster"""
+
+    def setUp(self) -> None:
+        """Create a snapshot for an account with reproducible usage values"""
+
+        self.account = Mock()
+        self.account.get_cluster_usage_per_user.return_value = {'user1': 10, 'user2': 20}
+        self.start = date(2023, 1, 1)
+        self.end = date(2024, 1, 1)
+        self.snapshot = UsageSnapshot(self.account, self.start, self.end)
+
+    def test_usage_not_fetched_on_init(self) -> None:
+        """Test no usage data is retrieved until it is requested"""
+
+        self.account.get_cluster_usage_per_user.assert_not_called()
+
+    def test_per_user_fetched_once(self) -> None:
+        """Test repeated requests for the same cluster reuse the first result"""
+
+        cluster = settings.clusters[0]
+        self.assertEqual({'user1': 10, 'user2': 20}, self.snapshot.per_user(cluster))
+        self.assertEqual({'user1': 10, 'user2': 20}, self.snapshot.per_user(cluster))
+        self.account.get_cluster_usage_per_user.assert_called_once_with(cluster, self.start, self.end, True)
+
+    def test_total_shares_per_user_data(self) -> None:
+        """Test the total usage is computed from the same data used for per user requests"""
+
+        self.assertEqual(30 * len(settings.clusters), self.snapshot.total())
+        for cluster in settings.clusters:
+            self.snapshot.per_user(cluster)
+
+        self.assertEqual(len(settings.clusters), self.account.get_cluster_usage_per_user.call_count)
+
+    def test_total_over_cluster_subset(self) -> None:
+        """Test the total usage is restricted to the given clusters"""
+
+        self.assertEqual(30, self.snapshot.total([settings.clusters[0]]))
+        self.account.get_cluster_usage_per_user.assert_called_once()
+
+    def test_missing_usage_counts_as_zero(self) -> None:
+        """Test clusters without usage data do not contribute to the total"""
+
+        self.account.get_cluster_usage_per_user.return_value = None
+        self.assertEqual(0, self.snapshot.total())
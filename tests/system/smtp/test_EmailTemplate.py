@@ -1,8 +1,9 @@
 """Tests for the ``EmailTemplate`` class."""
 
 from unittest import TestCase
-from unittest.mock import call, patch
+from unittest.mock import patch
 
+from bank import settings
 from bank.exceptions import FormattingError
 from bank.system.smtp import EmailTemplate
 
@@ -88,7 +89,14 @@ class MessageSending(TestCase):
     def test_message_is_sent(self) -> None:
         """Test the smtp server is given the email message to send"""
 
-        self.assertIn(call().send_message(self.sent), self.mock_smtp.__enter__.mock_calls)
+        self.mock_smtp.send_message.assert_called_once_with(self.sent)
+
+    def test_connection_left_open(self) -> None:
+        """Test an SMTP connection passed by the caller is not closed"""
+
+        self.mock_smtp.__exit__.assert_not_called()
+        self.mock_smtp.quit.assert_not_called()
+        self.mock_smtp.close.assert_not_called()
 
     @patch('smtplib.SMTP')
     def test_error_on_incomplete_message(self, mock_smtp) -> None:
@@ -96,3 +104,82 @@ class MessageSending(TestCase):
 
         with self.assertRaises(FormattingError):
             EmailTemplate('{x}').send_to(self.to_address, self.subject, self.from_address, smtp=mock_smtp)
+
+
+class Rendering(TestCase):
+    """Tests for building email messages without sending them"""
+
+    def test_message_not_sent(self) -> None:
+        """Test rendering a template returns a complete message without connecting to a server"""
+
+        with patch('bank.system.smtp.SMTP') as mock_smtp:
+            msg = EmailTemplate('<p>Hello</p>').render('to@example.com', 'Subject', 'from@example.com')
+
+        mock_smtp.assert_not_called()
+        self.assertEqual('to@example.com', msg['To'])
+        self.assertEqual('Hello', msg.get_body(('plain',)).get_content().strip())
+        self.assertEqual('<p>Hello</p>', msg.get_body(('html',)).get_content().strip())
+
+    def test_error_on_incomplete_message(self) -> None:
+        """Test a ``FormattingError`` is raised when rendering an incomplete template"""
+
+        with self.assertRaises(FormattingError):
+            EmailTemplate('{x}').render('to@example.com', 'Subject', 'from@example.com')
+
+
+class Compilation(TestCase):
+    """Tests for templates compiled with precomputed fields and plain text"""
+
+    def test_compiled_templates_are_cached(self) -> None:
+        """Test compiling the same template twice returns the same instance"""
+
+        self.assertIs(EmailTemplate.compile('<p>{x}</p>'), EmailTemplate.compile('<p>{x}</p>'))
+
+    def test_fields_parsed_once(self) -> None:
+        """Test template fields are not parsed again after compilation"""
+
+        template = EmailTemplate.compile('<p>{x} {y}</p>')
+        with patch('bank.system.smtp.Formatter') as mock_formatter:
+            self.assertCountEqual(('x', 'y'), template.fields)
+            template.format(x=1, y=2).render('to@example.com', 'Subject', 'from@example.com')
+
+        mock_formatter.assert_not_called()
+
+    def test_plain_text_formatted_with_html(self) -> None:
+        """Test the plain text of a compiled template is formatted without parsing the HTML"""
+
+        template = EmailTemplate.compile('<p>Value: <b>{x}</b></p>')
+        with patch('bs4.BeautifulSoup') as mock_soup:
+            formatted = template.format(x=10)
+            msg = formatted.render('to@example.com', 'Subject', 'from@example.com')
+
+        mock_soup.assert_not_called()
+        self.assertEqual('Value: 10', formatted.text)
+        self.assertEqual('Value: 10', msg.get_body(('plain',)).get_content().strip())
+        self.assertEqual('<p>Value: <b>10</b></p>', msg.get_body(('html',)).get_content().strip())
+
+    def test_markup_removed_from_field_values(self) -> None:
+        """Test HTML passed as a field value is removed from the plain text"""
+
+        template = '<p>Usage:</p>{usage}'
+        usage = '<table><tr><th>Cluster</th><td>1 &amp; 2</td></tr></table>'
+
+        expected = EmailTemplate(template).format(usage=usage).text
+        formatted = EmailTemplate.compile(template).format(usage=usage)
+        self.assertEqual(expected, formatted.text)
+        self.assertEqual('Usage:Cluster1 & 2', formatted.text)
+        self.assertIn(usage, formatted.msg)
+
+    def test_matches_uncompiled_rendering(self) -> None:
+        """Test compiled application templates render the same plain text as uncompiled templates"""
+
+        values = dict(account_name='account1', start='01/01/2023', end='01/01/2024', exp_in_days=10,
+                      perc=90, usage='<table><tr><td>usage</td></tr></table>',
+                      investment='<table><tr><td>investment</td></tr></table>')
+
+        for template in (settings.usage_warning, settings.expiration_warning, settings.expired_proposal_notice):
+            fields = EmailTemplate(template).fields
+            kwargs = {field: values[field] for field in fields}
+
+            expected = EmailTemplate(template).format(**kwargs).text
+            self.assertEqual(expected, EmailTemplate.compile(template).format(**kwargs).text)
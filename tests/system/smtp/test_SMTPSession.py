@@ -0,0 +1,53 @@
+"""Tests for the ``SMTPSession`` class."""
+
+import socket
+from unittest import TestCase
+
+from bank.system.smtp import SMTPSession
+from tests._utils import LocalSMTPServer
+
+
+class ConnectionReuse(LocalSMTPServer, TestCase):
+    """Test messages are sent over a shared connection"""
+
+    def test_messages_share_connection(self) -> None:
+        """Test all messages are delivered over a single connection"""
+
+        with SMTPSession('127.0.0.1', self.port, max_messages=100) as smtp:
+            for i in range(10):
+                smtp.send_message(self.build_message(i))
+
+        self.assertEqual(10, smtp.messages_sent)
+        self.assertEqual(10, len(self.handler.sessions))
+        self.assertEqual(1, len(set(self.handler.sessions)))
+
+    def test_reconnect_after_max_messages(self) -> None:
+        """Test a new connection is opened after sending the maximum number of messages"""
+
+        with SMTPSession('127.0.0.1', self.port, max_messages=3) as smtp:
+            for i in range(10):
+                smtp.send_message(self.build_message(i))
+
+        self.assertEqual(10, len(self.handler.sessions))
+        self.assertEqual(4, len(set(self.handler.sessions)))
+
+    def test_reconnect_on_dropped_connection(self) -> None:
+        """Test the message is resent over a new connection if the server drops the connection"""
+
+        with SMTPSession('127.0.0.1', self.port) as smtp:
+            smtp.send_message(self.build_message(0))
+
+            # Simulate the server dropping an idle connection
+            smtp._smtp.sock.shutdown(socket.SHUT_RDWR)
+            smtp.send_message(self.build_message(1))
+
+        self.assertEqual(2, len(self.handler.sessions))
+        self.assertEqual(2, len(set(self.handler.sessions)))
+
+    def test_no_connection_without_messages(self) -> None:
+        """Test a connection is not opened until a message is sent"""
+
+        with SMTPSession('127.0.0.1', self.port) as smtp:
+            self.assertIsNone(smtp._smtp)
+
+        self.assertEqual(0, smtp.messages_sent)
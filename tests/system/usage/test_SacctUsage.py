@@ -0,0 +1,139 @@
+"""Tests for the ``SacctUsage`` class."""
+
+from datetime import date, datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.exceptions import CmdError
+from bank.system.simulated import SimulatedSlurm
+from bank.system.usage import SacctUsage, SreportUsage
+
+CLUSTERS = ('cluster1', 'cluster2')
+
+
+class JobUsage(TestCase):
+    """Test usage is summed from individual job records"""
+
+    def setUp(self) -> None:
+        """Activate a simulator with a reproducible number of accounts"""
+
+        self.simulator = SimulatedSlurm(num_accounts=10, clusters=CLUSTERS, users_per_account=3)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.end = date.today()
+        self.start = self.end - timedelta(days=3)
+
+    def test_matches_sreport_by_account(self) -> None:
+        """Test account totals agree with ``sreport``"""
+
+        self.assertEqual(
+            SreportUsage().usage_by_account(CLUSTERS[0], self.start, self.end),
+            SacctUsage().usage_by_account(CLUSTERS[0], self.start, self.end))
+
+    def test_matches_sreport_per_user(self) -> None:
+        """Test per user usage agrees with ``sreport``"""
+
+        for in_hours in (True, False):
+            self.assertEqual(
+                SreportUsage().usage_per_user('account1', CLUSTERS[0], self.start, self.end, in_hours),
+                SacctUsage().usage_per_user('account1', CLUSTERS[0], self.start, self.end, in_hours))
+
+
+class ParseJobUsage(TestCase):
+    """Tests for the parsing of ``sacct`` output"""
+
+    start = date(2024, 1, 2)
+    end = date(2024, 1, 3)
+
+    def test_jobs_clipped_to_window(self) -> None:
+        """Test only the part of each job within the date range is counted"""
+
+        output = (
+            'acc|user1|2024-01-01T23:00:00|2024-01-02T01:00:00|billing=2,cpu=2\n'
+            'acc|user2|2024-01-02T23:30:00|2024-01-03T02:00:00|billing=4,cpu=1\n'
+        )
+
+        usage = SacctUsage._parse_job_usage(output, self.start, self.end)
+        self.assertEqual({('acc', 'user1'): 2 * 3600, ('acc', 'user2'): 4 * 1800}, usage)
+
+    def test_pending_and_running_jobs(self) -> None:
+        """Test pending jobs are ignored and running jobs are counted until the end of the window"""
+
+        output = (
+            'acc|user1|Unknown|Unknown|billing=2\n'
+            'acc|user2|2024-01-02T12:00:00|Unknown|cpu=3\n'
+        )
+
+        usage = SacctUsage._parse_job_usage(output, self.start, self.end)
+        self.assertEqual({('acc', 'user2'): 3 * 12 * 3600}, usage)
+
+
+class IterCompletedJobs(TestCase):
+    """Tests for the ``iter_completed_jobs`` method"""
+
+    output = (
+        'acc|user1|2024-01-01T23:00:00|2024-01-02T00:00:00|3600|billing=2\n'
+        'acc|user2|2024-01-02T05:59:00|2024-01-02T06:00:00|60|billing=3\n'
+        'acc|user3|2024-01-02T23:59:50|2024-01-03T00:00:00|10|cpu=1\n'
+        'acc|user4|Unknown|Unknown|100|billing=1\n'
+        'acc|user5|2024-01-01T23:00:00|2024-01-02T01:00:00|7200|billing=1\n'
+        'acc|user6|None|2024-01-02T01:00:00|0|billing=1\n'
+    )
+
+    def iter_jobs(self, count_from: datetime = None) -> list:
+        """Return the jobs yielded for the second day of 2024 from the canned ``sacct`` output"""
+
+        with patch('bank.system.shell.ShellCmd.iter_lines', return_value=iter(self.output.splitlines())):
+            return list(SacctUsage.iter_completed_jobs('cluster1', datetime(2024, 1, 2), datetime(2024, 1, 3), count_from))
+
+    def test_jobs_within_range(self) -> None:
+        """Test jobs ending after the start and up to the end of the range are yielded with their billed seconds"""
+
+        self.assertEqual(
+            [('acc', 'user2', 180), ('acc', 'user3', 10), ('acc', 'user5', 7200), ('acc', 'user6', 0)],
+            self.iter_jobs())
+
+    def test_time_before_count_from_excluded(self) -> None:
+        """Test only the time jobs ran after ``count_from`` is counted"""
+
+        self.assertEqual(
+            [('acc', 'user2', 180), ('acc', 'user3', 10), ('acc', 'user5', 3600), ('acc', 'user6', 0)],
+            self.iter_jobs(count_from=datetime(2024, 1, 2)))
+
+
+class UsageAfter(TestCase):
+    """Tests for the ``usage_after`` method"""
+
+    output = (
+        'acc1|user1|2024-01-01T23:00:00|2024-01-02T00:00:00|3600|billing=2\n'
+        'acc1|user2|2024-01-01T23:00:00|2024-01-02T01:00:00|7200|billing=1\n'
+        'acc2|user3|2024-01-02T01:00:00|Unknown|600|billing=3\n'
+        'acc2|user4|Unknown|Unknown|0|billing=1\n'
+    )
+
+    def test_running_and_completed_jobs(self) -> None:
+        """Test jobs ending after the given time and running jobs are summed per account"""
+
+        with patch('bank.system.shell.ShellCmd.iter_lines', return_value=iter(self.output.splitlines())):
+            usage = SacctUsage.usage_after('cluster1', datetime(2024, 1, 2), datetime(2024, 1, 2))
+
+        self.assertEqual({'acc1': 3600, 'acc2': 1800}, usage)
+
+
+class Errors(TestCase):
+    """Test the handling of failed ``sacct`` calls"""
+
+    @patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sacct: error'))
+    def test_error_by_account(self, *args) -> None:
+        """Test a ``CmdError`` is raised when reporting usage for all accounts"""
+
+        with self.assertRaises(CmdError):
+            SacctUsage().usage_by_account('cluster1', date.today(), date.today())
+
+    @patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sacct: error'))
+    def test_none_per_user(self, *args) -> None:
+        """Test ``None`` is returned when reporting usage for a single account"""
+
+        self.assertIsNone(SacctUsage().usage_per_user('account1', 'cluster1', date.today(), date.today()))
@@ -0,0 +1,72 @@
+"""Tests for the ``SshareUsage`` class."""
+
+from datetime import date, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.exceptions import CmdError
+from bank.system.simulated import SimulatedSlurm
+from bank.system.usage import SshareUsage
+
+CLUSTERS = ('cluster1', 'cluster2')
+
+
+class RawUsage(TestCase):
+    """Test usage is reported from the raw usage of each association"""
+
+    def setUp(self) -> None:
+        """Activate a simulator with a reproducible number of accounts"""
+
+        self.simulator = SimulatedSlurm(num_accounts=10, clusters=CLUSTERS, users_per_account=3)
+        context = self.simulator.activate()
+        context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+
+        self.end = date.today()
+        self.start = self.end - timedelta(days=30)
+
+    def test_usage_by_account(self) -> None:
+        """Test account totals match the raw usage of each account using a single ``sshare`` call"""
+
+        usage = SshareUsage().usage_by_account(CLUSTERS[0], self.start, self.end, in_hours=False)
+        expected = {account: raw for (account, cluster), raw in self.simulator.raw_usage.items() if cluster == CLUSTERS[0] and raw}
+        self.assertEqual(expected, usage)
+        self.assertEqual(1, self.simulator.calls['sshare'])
+
+    def test_usage_per_user(self) -> None:
+        """Test user usage is reported for the requested account only"""
+
+        usage = SshareUsage().usage_per_user('account1', CLUSTERS[0], self.start, self.end, in_hours=False)
+        self.assertCountEqual(self.simulator.users['account1'], usage)
+        self.assertLessEqual(sum(usage.values()), self.simulator.raw_usage['account1', CLUSTERS[0]])
+
+    def test_usage_in_hours(self) -> None:
+        """Test usage is converted from seconds to hours"""
+
+        seconds = SshareUsage().usage_by_account(CLUSTERS[0], self.start, self.end, in_hours=False)
+        hours = SshareUsage().usage_by_account(CLUSTERS[0], self.start, self.end)
+        self.assertEqual({account: round(value / 3600) for account, value in seconds.items()}, hours)
+
+    def test_reset_usage_not_reported(self) -> None:
+        """Test accounts are excluded from account totals once their raw usage is reset"""
+
+        self.simulator.raw_usage['account1', CLUSTERS[0]] = 0
+        usage = SshareUsage().usage_by_account(CLUSTERS[0], self.start, self.end)
+        self.assertNotIn('account1', usage)
+
+
+class Errors(TestCase):
+    """Test the handling of failed ``sshare`` calls"""
+
+    @patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sshare: error'))
+    def test_error_by_account(self, *args) -> None:
+        """Test a ``CmdError`` is raised when reporting usage for all accounts"""
+
+        with self.assertRaises(CmdError):
+            SshareUsage().usage_by_account('cluster1', date.today(), date.today())
+
+    @patch('bank.system.shell.ShellCmd._subprocess_call', return_value=('', 'sshare: error'))
+    def test_none_per_user(self, *args) -> None:
+        """Test ``None`` is returned when reporting usage for a single account"""
+
+        self.assertIsNone(SshareUsage().usage_per_user('account1', 'cluster1', date.today(), date.today()))
@@ -0,0 +1,68 @@
+"""Tests for the ``usage_source`` function."""
+
+from datetime import date, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.system.simulated import SimulatedSlurm
+from bank.system.slurm import Slurm, SlurmAccount
+from bank.system.usage import SacctUsage, SreportUsage, SshareUsage, usage_source, windowed_usage_source
+
+CLUSTERS = ('cluster1', 'cluster2')
+
+
+class SourceSelection(TestCase):
+    """Test usage sources are selected by name"""
+
+    def test_default_from_settings(self) -> None:
+        """Test the source named in application settings is returned by default"""
+
+        with patch('bank.settings.usage_source', 'sshare'):
+            self.assertIsInstance(usage_source(), SshareUsage)
+
+        with patch('bank.settings.usage_source', 'sreport'):
+            self.assertIsInstance(usage_source(), SreportUsage)
+
+    def test_explicit_name(self) -> None:
+        """Test an explicitly named source takes precedence over application settings"""
+
+        self.assertIsInstance(usage_source('sacct'), SacctUsage)
+
+    def test_error_on_unknown_name(self) -> None:
+        """Test a ``ValueError`` is raised for unknown source names"""
+
+        with self.assertRaises(ValueError):
+            usage_source('squeue')
+
+
+class WindowedSourceSelection(TestCase):
+    """Test sources that ignore date ranges are rejected where usage is charged over a window"""
+
+    def test_windowed_sources_returned(self) -> None:
+        """Test sources reporting usage within the requested date range are returned"""
+
+        self.assertIsInstance(windowed_usage_source('sreport'), SreportUsage)
+        self.assertIsInstance(windowed_usage_source('sacct'), SacctUsage)
+
+    def test_error_on_cumulative_source(self) -> None:
+        """Test a ``ValueError`` is raised for sources reporting usage since the last reset"""
+
+        with patch('bank.settings.usage_source', 'sshare'), self.assertRaisesRegex(ValueError, 'sshare'):
+            windowed_usage_source()
+
+
+class SlurmIntegration(TestCase):
+    """Test Slurm wrappers query the usage source selected in application settings"""
+
+    def test_selected_source_queried(self) -> None:
+        """Test usage is retrieved using the utility of the selected source"""
+
+        end = date.today()
+        start = end - timedelta(days=1)
+        for name in ('sreport', 'sshare', 'sacct'):
+            simulator = SimulatedSlurm(num_accounts=3, clusters=CLUSTERS)
+            with simulator.activate(), patch('bank.settings.usage_source', name):
+                Slurm.cluster_usage_by_account(CLUSTERS[0], start, end)
+                SlurmAccount('account1').get_cluster_usage_per_user(CLUSTERS[0], start, end)
+
+            self.assertEqual(2, simulator.calls[name])
@@ -0,0 +1,130 @@
+"""Tests for the ``UsageCache`` class."""
+
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank.system.usage_cache import UsageCache
+
+START = date(2023, 1, 1)
+END = date(2023, 2, 1)
+
+
+class CacheEntries(TestCase):
+    """Test storing and retrieving cached usage"""
+
+    def setUp(self) -> None:
+        """Create a cache in a temporary directory"""
+
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = Path(self.tempdir.name) / 'cache.db'
+        self.cache = UsageCache(self.path, max_entries=10)
+
+    def test_missing_entry(self) -> None:
+        """Test ``None`` is returned for windows that are not cached"""
+
+        self.assertIsNone(self.cache.get('cluster', 'account1', START, END, 'Seconds'))
+
+    def test_stored_entry(self) -> None:
+        """Test stored usage is returned for a matching key only"""
+
+        self.cache.set('cluster', 'account1', START, END, 'Seconds', {'user1': 10})
+        self.assertEqual({'user1': 10}, self.cache.get('cluster', 'account1', START, END, 'Seconds'))
+        self.assertIsNone(self.cache.get('cluster', 'account1', START, END, 'Hours'))
+        self.assertIsNone(self.cache.get('cluster', 'account2', START, END, 'Seconds'))
+
+    def test_empty_usage_cached(self) -> None:
+        """Test windows without usage are cached as an empty dictionary"""
+
+        self.cache.set('cluster', 'account1', START, END, 'Seconds', {})
+        self.assertEqual({}, self.cache.get('cluster', 'account1', START, END, 'Seconds'))
+
+    def test_persistent(self) -> None:
+        """Test entries are available to new cache instances"""
+
+        self.cache.set('cluster', 'account1', START, END, 'Seconds', {'user1': 10})
+        self.assertEqual({'user1': 10}, UsageCache(self.path).get('cluster', 'account1', START, END, 'Seconds'))
+
+    @patch('bank.system.usage_cache.time.time', side_effect=range(100))
+    def test_least_recently_used_evicted(self, _) -> None:
+        """Test the least recently used entries are discarded once the cache is full"""
+
+        self.cache.eviction_interval = 1
+        for i in range(10):
+            self.cache.set('cluster', f'account{i}', START, END, 'Seconds', {'user': i})
+
+        # Reading the oldest entry keeps it from being evicted
+        self.cache.get('cluster', 'account0', START, END, 'Seconds')
+        self.cache.set('cluster', 'account10', START, END, 'Seconds', {'user': 10})
+
+        self.assertEqual(10, len(self.cache))
+        self.assertIsNotNone(self.cache.get('cluster', 'account0', START, END, 'Seconds'))
+        self.assertIsNone(self.cache.get('cluster', 'account1', START, END, 'Seconds'))
+
+    def test_clear(self) -> None:
+        """Test all entries are removed when clearing the cache"""
+
+        self.cache.set('cluster', 'account1', START, END, 'Seconds', {'user1': 10})
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+
+
+class JournalMode(TestCase):
+    """Test write-ahead logging is only used on local file systems"""
+
+    def get_journal_mode(self, fs_type: str) -> str:
+        """Return the journal mode of a new cache stored on the given file system type"""
+
+        with TemporaryDirectory() as tempdir, \
+                patch('bank.orm.DBConnection._get_filesystem_type', return_value=fs_type):
+            cache = UsageCache(Path(tempdir) / 'cache.db')
+            mode = cache.connection.execute('PRAGMA journal_mode').fetchone()[0]
+            cache.connection.close()
+            return mode
+
+    def test_local_file_system(self) -> None:
+        """Test write-ahead logging is enabled on local file systems"""
+
+        self.assertEqual('wal', self.get_journal_mode('ext4'))
+
+    def test_network_file_system(self) -> None:
+        """Test write-ahead logging is disabled on network file systems"""
+
+        self.assertEqual('delete', self.get_journal_mode('nfs'))
+
+
+class AfterFork(TestCase):
+    """Test cache instances remain usable in forked child processes"""
+
+    def test_lock_replaced(self) -> None:
+        """Test a lock held at the time of a fork is replaced in the child"""
+
+        with TemporaryDirectory() as tempdir:
+            cache = UsageCache(Path(tempdir) / 'cache.db')
+            lock = cache._lock
+            with lock:
+                UsageCache._after_fork()
+
+            self.assertIsNot(lock, cache._lock)
+            self.assertFalse(cache._lock.locked())
+
+
+class FromSettings(TestCase):
+    """Test the cache is configured from application settings"""
+
+    @patch('bank.settings.usage_cache_path', None)
+    def test_disabled_by_default(self) -> None:
+        """Test no cache is returned without a cache path"""
+
+        self.assertIsNone(UsageCache.from_settings())
+
+    def test_shared_instance(self) -> None:
+        """Test the same instance is returned for the configured path"""
+
+        with TemporaryDirectory() as tempdir, patch('bank.settings.usage_cache_path', f'{tempdir}/cache.db'):
+            cache = UsageCache.from_settings()
+            self.assertIsInstance(cache, UsageCache)
+            self.assertIs(cache, UsageCache.from_settings())